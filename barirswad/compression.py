@@ -0,0 +1,223 @@
+"""
+Negotiated response compression: gzip always, Brotli and Zstandard when
+their packages are installed.
+
+Only the content types listed in DEFAULT_LEVELS are compressed, each with
+its own level per encoding (COMPRESSION_LEVELS overrides some of them), so images, video and anything already
+Content-Encoded (precompressed static files) pass through untouched, as do
+ranges and responses under COMPRESSION_MIN_SIZE bytes. Streaming responses
+are compressed chunk by chunk and flushed after every chunk, so each chunk
+still reaches the client as soon as it is produced. text/event-stream is
+not listed: proxies and clients expect it uncompressed.
+
+HTML is not listed either. Pages that echo secrets next to user input (CSRF
+tokens in forms) are exposed to BREACH when compressed, and the HTML here is
+only the admin and the browsable API.
+"""
+import zlib
+
+from django.conf import settings
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+# content type -> {encoding: level}
+DEFAULT_LEVELS = {
+    # API responses: fast levels, these are compressed on every request
+    "application/json": {"zstd": 3, "br": 4, "gzip": 6},
+    "application/x-ndjson": {"zstd": 3, "br": 4, "gzip": 6},
+    "text/csv": {"zstd": 3, "br": 4, "gzip": 6},
+    "text/plain": {"zstd": 3, "br": 4, "gzip": 6},
+    "text/css": {"zstd": 6, "br": 6, "gzip": 6},
+    "text/javascript": {"zstd": 6, "br": 6, "gzip": 6},
+    "application/javascript": {"zstd": 6, "br": 6, "gzip": 6},
+    "application/xml": {"zstd": 3, "br": 4, "gzip": 6},
+    "image/svg+xml": {"zstd": 6, "br": 6, "gzip": 6},
+}
+DEFAULT_MIN_SIZE = 500
+
+
+def merged_levels(overrides):
+    """
+    DEFAULT_LEVELS with `overrides` applied: levels given for a type replace
+    those encodings' levels, other encodings keep theirs, and None stops a
+    type from being compressed.
+    """
+    levels = {content_type: dict(encodings) for content_type, encodings in DEFAULT_LEVELS.items()}
+    for content_type, encodings in overrides.items():
+        if encodings is None:
+            levels.pop(content_type, None)
+        else:
+            levels.setdefault(content_type, {}).update(encodings)
+    return levels
+
+
+class Gzip:
+    name = "gzip"
+
+    @staticmethod
+    def compress(data, level):
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    class Stream:
+        def __init__(self, level):
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+        def chunk(self, data):
+            return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        def finish(self):
+            return self.compressor.flush()
+
+
+class Brotli:
+    name = "br"
+
+    @staticmethod
+    def compress(data, level):
+        return brotli.compress(data, quality=level)
+
+    class Stream:
+        def __init__(self, level):
+            self.compressor = brotli.Compressor(quality=level)
+
+        def chunk(self, data):
+            return self.compressor.process(data) + self.compressor.flush()
+
+        def finish(self):
+            return self.compressor.finish()
+
+
+class Zstd:
+    name = "zstd"
+
+    @staticmethod
+    def compress(data, level):
+        return zstandard.ZstdCompressor(level=level).compress(data)
+
+    class Stream:
+        def __init__(self, level):
+            self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+        def chunk(self, data):
+            return self.compressor.compress(data) + self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+        def finish(self):
+            return self.compressor.flush()
+
+
+def available_codecs():
+    """Installed codecs by Content-Encoding token, in server preference order."""
+    codecs = {}
+    if zstandard is not None:
+        codecs["zstd"] = Zstd
+    if brotli is not None:
+        codecs["br"] = Brotli
+    codecs["gzip"] = Gzip
+    return codecs
+
+
+def accepted_encodings(header):
+    """Accept-Encoding -> {coding: q}; codings refused with q=0 are kept so "*" can't accept them."""
+    accepted = {}
+    for part in header.split(","):
+        coding, *params = part.strip().split(";")
+        q = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = q
+    return accepted
+
+
+def compress_chunks(chunks, stream):
+    for chunk in chunks:
+        if chunk:
+            yield stream.chunk(chunk)
+    yield stream.finish()
+
+
+async def acompress_chunks(chunks, stream):
+    async for chunk in chunks:
+        if chunk:
+            yield stream.chunk(chunk)
+    yield stream.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.levels = merged_levels(getattr(settings, "COMPRESSION_LEVELS", {}))
+        self.min_size = getattr(settings, "COMPRESSION_MIN_SIZE", DEFAULT_MIN_SIZE)
+        self.codecs = available_codecs()
+
+    def choose(self, request, levels):
+        """The codec and level to use, or None. Client q-values first, then our order."""
+        accepted = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+        wildcard = accepted.get("*", 0)
+        best = None
+        for name, codec in self.codecs.items():
+            q = accepted.get(name, wildcard)
+            # Ties go to the codec earlier in our order
+            if name in levels and q > 0 and (best is None or q > best[0]):
+                best = (q, codec, levels[name])
+        return best and best[1:]
+
+    def process_response(self, request, response):
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        levels = self.levels.get(content_type)
+        if (
+            levels is None
+            or response.has_header("Content-Encoding")
+            or response.status_code in (204, 206, 304)
+            # Files have precompressed siblings and Range support (barirswad.files)
+            or isinstance(response, FileResponse)
+            or request.method == "HEAD"
+        ):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ["Accept-Encoding"])
+        chosen = self.choose(request, levels)
+        if chosen is None:
+            return response
+        codec, level = chosen
+
+        if response.streaming:
+            stream = codec.Stream(level)
+            if response.is_async:
+                response.streaming_content = acompress_chunks(response.streaming_content, stream)
+            else:
+                response.streaming_content = compress_chunks(response.streaming_content, stream)
+            del response.headers["Content-Length"]
+        else:
+            compressed = codec.compress(response.content, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # The compressed body is a different representation of the same
+        # resource; a weak ETag still matches If-None-Match (RFC 9110 8.8.1)
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = codec.name
+        return response
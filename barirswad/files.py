@@ -0,0 +1,192 @@
+"""
+Static and media file serving, with or without DEBUG.
+
+    /static/  STATIC_ROOT as written by collectstatic (see barirswad.storage).
+              Content-hashed names are cached for a year as immutable, and
+              clients that accept br or gzip get the precompressed sibling.
+    /media/   MEDIA_ROOT (uploads and their variants), cached for
+              MEDIA_CACHE_MAX_AGE. With MEDIA_ACCEL_REDIRECT set, the file
+              is handed to the front proxy (nginx X-Accel-Redirect) and no
+              worker streams image bytes at all.
+
+Both answer conditional requests with 304 and a single byte range with 206.
+Files go out as FileResponse, which WSGI servers send with sendfile(2)
+through wsgi.file_wrapper.
+"""
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.encoding import filepath_to_uri
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+from .storage import COMPRESSIBLE_EXTENSIONS
+
+# ManifestStaticFilesStorage names: base.4f3a1c2d9e8b.css
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.[^/.]+$")
+BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+# Preferred first
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+IMMUTABLE = f"public, max-age={365 * 24 * 3600}, immutable"
+# Unhashed static names can change in place, so always revalidate them
+REVALIDATE = "public, no-cache"
+
+_UNSATISFIABLE = object()
+
+
+class _FileSlice:
+    """The first `length` bytes of an open file, read from its current position."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _stat(document_root, path):
+    try:
+        fullpath = safe_join(document_root, path)
+        st = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404("File not found")
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404("File not found")
+    return fullpath, st
+
+
+def accepted_encodings(request):
+    accepted = set()
+    for part in request.headers.get("Accept-Encoding", "").split(","):
+        coding, _, params = part.partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def byte_range(request, size, etag, last_modified):
+    """(first, last) byte offsets asked for by Range, None for the whole file, or _UNSATISFIABLE."""
+    header = request.headers.get("Range")
+    if not header or not size:
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+        # The client's partial copy is stale: send the whole file
+        return None
+    match = BYTE_RANGE.match(header.strip())
+    if match is None:
+        # Multiple or malformed ranges may be ignored (RFC 9110 14.2)
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last or not int(last):
+            return _UNSATISFIABLE if last else None
+        return max(0, size - int(last)), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        return _UNSATISFIABLE
+    return first, min(int(last), size - 1) if last else size - 1
+
+
+def _file_response(request, fullpath, size, etag, last_modified, content_type, filename):
+    requested = byte_range(request, size, etag, last_modified)
+    if requested is _UNSATISFIABLE:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    file = open(fullpath, "rb")
+    if requested is None:
+        response = FileResponse(file, content_type=content_type, filename=filename)
+    else:
+        first, last = requested
+        file.seek(first)
+        if last == size - 1:
+            # Runs to the end, so the file can still go out with sendfile
+            response = FileResponse(file, content_type=content_type, filename=filename)
+        else:
+            response = FileResponse(_FileSlice(file, last - first + 1), content_type=content_type, filename=filename)
+            response["Content-Length"] = last - first + 1
+        response.status_code = 206
+        response["Content-Range"] = f"bytes {first}-{last}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def serve_file(request, path, document_root, cache_control, precompressed=False):
+    fullpath, st = _stat(document_root, path)
+    content_type = mimetypes.guess_type(fullpath)[0] or "application/octet-stream"
+    filename = os.path.basename(fullpath)
+
+    compressible = precompressed and os.path.splitext(fullpath)[1].lower() in COMPRESSIBLE_EXTENSIONS
+    encoding = None
+    # Ranges always refer to the identity encoding
+    if compressible and "Range" not in request.headers:
+        accepted = accepted_encodings(request)
+        for coding, suffix in ENCODINGS:
+            if coding in accepted:
+                try:
+                    sibling = os.stat(fullpath + suffix)
+                except OSError:
+                    continue
+                fullpath, st, encoding = fullpath + suffix, sibling, coding
+                break
+
+    etag = quote_etag(f"{st.st_mtime_ns:x}-{st.st_size:x}" + (f"-{encoding}" if encoding else ""))
+    last_modified = int(st.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = _file_response(request, fullpath, st.st_size, etag, last_modified, content_type, filename)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = cache_control
+    if encoding:
+        response["Content-Encoding"] = encoding
+    if compressible:
+        patch_vary_headers(response, ["Accept-Encoding"])
+    return response
+
+
+@require_safe
+def static(request, path):
+    cache_control = IMMUTABLE if HASHED_NAME.search(path) else REVALIDATE
+    return serve_file(request, path, settings.STATIC_ROOT, cache_control, precompressed=True)
+
+
+@require_safe
+def media(request, path):
+    cache_control = f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 7 * 24 * 3600)}"
+    accel_prefix = getattr(settings, "MEDIA_ACCEL_REDIRECT", None)
+    if not accel_prefix:
+        return serve_file(request, path, settings.MEDIA_ROOT, cache_control)
+
+    # 404 here rather than from the proxy; nginx handles ranges and caching
+    fullpath, _ = _stat(settings.MEDIA_ROOT, path)
+    response = HttpResponse(content_type=mimetypes.guess_type(fullpath)[0] or "application/octet-stream")
+    response["X-Accel-Redirect"] = accel_prefix.rstrip("/") + "/" + filepath_to_uri(path)
+    response["Cache-Control"] = cache_control
+    return response
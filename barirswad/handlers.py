@@ -0,0 +1,43 @@
+"""
+Django's ASGI handler, with long-lived streams kept off per-request threads.
+
+Django runs each ASGI request inside its own asgiref ThreadSensitiveContext:
+the first sync_to_async() call of the request (sync middleware, signal
+receivers, the async ORM) starts a thread for that request, and the thread
+lives until the response is closed. For an event stream that is hours, so
+every open stream held an idle thread.
+
+Requests to ASGI_STREAM_PATHS run without that context. Their sync calls
+go to asgiref's single shared sync thread (and its database connection),
+one after another; streams only make a few short calls when they open, so
+any number of them share that one thread.
+"""
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler as DjangoASGIHandler
+
+
+class ASGIHandler(DjangoASGIHandler):
+    def __init__(self):
+        super().__init__()
+        self.stream_paths = frozenset(getattr(settings, "ASGI_STREAM_PATHS", ()))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self.is_stream(scope):
+            await self.handle(scope, receive, send)
+        else:
+            await super().__call__(scope, receive, send)
+
+    def is_stream(self, scope):
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        return path in self.stream_paths
+
+
+def get_asgi_application():
+    """django.core.asgi.get_asgi_application(), returning this handler."""
+    import django
+
+    django.setup(set_prefix=False)
+    return ASGIHandler()
@@ -0,0 +1,278 @@
+"""
+Per-route request metrics: query counts, SQL time, duplicate (N+1) query
+detection, render time and response size, exported in the Prometheus text
+format at /metrics and optionally as a Server-Timing header.
+
+Settings:
+    METRICS_ENABLED               turn the middleware into a pass-through
+    METRICS_SAMPLE_RATE           fraction of requests that get SQL instrumentation
+    METRICS_DUPLICATE_THRESHOLD   identical statements in one request that flag N+1
+    METRICS_SERVER_TIMING         add a Server-Timing header to sampled responses
+    METRICS_TOKEN                 if set, /metrics requires "Authorization: Bearer <token>"
+    METRICS_ALLOWED_NETWORKS      without a token, the client networks /metrics answers
+                                  (any client when DEBUG is on)
+"""
+import hmac
+import ipaddress
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_collectors = []
+
+
+def register_collector(func):
+    """Add a callable returning extra exposition lines, e.g. cache counters."""
+    _collectors.append(func)
+    return func
+
+
+class RouteStats:
+    __slots__ = (
+        "requests", "errors", "duration", "buckets", "sampled", "queries",
+        "sql_seconds", "render_seconds", "duplicates", "n_plus_one", "response_bytes",
+    )
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.duration = 0.0
+        self.buckets = [0] * len(DURATION_BUCKETS)
+        self.sampled = 0
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.render_seconds = 0.0
+        self.duplicates = 0
+        self.n_plus_one = 0
+        self.response_bytes = 0
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = defaultdict(RouteStats)
+
+    def record(self, route, method, status, duration, size, sample=None):
+        with self.lock:
+            stats = self.routes[(route, method)]
+            stats.requests += 1
+            stats.errors += status >= 500
+            stats.duration += duration
+            stats.response_bytes += size
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if duration <= bound:
+                    stats.buckets[i] += 1
+            if sample is not None:
+                stats.sampled += 1
+                stats.queries += sample.count
+                stats.sql_seconds += sample.seconds
+                stats.render_seconds += sample.render_seconds
+                stats.duplicates += sample.duplicates
+                stats.n_plus_one += sample.n_plus_one
+
+    def reset(self):
+        with self.lock:
+            self.routes.clear()
+
+    def exposition(self):
+        with self.lock:
+            routes = {key: _copy(stats) for key, stats in self.routes.items()}
+
+        metrics = [
+            ("http_requests_total", "counter", "Requests handled", lambda s: s.requests),
+            ("http_request_errors_total", "counter", "Requests that ended in a 5xx", lambda s: s.errors),
+            ("http_response_bytes_total", "counter", "Response body bytes", lambda s: s.response_bytes),
+            ("http_sampled_requests_total", "counter", "Requests with SQL instrumentation", lambda s: s.sampled),
+            ("db_queries_total", "counter", "SQL statements in sampled requests", lambda s: s.queries),
+            ("db_query_seconds_total", "counter", "SQL time in sampled requests", lambda s: s.sql_seconds),
+            ("http_render_seconds_total", "counter", "Response rendering time in sampled requests",
+             lambda s: s.render_seconds),
+            ("db_duplicate_queries_total", "counter", "Repeated identical SQL statements", lambda s: s.duplicates),
+            ("db_n_plus_one_requests_total", "counter", "Sampled requests flagged as N+1", lambda s: s.n_plus_one),
+        ]
+        lines = []
+        for name, kind, help_text, value in metrics:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for (route, method), stats in sorted(routes.items()):
+                lines.append(f"{name}{{{_labels(route, method)}}} {value(stats)}")
+
+        name = "http_request_duration_seconds"
+        lines += [f"# HELP {name} Request latency", f"# TYPE {name} histogram"]
+        for (route, method), stats in sorted(routes.items()):
+            labels = _labels(route, method)
+            for bound, count in zip(DURATION_BUCKETS, stats.buckets):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {stats.requests}')
+            lines.append(f"{name}_sum{{{labels}}} {stats.duration}")
+            lines.append(f"{name}_count{{{labels}}} {stats.requests}")
+
+        for collector in _collectors:
+            lines += collector()
+        return "\n".join(lines) + "\n"
+
+
+def _copy(stats):
+    copy = RouteStats()
+    for field in RouteStats.__slots__:
+        value = getattr(stats, field)
+        setattr(copy, field, list(value) if isinstance(value, list) else value)
+    return copy
+
+
+def _labels(route, method):
+    route = route.replace("\\", "\\\\").replace('"', '\\"')
+    return f'route="{route}",method="{method}"'
+
+
+registry = Registry()
+
+
+class QuerySample:
+    """DB execute wrapper that counts and times every statement of one request."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.count = 0
+        self.seconds = 0.0
+        self.render_seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+            # SQL text is parametrised, so repeats of one statement share a key
+            self.statements[sql] += 1
+
+    @property
+    def duplicates(self):
+        return sum(n - 1 for n in self.statements.values() if n > 1)
+
+    @property
+    def n_plus_one(self):
+        return int(any(n >= self.threshold for n in self.statements.values()))
+
+
+class MetricsMiddleware:
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "METRICS_ENABLED", True)
+        self.sample_rate = getattr(settings, "METRICS_SAMPLE_RATE", 1.0)
+        self.threshold = getattr(settings, "METRICS_DUPLICATE_THRESHOLD", 5)
+        self.server_timing = getattr(settings, "METRICS_SERVER_TIMING", False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        sample, start = self.start(request)
+        self.attach(sample)
+        try:
+            response = self.get_response(request)
+        finally:
+            self.detach(sample)
+        return self.finish(request, response, sample, start)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        sample, start = self.start(request)
+        # Connections are per thread; the async ORM runs its queries in the
+        # request's thread-sensitive executor, so install the wrapper there
+        if sample is not None:
+            await sync_to_async(self.attach)(sample)
+        try:
+            response = await self.get_response(request)
+        finally:
+            if sample is not None:
+                await sync_to_async(self.detach)(sample)
+        return self.finish(request, response, sample, start)
+
+    def start(self, request):
+        sample = QuerySample(self.threshold) if random.random() < self.sample_rate else None
+        request._metrics_sample = sample
+        return sample, time.perf_counter()
+
+    def attach(self, sample):
+        # Wrappers live on the per-thread connection objects, so no database
+        # connection is opened just to install them
+        if sample is not None:
+            for connection in connections.all():
+                connection.execute_wrappers.append(sample)
+
+    def detach(self, sample):
+        if sample is not None:
+            for connection in connections.all():
+                if sample in connection.execute_wrappers:
+                    connection.execute_wrappers.remove(sample)
+
+    def finish(self, request, response, sample, start):
+        duration = time.perf_counter() - start
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match else "unmatched"
+        size = 0 if response.streaming else len(response.content)
+        registry.record(route, request.method, response.status_code, duration, size, sample)
+
+        if sample is not None and self.server_timing:
+            app = max(duration - sample.seconds - sample.render_seconds, 0)
+            response["Server-Timing"] = ", ".join([
+                f'db;dur={sample.seconds * 1000:.1f};desc="{sample.count} queries"',
+                f"app;dur={app * 1000:.1f}",
+                f"render;dur={sample.render_seconds * 1000:.1f}",
+                f"total;dur={duration * 1000:.1f}",
+            ])
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that step
+        sample = getattr(request, "_metrics_sample", None)
+        if sample is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                sample.render_seconds += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+def metrics_denied(request):
+    """The status to refuse a /metrics request with, or None to serve it."""
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token:
+        authorization = request.headers.get("Authorization", "").encode()
+        return None if hmac.compare_digest(authorization, f"Bearer {token}".encode()) else 401
+    if settings.DEBUG:
+        return None
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return 403
+    networks = getattr(settings, "METRICS_ALLOWED_NETWORKS", ())
+    return None if any(address in ipaddress.ip_network(network) for network in networks) else 403
+
+
+def metrics_view(request):
+    status = metrics_denied(request)
+    if status is not None:
+        return HttpResponse(status=status)
+    return HttpResponse(registry.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8")
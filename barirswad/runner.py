@@ -0,0 +1,45 @@
+"""
+Test runner that gives every run its own SQLite test database file.
+
+Django would use an in-memory database, which serialises connections with
+"table is locked" errors; the tests race checkouts and ratings from
+several threads. A directory per run keeps concurrent runs (and their
+--parallel clones) from writing over each other.
+
+The database is in WAL mode (see barirswad.database), so the migrated
+schema sits in the -wal file until a checkpoint; --parallel clones copy
+only the main file, so it is checkpointed before each copy.
+"""
+import os
+import tempfile
+
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+
+def checkpointed(connection):
+    clone_test_db = connection.creation.clone_test_db
+
+    def clone(*args, **kwargs):
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return clone_test_db(*args, **kwargs)
+
+    return clone
+
+
+class TestRunner(DiscoverRunner):
+    def setup_databases(self, **kwargs):
+        self.database_dir = tempfile.TemporaryDirectory(prefix="barirswad-test-")
+        for alias in connections:
+            settings_dict = connections[alias].settings_dict
+            if settings_dict["ENGINE"] == "django.db.backends.sqlite3" and not settings_dict["TEST"]["NAME"]:
+                settings_dict["TEST"]["NAME"] = os.path.join(self.database_dir.name, f"{alias}.sqlite3")
+                connections[alias].creation.clone_test_db = checkpointed(connections[alias])
+        return super().setup_databases(**kwargs)
+
+    def teardown_databases(self, old_config, **kwargs):
+        try:
+            super().teardown_databases(old_config, **kwargs)
+        finally:
+            self.database_dir.cleanup()
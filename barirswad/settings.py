@@ -12,11 +12,16 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 
+import environ
 from django.conf.global_settings import MEDIA_URL
 
+from barirswad.database import database_config
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+env = environ.Env()
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -25,7 +30,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-!l7fa-)&*j#6!4#g)ehfs)2iysdk3$y+-6v#(iulx8197k0v=#'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Off unless DJANGO_DEBUG is set, e.g. DJANGO_DEBUG=1 for local development
+DEBUG = env.bool("DJANGO_DEBUG", default=False)
 
 ALLOWED_HOSTS = ['*']
 
@@ -52,15 +58,64 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.AllowAny'],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
+    'DEFAULT_RENDERER_CLASSES': [
+        'barirswad.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'barirswad.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
-    ]
+        'user.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'barirswad.throttling.AnonThrottle',
+        'barirswad.throttling.UserThrottle',
+    ],
 }
 
+# Token-bucket throttling (see barirswad.throttling). "<tokens>/<period>"
+# refills at that rate with a bucket of the same size; "burst" caps the
+# bucket lower to stop request bursts
+THROTTLE_RATES = {
+    "anon": "300/min",
+    "user": "600/min",
+    "login": {"rate": "10/min", "burst": 5},
+    "register": {"rate": "20/hour", "burst": 5},
+    "rating": {"rate": "10/min", "burst": 5},
+    # create_order and checkout share this one
+    "orders": {"rate": "30/min", "burst": 5},
+}
+# LocalBucketStore counts per worker; CacheBucketStore shares buckets through
+# the THROTTLE_CACHE_ALIAS cache (use a shared backend for that)
+THROTTLE_STORE = "barirswad.throttling.LocalBucketStore"
+THROTTLE_CACHE_ALIAS = "default"
+
+# Password checks run in the hashing pool (see user.passwords)
+AUTHENTICATION_BACKENDS = ['user.backends.PooledModelBackend']
+# Hashing processes per worker (None: half the CPUs; 0: hash inline), hashes
+# queued or running before new ones wait (None: 8 per process), and how long
+# they wait for a slot before failing with 503
+PASSWORD_HASH_WORKERS = None
+PASSWORD_HASH_MAX_PENDING = None
+PASSWORD_HASH_QUEUE_TIMEOUT = 5
+
+# Token -> user cache used by CachedTokenAuthentication
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_TTL = 30
+# CACHES alias that shares entries between workers and both web services
+# (None: each process keeps its own)
+TOKEN_CACHE_SHARED_ALIAS = "default"
+
 
 
 MIDDLEWARE = [
+    'barirswad.metrics.MetricsMiddleware',
+    # After metrics, so response sizes are recorded as sent
+    'barirswad.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -98,15 +153,56 @@ from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Configured from DATABASE_URL and friends, see barirswad/database.py
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db_data" / "db.sqlite3",
-    }
+    "default": database_config(env, default_url=f"sqlite:///{BASE_DIR / 'db_data' / 'db.sqlite3'}"),
+}
+
+# Puts SQLite test databases in a file of each run's own
+TEST_RUNNER = "barirswad.runner.TestRunner"
+
+
+
+
+
+# Response cache versions and bodies (food.cache), the token cache's shared
+# tier and throttle buckets. The default keeps them in process memory, which
+# is right for one development server; anything with more than one process
+# (workers, the ASGI container, management commands) must set CACHE_URL to a
+# shared cache such as redis://redis:6379/0, as docker compose does.
+# `manage.py check --deploy` warns while it is per-process (food.W001)
+CACHES = {
+    "default": env.cache_url("CACHE_URL", default="locmemcache://barirswad"),
 }
 
+# Cache used for versioned API responses (see food.cache); must be shared
+# by all processes, see CACHES
+RESPONSE_CACHE_ALIAS = "default"
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Per-route request metrics served at /metrics (see barirswad.metrics)
+METRICS_ENABLED = True
+METRICS_SAMPLE_RATE = 1.0
+METRICS_DUPLICATE_THRESHOLD = 5
+METRICS_SERVER_TIMING = DEBUG
+# Scrapers send "Authorization: Bearer <METRICS_TOKEN>"; without a token
+# /metrics only answers loopback and private addresses (or anyone in DEBUG)
+METRICS_TOKEN = env.str("METRICS_TOKEN", default=None)
+METRICS_ALLOWED_NETWORKS = ["127.0.0.0/8", "::1/128", "10.0.0.0/8", "172.16.0.0/12", "192.168.0.0/16", "fc00::/7"]
 
+# Thumbnail/WebP/AVIF generation for uploaded images (see food.images)
+IMAGE_PIPELINE_ASYNC = True
+IMAGE_PIPELINE_WORKERS = 2
 
+# Order status push at api/food/async/orders/events/ (see food.events). The
+# database broker reaches streams whichever process made the change; use
+# food.events.LocalBroker when one process serves both
+ORDER_EVENTS_BROKER = "food.events.DatabaseBroker"
+ORDER_EVENTS_POLL_INTERVAL = 1.0
+
+# Long-lived responses served under ASGI without a thread per request
+# (see barirswad.handlers)
+ASGI_STREAM_PATHS = ["/api/food/async/orders/events/"]
 
 
 # Password validation
@@ -155,3 +251,24 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    # Hashed names plus .gz/.br copies written by collectstatic (see barirswad.storage)
+    "staticfiles": {"BACKEND": "barirswad.storage.CompressedManifestStaticFilesStorage"},
+}
+
+# /static/ and /media/ are served by barirswad.files
+MEDIA_CACHE_MAX_AGE = 7 * 24 * 3600
+# Set to an nginx `internal` location aliased to MEDIA_ROOT (e.g.
+# "/protected-media/") to let the proxy send media instead of a worker
+MEDIA_ACCEL_REDIRECT = None
+
+# Response compression (see barirswad.compression); zstd and br are used
+# when their packages are installed. Levels per content type and encoding
+# default to compression.DEFAULT_LEVELS, picked with `manage.py
+# bench_compression`; list only what differs here, e.g.
+# {"text/csv": {"gzip": 9}} or {"text/plain": None} to stop compressing it.
+# Unlisted types are never compressed
+COMPRESSION_MIN_SIZE = 500
+COMPRESSION_LEVELS = {}
@@ -0,0 +1,61 @@
+"""
+STATIC_ROOT storage: content-hashed names (ManifestStaticFilesStorage) plus
+precompressed siblings written once at collectstatic time, so serving a
+compressed asset is a file read (see barirswad.files).
+
+    admin/css/base.4f3a1c2d9e8b.css
+    admin/css/base.4f3a1c2d9e8b.css.gz
+    admin/css/base.4f3a1c2d9e8b.css.br   (when the brotli package is installed)
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Already-compressed formats (images, fonts, archives) are left alone
+COMPRESSIBLE_EXTENSIONS = {
+    ".css", ".js", ".mjs", ".map", ".json", ".svg", ".html", ".txt", ".xml", ".ico", ".eot", ".ttf", ".otf",
+}
+# Below this a compressed copy saves less than the extra headers cost
+MIN_COMPRESS_SIZE = 256
+
+
+def compressors():
+    yield "gz", lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield "br", lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    # A file missing from the manifest is hashed on the fly instead of
+    # failing the page that links to it
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        # Both the original and the hashed name may be requested
+        for name in {*paths, *self.hashed_files.values()}:
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS and self.exists(name):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, compress in compressors():
+            compressed = compress(data)
+            # Only keep copies that are meaningfully smaller
+            if len(compressed) < len(data) * 0.95:
+                target = f"{name}.{suffix}"
+                if self.exists(target):
+                    self.delete(target)
+                self._save(target, ContentFile(compressed))
@@ -0,0 +1,436 @@
+import datetime
+import os
+import tempfile
+import uuid
+import zlib
+from decimal import Decimal
+from io import BytesIO
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from . import compression, files, metrics, throttling
+from .compression import CompressionMiddleware
+from .renderers import FastJSONParser, FastJSONRenderer
+from .throttling import CacheBucketStore, get_store, throttles
+
+
+@api_view(["GET"])
+@permission_classes([AllowAny])
+@throttle_classes(throttles("test"))
+def throttled(request):
+    return Response({})
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "throttle-tests"}},
+    THROTTLE_RATES={"test": {"rate": "2/min", "burst": 2}},
+)
+class ThrottlingTests(SimpleTestCase):
+    factory = APIRequestFactory()
+
+    def setUp(self):
+        get_store().clear()
+        throttling.reset_throttle_stats()
+
+    def get(self, user=None, address="10.0.0.1"):
+        request = self.factory.get("/", REMOTE_ADDR=address)
+        if user is not None:
+            force_authenticate(request, user=user)
+        return throttled(request)
+
+    def test_rejected_with_retry_after(self):
+        self.assertEqual([self.get().status_code for _ in range(3)], [200, 200, 429])
+        response = self.get()
+        # One token every 30 seconds
+        self.assertIn(int(response["Retry-After"]), (29, 30))
+        self.assertEqual(throttling.throttle_stats(), {"test": 2})
+
+    def test_buckets(self):
+        alice, bob = User(id=1), User(id=2)
+        for _ in range(2):
+            self.get(alice)
+        self.assertEqual(self.get(alice).status_code, 429)
+        # Bucket per user whatever their address, per address when anonymous
+        self.assertEqual(self.get(alice, address="10.0.0.2").status_code, 429)
+        self.assertEqual(self.get(bob).status_code, 200)
+        self.assertEqual(self.get().status_code, 200)
+        self.get()
+        self.assertEqual(self.get().status_code, 429)
+        self.assertEqual(self.get(address="10.0.0.2").status_code, 200)
+
+    def test_default_classes_read_per_request(self):
+        rates = {"anon": {"rate": "1/min", "burst": 1}}
+        with override_settings(THROTTLE_RATES=rates):
+            self.assertEqual([self.get().status_code for _ in range(2)], [200, 429])
+            with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "DEFAULT_THROTTLE_CLASSES": []}):
+                self.assertEqual(self.get().status_code, 200)
+
+    @override_settings(THROTTLE_STORE="barirswad.throttling.CacheBucketStore")
+    def test_shared_store(self):
+        self.assertIsInstance(get_store(), CacheBucketStore)
+        for _ in range(2):
+            self.get(User(id=1))
+        self.assertIsNotNone(caches["default"].get("throttle:test:user:1"))
+        # Another worker's store sees the same, empty, bucket
+        self.assertGreater(CacheBucketStore().consume("test:user:1", *throttling.get_rate("test")), 0)
+        self.assertEqual(self.get(User(id=1)).status_code, 429)
+
+
+class FileServingTests(SimpleTestCase):
+    body = b"body { color: red; }\n" * 50
+    hashed = "css/app.0123456789ab.css"
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.enterContext(override_settings(STATIC_ROOT=root.name, MEDIA_ROOT=root.name))
+        os.mkdir(os.path.join(root.name, "css"))
+        for name, data in [
+            (self.hashed, self.body), (self.hashed + ".gz", b"gzip bytes"), (self.hashed + ".br", b"br bytes"),
+            ("css/plain.css", self.body), ("css/plain.css.gz", b"gzip bytes"), ("logo.png", b"\x89PNG" * 10),
+        ]:
+            with open(os.path.join(root.name, name), "wb") as f:
+                f.write(data)
+
+    def get(self, path=None, view=files.static, **headers):
+        response = view(RequestFactory().get("/", headers=headers), path or self.hashed)
+        content = b"".join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, content
+
+    def test_whole_file(self):
+        response, content = self.get()
+        self.assertEqual((response.status_code, content), (200, self.body))
+        self.assertEqual(response["Cache-Control"], files.IMMUTABLE)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertNotIn("Content-Encoding", response)
+        # Unhashed names can change in place
+        response, _ = self.get("css/plain.css")
+        self.assertEqual(response["Cache-Control"], files.REVALIDATE)
+        with self.assertRaises(Http404):
+            self.get("../tests.py")
+
+    def test_precompressed_siblings(self):
+        cases = {
+            "gzip, deflate, br": ("br", b"br bytes"),
+            "gzip": ("gzip", b"gzip bytes"),
+            "br;q=0, gzip": ("gzip", b"gzip bytes"),
+            "br;q=0": (None, self.body),
+            "identity": (None, self.body),
+        }
+        for accept, (encoding, body) in cases.items():
+            with self.subTest(accept=accept):
+                response, content = self.get(**{"Accept-Encoding": accept})
+                self.assertEqual((response.get("Content-Encoding"), content), (encoding, body))
+                self.assertEqual(response["Vary"], "Accept-Encoding")
+        # No .br sibling: the next accepted one
+        response, content = self.get("css/plain.css", **{"Accept-Encoding": "br, gzip"})
+        self.assertEqual((response["Content-Encoding"], content), ("gzip", b"gzip bytes"))
+        # Not a compressible type: no sibling looked for, no Vary
+        response, _ = self.get("logo.png", **{"Accept-Encoding": "br, gzip"})
+        self.assertNotIn("Content-Encoding", response)
+        self.assertNotIn("Vary", response)
+
+    def test_not_modified(self):
+        response, _ = self.get()
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        for headers in [{"If-None-Match": etag}, {"If-Modified-Since": last_modified}]:
+            with self.subTest(headers=headers):
+                response, content = self.get(**headers)
+                self.assertEqual((response.status_code, content), (304, b""))
+                self.assertEqual(response["ETag"], etag)
+        # Each encoding is its own representation
+        response, _ = self.get(**{"If-None-Match": etag, "Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_ranges(self):
+        size = len(self.body)
+        cases = {
+            "bytes=0-4": (0, 4),
+            "bytes=10-": (10, size - 1),
+            "bytes=-3": (size - 3, size - 1),
+            f"bytes=5-{size * 2}": (5, size - 1),
+        }
+        for header, (first, last) in cases.items():
+            with self.subTest(range=header):
+                # Ranges are of the identity encoding even when gzip is accepted
+                response, content = self.get(**{"Range": header, "Accept-Encoding": "gzip"})
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response["Content-Range"], f"bytes {first}-{last}/{size}")
+                self.assertEqual(content, self.body[first:last + 1])
+                self.assertNotIn("Content-Encoding", response)
+
+        response, _ = self.get(Range=f"bytes={size}-")
+        self.assertEqual((response.status_code, response["Content-Range"]), (416, f"bytes */{size}"))
+        # Malformed or multiple ranges, or a stale If-Range: the whole file
+        stale = [{"Range": "bytes=0-1,5-6"}, {"Range": "lines=1-2"}, {"Range": "bytes=0-4", "If-Range": '"old"'}]
+        for headers in stale:
+            with self.subTest(headers=headers):
+                response, content = self.get(**headers)
+                self.assertEqual((response.status_code, content), (200, self.body))
+
+    def test_media(self):
+        response, content = self.get("logo.png", view=files.media)
+        self.assertEqual((response.status_code, len(content)), (200, 40))
+        self.assertEqual(response["Cache-Control"], f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}")
+        with override_settings(MEDIA_ACCEL_REDIRECT="/protected-media/"):
+            response, content = self.get("logo.png", view=files.media)
+        self.assertEqual((response["X-Accel-Redirect"], content), ("/protected-media/logo.png", b""))
+
+
+class CompressionTests(SimpleTestCase):
+    body = b'{"name": "Pilau", "price": "350.00"}' * 50
+
+    def compress(self, response, accept="gzip", **settings_kwargs):
+        with override_settings(**settings_kwargs):
+            middleware = CompressionMiddleware(lambda request: response)
+        request = RequestFactory().get("/", headers={"Accept-Encoding": accept})
+        return middleware(request)
+
+    def json(self, body=None, **kwargs):
+        return HttpResponse(self.body if body is None else body, content_type="application/json", **kwargs)
+
+    def test_negotiation(self):
+        middleware = CompressionMiddleware(lambda request: None)
+        # Negotiation only reads codec names, so it can be checked for all of them
+        middleware.codecs = {"zstd": compression.Zstd, "br": compression.Brotli, "gzip": compression.Gzip}
+        levels = compression.DEFAULT_LEVELS["application/json"]
+        cases = {
+            "gzip, br, zstd": "zstd",
+            "gzip, br": "br",
+            "gzip;q=1, br;q=0.5": "gzip",
+            "zstd;q=0, br, gzip": "br",
+            "*": "zstd",
+            "*, zstd;q=0": "br",
+            "br;q=0, gzip;q=0": None,
+            "identity": None,
+            "": None,
+        }
+        for accept, expected in cases.items():
+            with self.subTest(accept=accept):
+                request = RequestFactory().get("/", headers={"Accept-Encoding": accept})
+                chosen = middleware.choose(request, levels)
+                self.assertEqual(chosen and chosen[0].name, expected)
+        # Only encodings with a level for the content type are offered
+        request = RequestFactory().get("/", headers={"Accept-Encoding": "zstd, br"})
+        self.assertEqual(middleware.choose(request, {"br": 4, "gzip": 6}), (compression.Brotli, 4))
+
+    def test_gzip(self):
+        response = self.compress(self.json(headers={"ETag": '"v1"'}), accept="br;q=0, gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(int(response["Content-Length"]), len(response.content))
+        self.assertEqual(response["ETag"], 'W/"v1"')
+        self.assertEqual(zlib.decompress(response.content, 31), self.body)
+        # Refused with q=0: the same body, but it still varies on the header
+        response = self.compress(self.json(), accept="gzip;q=0")
+        self.assertNotIn("Content-Encoding", response)
+        self.assertEqual((response.content, response["Vary"]), (self.body, "Accept-Encoding"))
+
+    def test_passed_through(self):
+        cases = {
+            "under min size": self.json(b'{"id": 1}'),
+            "unlisted type": HttpResponse(self.body, content_type="image/png"),
+            "already encoded": self.json(headers={"Content-Encoding": "br"}),
+            "range": self.json(status=206),
+        }
+        for name, response in cases.items():
+            with self.subTest(name):
+                content = response.content
+                response = self.compress(response)
+                self.assertEqual(response.content, content)
+                self.assertNotIn("Vary", response)
+                self.assertEqual(response.get("Content-Encoding"), cases[name].get("Content-Encoding"))
+
+    def test_min_size(self):
+        small = self.body[:100]
+        self.assertNotIn("Content-Encoding", self.compress(self.json(small)))
+        response = self.compress(self.json(small), COMPRESSION_MIN_SIZE=50)
+        self.assertEqual(zlib.decompress(response.content, 31), small)
+
+    def test_levels_override_defaults(self):
+        levels = compression.merged_levels({"text/csv": {"gzip": 9}, "text/plain": None, "text/x-log": {"gzip": 1}})
+        self.assertEqual(levels["text/csv"], {"zstd": 3, "br": 4, "gzip": 9})
+        self.assertEqual(levels["application/json"], compression.DEFAULT_LEVELS["application/json"])
+        self.assertNotIn("text/plain", levels)
+        self.assertEqual(levels["text/x-log"], {"gzip": 1})
+        self.assertEqual(compression.DEFAULT_LEVELS["text/csv"]["gzip"], 6)
+
+        text = HttpResponse(self.body, content_type="text/plain")
+        self.assertNotIn("Content-Encoding", self.compress(text, COMPRESSION_LEVELS={"text/plain": None}))
+
+    def test_streaming(self):
+        chunks = [b"id,name\n", b"1,Pilau\n", b"", b"2,Biryani\n"]
+
+        def check(response, compressed):
+            self.assertEqual(response["Content-Encoding"], "gzip")
+            self.assertEqual(response["Vary"], "Accept-Encoding")
+            self.assertNotIn("Content-Length", response)
+            # Each chunk decodes as it arrives; the last one ends the stream
+            decompressor = zlib.decompressobj(31)
+            decoded = [decompressor.decompress(chunk) for chunk in compressed]
+            self.assertEqual(decoded[:3], [chunk for chunk in chunks if chunk])
+            self.assertTrue(decompressor.eof)
+
+        response = StreamingHttpResponse(iter(chunks), content_type="text/csv", headers={"Content-Length": "1"})
+        response = self.compress(response)
+        check(response, list(response.streaming_content))
+
+        async def produce():
+            for chunk in chunks:
+                yield chunk
+
+        async def collect(content):
+            return [chunk async for chunk in content]
+
+        response = self.compress(StreamingHttpResponse(produce(), content_type="text/csv"))
+        check(response, async_to_sync(collect)(response.streaming_content))
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        self.addCleanup(metrics.registry.reset)
+
+    def scrape(self, address="127.0.0.1", **headers):
+        return metrics.metrics_view(RequestFactory().get("/metrics", REMOTE_ADDR=address, headers=headers))
+
+    @override_settings(DEBUG=False, METRICS_TOKEN=None)
+    def test_internal_addresses_only_without_token(self):
+        for address, status in [("127.0.0.1", 200), ("10.1.2.3", 200), ("::1", 200), ("203.0.113.5", 403)]:
+            with self.subTest(address=address):
+                self.assertEqual(self.scrape(address).status_code, status)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.scrape("203.0.113.5").status_code, 200)
+
+    @override_settings(DEBUG=True, METRICS_TOKEN="s3cret")
+    def test_token(self):
+        # Required from every address once set
+        self.assertEqual(self.scrape().status_code, 401)
+        self.assertEqual(self.scrape(Authorization="Bearer wrong").status_code, 401)
+        self.assertEqual(self.scrape("203.0.113.5", Authorization="Bearer s3cret").status_code, 200)
+
+    def test_exposition(self):
+        sample = metrics.QuerySample(threshold=5)
+        sample.count, sample.seconds = 3, 0.25
+        metrics.registry.record("api/food/<int:pk>/", "GET", 200, 0.02, 100, sample)
+        metrics.registry.record("api/food/<int:pk>/", "GET", 500, 3.0, 20)
+        metrics.registry.record('say "hi"', "POST", 201, 0.001, 0)
+
+        response = self.scrape()
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        lines = response.content.decode().splitlines()
+        labels = 'route="api/food/<int:pk>/",method="GET"'
+        for line in [
+            "# TYPE http_requests_total counter",
+            f"http_requests_total{{{labels}}} 2",
+            f"http_request_errors_total{{{labels}}} 1",
+            f"http_response_bytes_total{{{labels}}} 120",
+            f"http_sampled_requests_total{{{labels}}} 1",
+            f"db_queries_total{{{labels}}} 3",
+            f"db_query_seconds_total{{{labels}}} 0.25",
+            "# TYPE http_request_duration_seconds histogram",
+            f'http_request_duration_seconds_bucket{{{labels},le="0.01"}} 0',
+            f'http_request_duration_seconds_bucket{{{labels},le="0.025"}} 1',
+            f'http_request_duration_seconds_bucket{{{labels},le="5.0"}} 2',
+            f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2',
+            f"http_request_duration_seconds_count{{{labels}}} 2",
+            'http_requests_total{route="say \\"hi\\"",method="POST"} 1',
+        ]:
+            self.assertIn(line, lines)
+
+    def test_query_sample(self):
+        def view(request):
+            for _ in range(5):
+                User.objects.filter(pk=1).exists()
+            User.objects.count()
+            return HttpResponse("ok")
+
+        with override_settings(METRICS_SAMPLE_RATE=1.0, METRICS_SERVER_TIMING=True):
+            middleware = metrics.MetricsMiddleware(view)
+        request = RequestFactory().get("/")
+        response = middleware(request)
+
+        sample = request._metrics_sample
+        self.assertEqual((sample.count, sample.duplicates, sample.n_plus_one), (6, 4, 1))
+        self.assertIn('desc="6 queries"', response["Server-Timing"])
+        self.assertNotIn(sample, connection.execute_wrappers)
+        stats = metrics.registry.routes[("unmatched", "GET")]
+        self.assertEqual((stats.requests, stats.queries, stats.n_plus_one, stats.response_bytes), (1, 6, 1, 2))
+
+        # Unsampled requests are counted without SQL instrumentation
+        with override_settings(METRICS_SAMPLE_RATE=0.0):
+            middleware = metrics.MetricsMiddleware(view)
+        middleware(RequestFactory().get("/"))
+        self.assertEqual((stats.requests, stats.sampled, stats.queries), (2, 1, 6))
+
+
+class JSONRendererTests(SimpleTestCase):
+    dhaka = datetime.timezone(datetime.timedelta(hours=6))
+    data = {
+        "price": Decimal("349.99"),
+        "prices": [Decimal("0.10"), Decimal("1E+2"), Decimal("-7")],
+        "created_at": datetime.datetime(2025, 3, 1, 12, 30, 5, 123456, tzinfo=datetime.timezone.utc),
+        "local": datetime.datetime(2025, 3, 1, 18, 30, tzinfo=dhaka),
+        "naive": datetime.datetime(2025, 3, 1, 12, 30),
+        "day": datetime.date(2025, 3, 1),
+        "at": datetime.time(9, 15, 30, 250000),
+        "delivery": datetime.timedelta(minutes=45),
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "label": gettext_lazy("Pending"),
+        "counts": {1: 2, 3: 4},
+        "text": "Pilau \u2028 \u2029 \u09ad\u09be\u09a4",
+        "nested": [{"ok": True, "none": None, "ratio": 0.5, "big": 2 ** 70}],
+    }
+
+    def render(self, renderer, data, media_type=None):
+        return renderer.render(data, media_type)
+
+    def test_same_bytes_as_stock(self):
+        cases = {
+            "everything": self.data,
+            # Ints wider than 64 bits fall back to the stdlib path
+            "native": {key: value for key, value in self.data.items() if key != "nested"},
+            "list": [self.data["price"], self.data["created_at"], "x"],
+        }
+        for name, data in cases.items():
+            with self.subTest(name):
+                self.assertEqual(self.render(FastJSONRenderer(), data), self.render(JSONRenderer(), data))
+        indented = "application/json; indent=2"
+        self.assertEqual(
+            self.render(FastJSONRenderer(), self.data, indented), self.render(JSONRenderer(), self.data, indented)
+        )
+        self.assertEqual(FastJSONRenderer().render(None), b"")
+
+    def test_round_trip(self):
+        data = {key: value for key, value in self.data.items() if key != "nested"}
+        stock = JSONParser().parse(BytesIO(JSONRenderer().render(data)))
+        fast = FastJSONParser().parse(BytesIO(FastJSONRenderer().render(data)))
+        self.assertEqual(fast, stock)
+        self.assertEqual(fast["price"], 349.99)
+        self.assertEqual(fast["created_at"], "2025-03-01T12:30:05.123456Z")
+        self.assertEqual(fast["local"], "2025-03-01T18:30:00+06:00")
+
+    def test_parse_errors(self):
+        for body in [b"{", b'{"price": NaN}', b"[Infinity]", b"\xff"]:
+            with self.subTest(body=body):
+                with self.assertRaises(ParseError):
+                    JSONParser().parse(BytesIO(body))
+                with self.assertRaises(ParseError):
+                    FastJSONParser().parse(BytesIO(body))
@@ -0,0 +1,231 @@
+"""
+Token-bucket request throttling for DRF views.
+
+Each scope has a bucket per client that refills at a steady rate up to its
+burst size; a request takes one token or is rejected with 429 and a
+Retry-After of the time until the next token. Scopes:
+
+    anon      every unauthenticated request, per client IP
+    user      every authenticated request, per user
+    <name>    one endpoint (see throttles()), per user, or per IP when anonymous
+
+THROTTLE_RATES maps a scope to "<tokens>/<period>" (s, min, h, day), or to
+{"rate": ..., "burst": n} to allow bursts smaller or larger than one
+period's worth. Scopes missing from it are not throttled.
+
+Buckets live in THROTTLE_STORE: LocalBucketStore keeps them in process
+memory (each worker counts on its own); CacheBucketStore keeps them in the
+THROTTLE_CACHE_ALIAS cache, so all workers share them. Client IPs come from
+DRF's get_ident(), which honours NUM_PROXIES for X-Forwarded-For.
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .metrics import register_collector
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate, burst=None):
+    """"10/min" -> (tokens per second, bucket size)."""
+    count, _, period = rate.partition("/")
+    count = int(count)
+    return count / PERIODS[period.strip()[0]], burst if burst is not None else count
+
+
+def get_rate(scope):
+    value = getattr(settings, "THROTTLE_RATES", {}).get(scope)
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return parse_rate(value["rate"], value.get("burst"))
+    return parse_rate(value)
+
+
+def refill(tokens, stamp, now, rate, capacity):
+    """Take a token from a bucket; returns (tokens left, seconds to wait or 0)."""
+    tokens = min(capacity, tokens + (now - stamp) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0
+    return tokens, (1 - tokens) / rate
+
+
+class LocalBucketStore:
+    """Buckets in this process, least recently used dropped past THROTTLE_LOCAL_SIZE."""
+
+    def __init__(self):
+        self.maxsize = getattr(settings, "THROTTLE_LOCAL_SIZE", 100_000)
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+
+    def consume(self, key, rate, capacity):
+        now = time.monotonic()
+        with self.lock:
+            # A dropped bucket comes back full, which errs on the side of letting requests in
+            tokens, stamp = self.buckets.get(key, (capacity, now))
+            tokens, wait = refill(tokens, stamp, now, rate, capacity)
+            self.buckets[key] = (tokens, now)
+            self.buckets.move_to_end(key)
+            if len(self.buckets) > self.maxsize:
+                self.buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheBucketStore:
+    """
+    Buckets in a Django cache shared by all workers. The read and the write
+    are not atomic, so concurrent requests for one key can occasionally both
+    get the last token; the bound is still enforced within a request or two.
+    The cache must hold a bucket per active client: an evicted bucket
+    comes back full.
+    """
+
+    @property
+    def cache(self):
+        # Cache connections are per thread
+        return caches[getattr(settings, "THROTTLE_CACHE_ALIAS", "default")]
+
+    def consume(self, key, rate, capacity):
+        cache = self.cache
+        key = "throttle:" + key
+        now = time.time()
+        tokens, stamp = cache.get(key) or (capacity, now)
+        tokens, wait = refill(tokens, stamp, now, rate, capacity)
+        # An expired bucket would have refilled anyway
+        cache.set(key, (tokens, now), int(capacity / rate) + 1)
+        return wait
+
+    def clear(self):
+        self.cache.clear()
+
+
+_store = None
+_store_path = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store, _store_path
+    path = getattr(settings, "THROTTLE_STORE", "barirswad.throttling.LocalBucketStore")
+    if _store is None or _store_path != path:
+        with _store_lock:
+            if _store is None or _store_path != path:
+                _store, _store_path = import_string(path)(), path
+    return _store
+
+
+_rejections = Counter()
+_rejections_lock = threading.Lock()
+
+
+def throttle_stats():
+    with _rejections_lock:
+        return dict(_rejections)
+
+
+def reset_throttle_stats():
+    with _rejections_lock:
+        _rejections.clear()
+
+
+@register_collector
+def throttle_metrics():
+    lines = [
+        "# HELP throttle_rejections_total Requests rejected with 429 by scope",
+        "# TYPE throttle_rejections_total counter",
+    ]
+    for scope, count in sorted(throttle_stats().items()):
+        lines.append(f'throttle_rejections_total{{scope="{scope}"}} {count}')
+    return lines
+
+
+class BucketThrottle(BaseThrottle):
+    scope = None
+
+    def get_key(self, request):
+        """The client's bucket within the scope, or None to skip this throttle."""
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.wait_seconds = 0
+        rate = get_rate(self.scope)
+        if rate is None:
+            return True
+        key = self.get_key(request)
+        if key is None:
+            return True
+        self.wait_seconds = get_store().consume(f"{self.scope}:{key}", *rate)
+        if self.wait_seconds:
+            with _rejections_lock:
+                _rejections[self.scope] += 1
+            return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AnonThrottle(BucketThrottle):
+    scope = "anon"
+
+    def get_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.get_ident(request)
+
+
+class UserThrottle(BucketThrottle):
+    scope = "user"
+
+    def get_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class EndpointThrottle(BucketThrottle):
+    def get_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{self.get_ident(request)}"
+
+
+@lru_cache(maxsize=None)
+def endpoint_throttle(scope):
+    return type(f"EndpointThrottle[{scope}]", (EndpointThrottle,), {"scope": scope})
+
+
+class EndpointThrottles:
+    """
+    Iterable of throttle classes that reads DEFAULT_THROTTLE_CLASSES each
+    time a request iterates it, so the view follows the settings in force
+    rather than the ones at import.
+    """
+
+    def __init__(self, scope):
+        self.scope = scope
+
+    def __iter__(self):
+        yield from api_settings.DEFAULT_THROTTLE_CLASSES
+        yield endpoint_throttle(self.scope)
+
+
+def throttles(scope):
+    """
+    The default throttles plus a bucket for one endpoint, for DRF's
+    @throttle_classes(): @throttle_classes(throttles("login"))
+    """
+    return EndpointThrottles(scope)
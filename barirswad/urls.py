@@ -14,20 +14,29 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
 from django.contrib import admin
 from django.http import JsonResponse
-from django.urls import include, path
-from django.conf.urls.static import static
+from django.urls import include, path, re_path
 
 from django.conf import settings
 
+from barirswad import files
+from barirswad.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/food/', include('food.urls')),
+    path('metrics', metrics_view),
     path('', lambda request: JsonResponse({"status":"ok"})),  # Simple root path
     
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+# Served in production too (see barirswad.files); under DEBUG, runserver
+# serves STATIC_URL from the app directories before it gets here
+urlpatterns += [
+    re_path(rf"^{re.escape(settings.STATIC_URL.lstrip('/'))}(?P<path>.+)$", files.static),
+    re_path(rf"^{re.escape(settings.MEDIA_URL.lstrip('/'))}(?P<path>.+)$", files.media),
+]
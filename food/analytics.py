@@ -0,0 +1,153 @@
+"""
+Daily order rollups (OrderRollup) behind the seller dashboard.
+
+Checkout and status changes update the affected rollups inside the
+transaction that changed the orders, and a food moved to another kitchen
+takes its rollups along, so `orders/seller/stats/` never scans Order.
+rebuild() recomputes rollups from Order; `manage.py backfill_order_rollups`
+runs it to repair drift (migration 0013 did it once for existing data).
+"""
+from collections import defaultdict
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import TruncDate
+
+from .models import Order, OrderRollup
+
+STATUSES = [status for status, _ in Order.STATUS_CHOICES]
+
+METRICS = ["orders", "quantity", "revenue", *STATUSES]
+
+
+def order_day(created_at):
+    # Rollup days are UTC dates whatever the active time zone
+    return created_at.astimezone(dt_timezone.utc).date()
+
+
+def record_placed(orders):
+    """Add newly created orders (with their `food` loaded) to their rollups, in two queries."""
+    totals = defaultdict(lambda: [0, 0, 0.0, 0])
+    kitchens = {}
+    for order in orders:
+        total = totals[order_day(order.created_at), order.food_id]
+        total[0] += 1
+        total[1] += order.quantity
+        total[2] += order.total_price
+        total[3] += order.status == "pending"
+        kitchens[order.food_id] = order.food.kitchen_id
+    if not totals:
+        return
+
+    # Make sure every row exists, then add to all of them with one UPDATE
+    OrderRollup.objects.bulk_create(
+        [OrderRollup(day=day, food_id=food_id, kitchen_id=kitchens[food_id]) for day, food_id in totals],
+        ignore_conflicts=True,
+    )
+
+    def delta(index, output_field):
+        return Case(
+            *[When(day=day, food_id=food_id, then=Value(total[index])) for (day, food_id), total in totals.items()],
+            output_field=output_field,
+        )
+
+    keys = Q()
+    for day, food_id in totals:
+        keys |= Q(day=day, food_id=food_id)
+    OrderRollup.objects.filter(keys).update(
+        orders=F("orders") + delta(0, IntegerField()),
+        quantity=F("quantity") + delta(1, IntegerField()),
+        revenue=F("revenue") + delta(2, FloatField()),
+        pending=F("pending") + delta(3, IntegerField()),
+    )
+
+
+def record_status_change(order, old_status):
+    """Move `order` from `old_status` to its current status in its rollup."""
+    if old_status == order.status:
+        return
+    OrderRollup.objects.filter(day=order_day(order.created_at), food_id=order.food_id).update(**{
+        old_status: F(old_status) - 1,
+        order.status: F(order.status) + 1,
+    })
+
+
+def record_move(food_id, kitchen_id):
+    """Credit a food's rollups, past days included, to the kitchen it moved to, as rebuild() would."""
+    OrderRollup.objects.filter(food_id=food_id).exclude(kitchen_id=kitchen_id).update(kitchen_id=kitchen_id)
+
+
+def rebuild(since=None, batch_size=1000):
+    """
+    Recompute the rollups for every day from `since` (a date; None for all
+    time) from Order. Returns how many rollups were written.
+    """
+    orders = Order.objects.all()
+    rollups = OrderRollup.objects.all()
+    if since is not None:
+        orders = orders.filter(created_at__gte=datetime.combine(since, time.min, tzinfo=dt_timezone.utc))
+        rollups = rollups.filter(day__gte=since)
+
+    rows = (
+        orders.annotate(day=TruncDate("created_at", tzinfo=dt_timezone.utc))
+        .values("day", "food_id", "food__kitchen_id")
+        .annotate(
+            n_orders=Count("id"),
+            n_quantity=Sum("quantity"),
+            n_revenue=Sum("total_price"),
+            **{f"n_{status}": Count("id", filter=Q(status=status)) for status in STATUSES},
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        rollups.delete()
+        created = OrderRollup.objects.bulk_create(
+            [
+                OrderRollup(
+                    day=row["day"], food_id=row["food_id"], kitchen_id=row["food__kitchen_id"],
+                    **{metric: row[f"n_{metric}"] for metric in METRICS},
+                )
+                for row in rows.iterator(chunk_size=batch_size)
+            ],
+            batch_size=batch_size,
+        )
+    return len(created)
+
+
+def _totals(row):
+    return {
+        "orders": row["orders"] or 0,
+        "quantity": row["quantity"] or 0,
+        "revenue": round(row["revenue"] or 0, 2),
+        "status": {status: row[status] or 0 for status in STATUSES},
+    }
+
+
+def kitchen_stats(kitchens, start, end):
+    """
+    Totals, per-kitchen and per-day breakdowns of the rollups of `kitchens`
+    (a Kitchen queryset) between the dates `start` and `end` inclusive.
+    """
+    rollups = OrderRollup.objects.filter(kitchen__in=kitchens, day__range=(start, end))
+    # Aliased: an annotation may not shadow the field it sums
+    sums = {f"sum_{metric}": Sum(metric) for metric in METRICS}
+
+    def unalias(row):
+        return {metric: row[f"sum_{metric}"] for metric in METRICS}
+
+    by_kitchen = rollups.values("kitchen_id", "kitchen__name").annotate(**sums).order_by("kitchen_id")
+    by_day = [
+        {"day": row["day"], **unalias(row)}
+        for row in rollups.values("day").annotate(**sums).order_by("day")
+    ]
+
+    totals = {metric: sum(row[metric] or 0 for row in by_day) for metric in METRICS}
+    return {
+        "totals": _totals(totals),
+        "kitchens": [
+            {"id": row["kitchen_id"], "name": row["kitchen__name"], **_totals(unalias(row))}
+            for row in by_kitchen
+        ],
+        "days": [{"day": row["day"].isoformat(), **_totals(row)} for row in by_day],
+    }
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class FoodConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'food'
+
+    def ready(self):
+        from barirswad.metrics import register_collector
+
+        from . import checks, signals  # noqa: F401
+        from .cache import response_cache_metrics
+
+        register_collector(response_cache_metrics)
@@ -0,0 +1,188 @@
+"""
+Async (ASGI-native) versions of the hot read endpoints.
+
+DRF views are sync-only, so these are plain Django async views. Querysets are
+built with the same filter backends and the rows are loaded with the async
+ORM as values() rows and rendered by the same projections as the sync list
+endpoints (see food.projections). Responses go through the same JSON renderer as
+the sync endpoints so the bytes match.
+"""
+from functools import wraps
+from operator import itemgetter
+from math import ceil
+
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated, NotFound
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from barirswad.renderers import FastJSONRenderer
+from user.authentication import token_cache
+
+from . import events, export
+from .cache import acached_response
+from .feed import HOMEPAGE_KITCHENS, group_by_kitchen, homepage_kitchens, top_foods_queryset
+from .models import Food, Kitchen, Order
+from .pagination import KeysetPagination
+from .projections import FoodProjection, KitchenProjection, OrderProjection
+from .views import FoodViewSet, KitchenViewSet, filter_orders
+
+renderer = FastJSONRenderer()
+
+
+def render(data, status=200):
+    return HttpResponse(renderer.render(data), status=status, content_type="application/json")
+
+
+def async_api_view(view):
+    """Render DRF API exceptions the way DRF's own handler would."""
+    @wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        if request.method != "GET":
+            return render({"detail": f'Method "{request.method}" not allowed.'}, status=405)
+        try:
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+            response = render(data, status=exc.status_code)
+            if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                response["WWW-Authenticate"] = "Token"
+            return response
+
+    return wrapped
+
+
+async def authenticate(request):
+    """Async equivalent of CachedTokenAuthentication."""
+    parts = request.headers.get("Authorization", "").split()
+    if not parts or parts[0].lower() != "token":
+        raise NotAuthenticated()
+    if len(parts) != 2:
+        raise AuthenticationFailed("Invalid token header. No credentials provided.")
+
+    key = parts[1]
+    entry = await token_cache.aget(key)
+    if entry is None:
+        try:
+            token = await Token.objects.select_related("user__profile").aget(key=key)
+        except Token.DoesNotExist:
+            raise AuthenticationFailed("Invalid token.")
+        if not token.user.is_active:
+            raise AuthenticationFailed("User inactive or deleted.")
+        entry = (token.user, token)
+        await token_cache.aset(key, entry)
+    return entry[0]
+
+
+async def paginate(request, queryset, page_size):
+    """PageNumberPagination with the async ORM; same response keys and links."""
+    count = await queryset.acount()
+    num_pages = max(1, ceil(count / page_size))
+    try:
+        page = int(request.GET.get("page", 1))
+    except ValueError:
+        raise NotFound("Invalid page.")
+    if not 1 <= page <= num_pages:
+        raise NotFound("Invalid page.")
+
+    offset = (page - 1) * page_size
+    rows = [row async for row in queryset[offset:offset + page_size]]
+
+    url = request.build_absolute_uri()
+    previous = None
+    if page > 1:
+        previous = remove_query_param(url, "page") if page == 2 else replace_query_param(url, "page", page - 1)
+    links = {
+        "count": count,
+        "next": replace_query_param(url, "page", page + 1) if page < num_pages else None,
+        "previous": previous,
+    }
+    return rows, links
+
+
+def filtered_queryset(viewset_class, request):
+    """Run a viewset's queryset and filter backends without dispatching it."""
+    view = viewset_class(request=Request(request), format_kwarg=None, action="list", kwargs={})
+    return view, view.filter_queryset(view.get_queryset())
+
+
+@async_api_view
+@acached_response(Kitchen, Food)
+async def homepage(request):
+    kitchens = KitchenProjection(request)
+    rows, links = await paginate(request, kitchens.values(homepage_kitchens()), HOMEPAGE_KITCHENS)
+    kitchen_data = kitchens.render(rows)
+
+    kitchen_ids = [k["id"] for k in kitchen_data]
+    foods = FoodProjection(request)
+    food_rows = [f async for f in foods.values(top_foods_queryset(kitchen_ids))]
+    foods_by_kitchen = group_by_kitchen(kitchen_ids, foods.render(food_rows), key=itemgetter("kitchen"))
+    for k in kitchen_data:
+        k["foods"] = foods_by_kitchen[k["id"]]
+    return render({**links, "results": kitchen_data})
+
+
+async def list_view(viewset_class, request):
+    view, queryset = filtered_queryset(viewset_class, request)
+    projection = view.projection_class(request)
+    rows, links = await paginate(request, projection.values(queryset), view.paginator.page_size)
+    return render({**links, "results": projection.render(rows)})
+
+
+@async_api_view
+@acached_response(Food, Kitchen)
+async def food_list(request):
+    return await list_view(FoodViewSet, request)
+
+
+@async_api_view
+@acached_response(Kitchen)
+async def kitchen_list(request):
+    return await list_view(KitchenViewSet, request)
+
+
+@async_api_view
+async def user_orders(request):
+    user = await authenticate(request)
+    projection = OrderProjection()
+    queryset = projection.values(filter_orders(Order.objects.filter(user=user), request.GET))
+
+    paginator = KeysetPagination()
+    page = await paginator.apaginate_queryset(queryset, request)
+    return render({"next": paginator.get_next_link(), "results": projection.render(page)})
+
+
+@async_api_view
+async def seller_orders_export(request):
+    """ASGI twin of views.seller_orders_export; a sync iterator would be buffered whole under ASGI."""
+    user = await authenticate(request)
+    orders = filter_orders(Order.objects.filter(owner_id=str(user.id)), request.GET)
+    writer = export.get_writer(request.GET)
+    return StreamingHttpResponse(
+        export.astream(await export.aexport_queryset(orders, request.GET), writer),
+        content_type=writer.content_type,
+        headers=export.headers(writer),
+    )
+
+
+@async_api_view
+async def order_events(request):
+    """
+    Server-Sent Events stream of status changes to the caller's orders and
+    their kitchens' orders. Send Last-Event-ID (or ?lastEventId=) to resume.
+    """
+    user = await authenticate(request)
+    last_id = request.headers.get("Last-Event-ID") or request.GET.get("lastEventId")
+    if last_id is not None:
+        try:
+            last_id = int(last_id)
+        except ValueError:
+            return render({"error": "Invalid Last-Event-ID"}, status=400)
+
+    return StreamingHttpResponse(
+        events.stream(user, last_id),
+        content_type="text/event-stream",
+        # X-Accel-Buffering stops nginx from holding events back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
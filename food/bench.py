@@ -0,0 +1,80 @@
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from .models import Food
+
+
+@contextmanager
+def isolated_database(name=None, options=None):
+    """
+    Run a benchmark against a throwaway test database, never the real one.
+    `name` puts it in a file; by default SQLite runs it in memory, unlike the
+    test suite's file (see barirswad.runner). `options` replaces the
+    connection OPTIONS for the run. Threads pick both up, since every
+    thread's connection shares this settings dict.
+    """
+    settings_dict = connection.settings_dict
+    saved_test, saved_options = dict(settings_dict["TEST"]), settings_dict.get("OPTIONS", {})
+    # create_test_db() returns the test database's name, not the one it replaced
+    old_name = settings_dict["NAME"]
+    settings_dict["TEST"]["NAME"] = name
+    if options is not None:
+        settings_dict["OPTIONS"] = options
+
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        settings_dict["TEST"], settings_dict["OPTIONS"] = saved_test, saved_options
+
+
+def measure(func, repeat):
+    """Call `func` `repeat` times and return per-call latencies in ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    return {
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "p99_ms": round(percentile(samples, 99), 3),
+    }
+
+
+def demo_foods(rng, count):
+    """`count` unsaved Food rows: serializing them needs no database."""
+    now = timezone.now()
+    return [
+        Food(
+            id=i + 1,
+            name=rng.choice(["Chicken Biryani", "Beef Tehari", "Morog Polao", "Khichuri"]),
+            kitchen_id=rng.randint(1, 50),
+            kitchen_name="Demo Kitchen",
+            price=round(rng.uniform(120, 650), 2),
+            description="Fragrant rice slow-cooked with spices — served with salad and borhani.",
+            quantity=rng.randint(1, 20),
+            delivery_time=rng.randint(10, 90),
+            image=f"foods/demo_{i % 20}.jpg",
+            image_variants={"thumb": {"webp": f"foods/variants/demo_{i % 20}_thumb.webp"}},
+            created_at=now - timedelta(minutes=i),
+        )
+        for i in range(count)
+    ]
@@ -0,0 +1,251 @@
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+
+def get_cache():
+    return caches[getattr(settings, "RESPONSE_CACHE_ALIAS", "default")]
+
+
+def _version_key(model):
+    return f"food:version:{model._meta.label_lower}"
+
+
+def _modified_key(model):
+    return f"food:modified:{model._meta.label_lower}"
+
+
+def bump_version(model):
+    """Invalidate every cached response built from `model`, in every process sharing the cache."""
+    cache = get_cache()
+    # A fresh value rather than incr(): file and database caches increment
+    # with a read and a write, so two concurrent bumps could land on the same
+    # number. A timestamp also never repeats a value that old entries used
+    cache.set(_version_key(model), time.time_ns(), timeout=None)
+    cache.set(_modified_key(model), time.time(), timeout=None)
+
+
+def get_versions(models):
+    cache = get_cache()
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [str(versions[key]) for key in keys]
+
+
+async def aget_versions(models):
+    cache = get_cache()
+    keys = [_version_key(model) for model in models]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, time.time_ns(), timeout=None)
+            versions[key] = await cache.aget(key)
+    return [str(versions[key]) for key in keys]
+
+
+def _latest_update(latest):
+    # No rows at all: nothing older can be vouched for, so call it now
+    return latest.timestamp() if latest is not None else time.time()
+
+
+def get_last_modified(models):
+    """Newest change to any of `models`, in epoch seconds, without touching the rows."""
+    cache = get_cache()
+    keys = {_modified_key(model): model for model in models}
+    stamps = cache.get_many(keys)
+    for key, model in keys.items():
+        if key not in stamps:
+            # Only after a cache restart or eviction
+            latest = model.objects.aggregate(latest=Max("updated_at"))["latest"]
+            cache.add(key, _latest_update(latest), timeout=None)
+            stamps[key] = cache.get(key)
+    return max(stamps.values())
+
+
+async def aget_last_modified(models):
+    cache = get_cache()
+    keys = {_modified_key(model): model for model in models}
+    stamps = await cache.aget_many(keys)
+    for key, model in keys.items():
+        if key not in stamps:
+            latest = (await model.objects.aaggregate(latest=Max("updated_at")))["latest"]
+            await cache.aadd(key, _latest_update(latest), timeout=None)
+            stamps[key] = await cache.aget(key)
+    return max(stamps.values())
+
+
+def _cache_key(request, renderer_format, versions):
+    params = sorted(request.GET.lists())
+    raw = "|".join([
+        request.build_absolute_uri(request.path),
+        repr(params),
+        renderer_format,
+        *versions,
+    ])
+    return "food:response:" + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def response_cache_key(request, models):
+    renderer = getattr(request, "accepted_renderer", None)
+    return _cache_key(request, renderer.format if renderer else "", get_versions(models))
+
+
+def _validators(key, last_modified):
+    """
+    The response key doubles as a strong ETag: it changes with the URL, the
+    format and every model version, so it is known before the view runs.
+    """
+    # HTTP dates have one-second resolution
+    return quote_etag(key.rsplit(":", 1)[-1]), int(last_modified)
+
+
+def _not_modified(request, etag, last_modified):
+    """A 304/412 for a conditional request against the stored response, or None."""
+    # If-None-Match takes precedence over If-Modified-Since
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        _record("not_modified")
+        _set_validators(response, etag, last_modified)
+    return response
+
+
+def _set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    # Clients may keep the body but must revalidate, which is a cheap 304
+    patch_cache_control(response, no_cache=True)
+
+
+def _timeout(timeout):
+    return timeout if timeout is not None else getattr(settings, "RESPONSE_CACHE_TIMEOUT", 300)
+
+
+def _record(outcome):
+    with _stats_lock:
+        _stats[outcome] += 1
+
+
+def response_cache_stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def response_cache_metrics():
+    stats = response_cache_stats()
+    return [
+        "# HELP response_cache_requests_total Cached endpoint lookups by outcome",
+        "# TYPE response_cache_requests_total counter",
+        f'response_cache_requests_total{{outcome="hit"}} {stats["hits"]}',
+        f'response_cache_requests_total{{outcome="miss"}} {stats["misses"]}',
+        f'response_cache_requests_total{{outcome="not_modified"}} {stats["not_modified"]}',
+    ]
+
+
+def reset_response_cache_stats():
+    with _stats_lock:
+        for outcome in _stats:
+            _stats[outcome] = 0
+
+
+def cached_response(*models, timeout=None):
+    """
+    Cache successful GET responses of a DRF view, keyed on the URL, query
+    params and the current version of every model in `models`. Responses
+    carry ETag/Last-Modified. Conditional requests are only answered with a
+    304 once there is a stored 200 for the key, so a request the view would
+    refuse (bad query params) still gets the view's error.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            if request.method != "GET":
+                return view(request, *args, **kwargs)
+
+            cache = get_cache()
+            key = response_cache_key(request, models)
+            etag, last_modified = _validators(key, get_last_modified(models))
+            cached = cache.get(key)
+            if cached is not None:
+                not_modified = _not_modified(request, etag, last_modified)
+                if not_modified is not None:
+                    return not_modified
+                _record("hits")
+                data, status = cached
+                response = Response(data, status=status)
+                response["X-Cache"] = "HIT"
+            else:
+                _record("misses")
+                response = view(request, *args, **kwargs)
+                response["X-Cache"] = "MISS"
+                if response.status_code != 200:
+                    return response
+                cache.set(key, (response.data, response.status_code), _timeout(timeout))
+                not_modified = _not_modified(request, etag, last_modified)
+                if not_modified is not None:
+                    return not_modified
+            _set_validators(response, etag, last_modified)
+            return response
+
+        return wrapped
+
+    return decorator
+
+
+def acached_response(*models, timeout=None):
+    """
+    cached_response for the async views: caches the rendered bytes. Every
+    cache call goes through the async API (aget, aget_many, aset), so cache
+    I/O does not block the event loop.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            if request.method != "GET":
+                return await view(request, *args, **kwargs)
+
+            cache = get_cache()
+            key = _cache_key(request, "async", await aget_versions(models))
+            etag, last_modified = _validators(key, await aget_last_modified(models))
+            cached = await cache.aget(key)
+            if cached is not None:
+                not_modified = _not_modified(request, etag, last_modified)
+                if not_modified is not None:
+                    return not_modified
+                _record("hits")
+                content, status, content_type = cached
+                response = HttpResponse(content, status=status, content_type=content_type)
+                response["X-Cache"] = "HIT"
+            else:
+                _record("misses")
+                response = await view(request, *args, **kwargs)
+                response["X-Cache"] = "MISS"
+                if response.status_code != 200:
+                    return response
+                await cache.aset(
+                    key, (response.content, response.status_code, response["Content-Type"]), _timeout(timeout)
+                )
+                not_modified = _not_modified(request, etag, last_modified)
+                if not_modified is not None:
+                    return not_modified
+            _set_validators(response, etag, last_modified)
+            return response
+
+        return wrapped
+
+    return decorator
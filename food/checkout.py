@@ -0,0 +1,97 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Now
+
+from . import analytics, leaderboard
+from .cache import bump_version
+from .models import MAX_ID, Food, Order
+
+
+class _OutOfStock(Exception):
+    pass
+
+
+class CheckoutError(Exception):
+    def __init__(self, message, status=400, **detail):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.detail = detail
+
+
+# Per food in one cart; the stock UPDATE and price arithmetic stay in range
+MAX_QUANTITY = 1000
+
+
+def parse_cart(items):
+    """Validate [{"food": id, "quantity": n}, ...] and merge repeated foods."""
+    if not isinstance(items, list) or not items:
+        raise CheckoutError("Items required")
+
+    cart = {}
+    for item in items:
+        try:
+            food_id = int(item["food"])
+            quantity = int(item.get("quantity", 1))
+        except (KeyError, TypeError, ValueError, OverflowError, AttributeError):
+            raise CheckoutError("Invalid item format")
+        if not 1 <= food_id <= MAX_ID:
+            raise CheckoutError("Invalid food id")
+        if quantity < 1:
+            raise CheckoutError("Quantity must be at least 1", food=food_id)
+        cart[food_id] = cart.get(food_id, 0) + quantity
+        if cart[food_id] > MAX_QUANTITY:
+            raise CheckoutError(f"Quantity must be at most {MAX_QUANTITY}", food=food_id)
+    return cart
+
+
+def place_order(user, cart):
+    """
+    Create one Order per cart entry, decrementing stock atomically.
+
+    Stock for the whole cart is taken by one conditional UPDATE whose
+    `quantity >= n` guard is evaluated per food, so two buyers racing for the
+    last units can never both succeed and the loser's cart is rolled back.
+    """
+    foods = {
+        food.id: food
+        for food in Food.objects.filter(id__in=cart)
+        .select_related("kitchen")
+        .only("id", "name", "price", "kitchen_name", "kitchen__owner_id")
+    }
+    missing = [food_id for food_id in cart if food_id not in foods]
+    if missing:
+        raise CheckoutError("Food not found", status=404, food=missing[0])
+
+    for food in foods.values():
+        # Profile is only loaded for users who actually own the kitchen
+        if str(food.kitchen.owner_id) == str(user.id) and user.profile.role == "seller":
+            raise CheckoutError("Sellers cannot order their own food", status=403, food=food.id)
+
+    wanted = Case(
+        *[When(id=food_id, then=Value(quantity)) for food_id, quantity in cart.items()],
+        output_field=IntegerField(),
+    )
+    try:
+        with transaction.atomic():
+            taken = Food.objects.filter(id__in=cart, quantity__gte=wanted).update(
+                quantity=F("quantity") - wanted, updated_at=Now()
+            )
+            if taken != len(cart):
+                raise _OutOfStock
+
+            orders = Order.objects.bulk_create([
+                Order(user=user, food=foods[food_id], quantity=quantity,
+                      total_price=foods[food_id].price * quantity, owner_id=foods[food_id].kitchen.owner_id)
+                for food_id, quantity in cart.items()
+            ])
+            analytics.record_placed(orders)
+            leaderboard.record_orders(Counter(foods[food_id].kitchen_id for food_id in cart))
+            transaction.on_commit(lambda: bump_version(Food))
+    except _OutOfStock:
+        # Only the failure path pays for finding out which item ran short
+        short = Food.objects.filter(id__in=cart, quantity__lt=wanted).values_list("id", flat=True).first()
+        raise CheckoutError("Insufficient stock", status=409, food=short)
+    return orders
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Warning, register
+
+
+@register(deploy=True)
+def check_response_cache(app_configs, **kwargs):
+    """Cache versions are bumped by other processes too (workers, management commands)."""
+    alias = getattr(settings, "RESPONSE_CACHE_ALIAS", "default")
+    if isinstance(caches[alias], LocMemCache):
+        return [Warning(
+            f"RESPONSE_CACHE_ALIAS '{alias}' is a LocMemCache, so writes in one process are never seen "
+            "by the others and they keep serving (and answering 304 to) stale responses.",
+            hint="Set CACHE_URL to a cache every process shares, e.g. redis://.",
+            id="food.W001",
+        )]
+    return []
@@ -0,0 +1,114 @@
+"""
+Copies of names kept on child rows so listing and search never join:
+
+    Food.kitchen_name     <- Kitchen.name
+    Kitchen.owner_name    <- UserProfile.name  (Kitchen.owner_id = str(user id))
+    Order.owner_id        <- Kitchen.owner_id of the order's food
+
+Renames are pushed down with one UPDATE of the children (see food.signals).
+repair() finds and fixes drift left by writes that bypassed the ORM, walking
+kitchens in id-ordered chunks so large tables are never locked at once.
+"""
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Now
+
+from user.models import UserProfile
+
+from .cache import bump_version
+from .models import Food, Kitchen, Order
+
+
+def _updated(model, count):
+    if count:
+        transaction.on_commit(lambda: bump_version(model))
+    return count
+
+
+def sync_kitchen_name(kitchen_id, name):
+    """Copy a kitchen's name to its foods; returns how many were stale."""
+    stale = Food.objects.filter(kitchen_id=kitchen_id).exclude(kitchen_name=name)
+    return _updated(Food, stale.update(kitchen_name=name, updated_at=Now()))
+
+
+def sync_owner_name(user_id, name):
+    """Copy a profile's name to the user's kitchens; returns how many were stale."""
+    stale = Kitchen.objects.filter(owner_id=str(user_id)).exclude(owner_name=name)
+    return _updated(Kitchen, stale.update(owner_name=name, updated_at=Now()))
+
+
+def _stale_orders(**filters):
+    return Order.objects.filter(**filters).exclude(owner_id=F("food__kitchen__owner_id"))
+
+
+def _food_owner():
+    return Subquery(Kitchen.objects.filter(foods=OuterRef("food_id")).values("owner_id")[:1])
+
+
+def sync_food_owner(food_id):
+    """Copy the owner of a food's kitchen to its orders, e.g. after a move; returns how many were stale."""
+    return _stale_orders(food_id=food_id).update(owner_id=_food_owner())
+
+
+def sync_kitchen_owner(kitchen_id):
+    """Copy a kitchen's owner to the orders of its foods; returns how many were stale."""
+    return _stale_orders(food__kitchen_id=kitchen_id).update(owner_id=_food_owner())
+
+
+def _stale_foods(first, last):
+    return Food.objects.filter(kitchen_id__gte=first, kitchen_id__lte=last).exclude(kitchen_name=F("kitchen__name"))
+
+
+def _stale_owner_names(first, last):
+    """{kitchen id: profile name} for the kitchens in the range whose owner_name is stale."""
+    kitchens = list(Kitchen.objects.filter(id__range=(first, last)).values_list("id", "owner_id", "owner_name"))
+    # owner_id is a string; looking profiles up by integer id keeps the join indexed
+    user_ids = {int(owner_id) for _, owner_id, _ in kitchens if owner_id.isdigit()}
+    names = dict(UserProfile.objects.filter(uid_id__in=user_ids).values_list("uid_id", "name"))
+    return {
+        kitchen_id: names[int(owner_id)]
+        for kitchen_id, owner_id, owner_name in kitchens
+        # Kitchens whose owner has no profile have nothing to copy
+        if owner_id.isdigit() and names.get(int(owner_id), owner_name) != owner_name
+    }
+
+
+def chunks(chunk_size):
+    """(first, last) kitchen id ranges of at most `chunk_size` kitchens."""
+    after = 0
+    while True:
+        ids = list(Kitchen.objects.filter(id__gt=after).order_by("id").values_list("id", flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids[0], ids[-1]
+        after = ids[-1]
+
+
+def repair(chunk_size=1000, dry_run=False):
+    """
+    Fix every stale copy, one transaction per chunk of kitchens. Returns
+    (stale foods, stale kitchens, stale orders); with dry_run they are only
+    counted.
+    """
+    foods = kitchens = orders = 0
+    for first, last in chunks(chunk_size):
+        stale_orders = _stale_orders(food__kitchen_id__gte=first, food__kitchen_id__lte=last)
+        if dry_run:
+            foods += _stale_foods(first, last).count()
+            kitchens += len(_stale_owner_names(first, last))
+            orders += stale_orders.count()
+            continue
+        with transaction.atomic():
+            kitchen_names = Kitchen.objects.filter(id=OuterRef("kitchen_id")).values("name")[:1]
+            foods += _updated(Food, _stale_foods(first, last).update(
+                kitchen_name=Subquery(kitchen_names), updated_at=Now()
+            ))
+            owner_names = _stale_owner_names(first, last)
+            if owner_names:
+                names = Case(*[When(id=kitchen_id, then=Value(name)) for kitchen_id, name in owner_names.items()])
+                kitchens += _updated(Kitchen, Kitchen.objects.filter(id__in=owner_names).update(
+                    owner_name=names, updated_at=Now()
+                ))
+            # Order lists are not cached, so there is no version to bump
+            orders += stale_orders.update(owner_id=_food_owner())
+    return foods, kitchens, orders
@@ -0,0 +1,299 @@
+"""
+Order status push over Server-Sent Events.
+
+update_order_status logs every status change as an OrderEvent and hands it
+to the broker once the transaction commits. Each ASGI worker fans events
+out in process to the streams subscribed to the buyer's and the kitchen
+owner's channels, so an idle stream is a parked coroutine that does no
+polling of its own. Django would also give each request a sync thread of
+its own until the response closes; barirswad.handlers serves the stream
+path (ASGI_STREAM_PATHS) without one, so all streams share asgiref's single
+sync thread and its database connection for their setup queries.
+
+ORDER_EVENTS_BROKER picks how events reach the worker holding the stream:
+
+    food.events.LocalBroker     publishes straight to streams in the same
+                                process (tests, or one ASGI process
+                                serving both the writes and the streams)
+    food.events.DatabaseBroker  one poller per worker reads new OrderEvent
+                                rows, so writes from any process (e.g. the
+                                WSGI server) reach streams in every worker
+
+A client that reconnects with Last-Event-ID is replayed what it missed from
+the OrderEvent log before live events resume.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import Max, Q
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+
+from barirswad.renderers import FastJSONRenderer
+
+from .models import OrderEvent
+
+logger = logging.getLogger(__name__)
+
+# Seconds between keep-alive comments on an idle stream; proxies drop
+# connections that stay silent for too long
+HEARTBEAT_SECONDS = 15
+# How long clients wait before reconnecting (the SSE `retry` field)
+RETRY_MS = 3000
+# A stream that falls this far behind is closed; the client resumes from the log
+QUEUE_SIZE = 100
+# Resuming further back than this sends a `reset` instead of the backlog
+REPLAY_LIMIT = 500
+# DatabaseBroker: how long an id the poller skipped is looked for again,
+# and how many such ids it looks for at once
+LATE_COMMIT_SECONDS = 30
+MAX_GAPS = 500
+
+EVENT_FIELDS = ("id", "order_id", "user_id", "owner_id", "status", "previous", "created_at")
+
+_renderer = FastJSONRenderer()
+_datetime = serializers.DateTimeField().to_representation
+
+
+def channels_for(user):
+    """Channels a user is subscribed to: their orders, and their kitchens' orders."""
+    return [f"user:{user.id}", f"owner:{user.id}"]
+
+
+def event_channels(event):
+    return [f"user:{event['user_id']}", f"owner:{event['owner_id']}"]
+
+
+def record_status_change(order, previous):
+    """Log a status change of `order` (with food__kitchen loaded) and publish it on commit."""
+    if previous == order.status:
+        return
+    event = OrderEvent.objects.create(
+        order=order, user_id=order.user_id, owner_id=order.food.kitchen.owner_id,
+        status=order.status, previous=previous,
+    )
+    data = {field: getattr(event, field) for field in EVENT_FIELDS}
+    transaction.on_commit(lambda: get_broker().publish(data))
+
+
+class Subscription:
+    """One stream's queue; safe to feed from any thread."""
+
+    def __init__(self, channels):
+        self.channels = channels
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        if self.overflowed:
+            return
+        if self.queue.full():
+            # Wake the stream with None so it closes and the client resumes
+            # from the log rather than silently skipping events
+            self.overflowed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(None)
+        else:
+            self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class LocalBroker:
+    """In-process pub/sub: publish() delivers to this process's subscribers."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channels = {}
+
+    async def asubscribe(self, channels):
+        return self.subscribe(channels)
+
+    def subscribe(self, channels):
+        subscription = Subscription(channels)
+        with self.lock:
+            for channel in channels:
+                self.channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.channels.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.channels[channel]
+
+    def publish(self, event):
+        self.deliver(event)
+
+    def deliver(self, event):
+        with self.lock:
+            subscribers = set()
+            for channel in event_channels(event):
+                subscribers.update(self.channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(event)
+
+
+class DatabaseBroker(LocalBroker):
+    """
+    Feeds local subscribers from the OrderEvent table: one query per
+    ORDER_EVENTS_POLL_INTERVAL per worker while any stream is open, however
+    many streams that is. publish() does nothing, the logged row is the message.
+
+    Ids are handed out at insert, not at commit, so an event can become
+    visible after others with higher ids. The poller remembers the ids it
+    skipped over and reads them again until they show up, or until
+    LATE_COMMIT_SECONDS have passed and they were rolled back.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.poller = None
+        self.starting = None
+
+    async def asubscribe(self, channels):
+        # The cursor is read before the subscription exists, so every event
+        # committed after this returns is polled
+        while self.poller is None or self.poller.done():
+            if self.starting is None or self.starting.done():
+                self.starting = asyncio.ensure_future(self.start())
+            await asyncio.shield(self.starting)
+        return self.subscribe(channels)
+
+    def unsubscribe(self, subscription):
+        super().unsubscribe(subscription)
+        with self.lock:
+            idle = not self.channels
+        if idle and self.poller is not None:
+            self.poller.cancel()
+            self.poller = None
+
+    def publish(self, event):
+        pass
+
+    async def start(self):
+        last, gaps = await sync_to_async(self.cursor)()
+        self.poller = asyncio.get_running_loop().create_task(self.poll(last, gaps))
+
+    def cursor(self):
+        """(newest event id, {id missing below it: when it was noticed}) to start polling from."""
+        try:
+            ids = list(OrderEvent.objects.order_by("-id").values_list("id", flat=True)[:MAX_GAPS])
+        except DatabaseError:
+            close_old_connections()
+            raise
+        if not ids:
+            return 0, {}
+        present, now = set(ids), time.monotonic()
+        return ids[0], {i: now for i in range(ids[-1], ids[0]) if i not in present}
+
+    def fetch(self, last, gaps):
+        try:
+            query = Q(id__gt=last) | Q(id__in=list(gaps)) if gaps else Q(id__gt=last)
+            return list(OrderEvent.objects.filter(query).order_by("id").values(*EVENT_FIELDS)[:REPLAY_LIMIT])
+        except DatabaseError:
+            # Drop a broken connection so the next poll opens a fresh one
+            close_old_connections()
+            raise
+
+    async def poll(self, last, gaps):
+        interval = getattr(settings, "ORDER_EVENTS_POLL_INTERVAL", 1.0)
+        rows = []
+        while True:
+            if len(rows) < REPLAY_LIMIT:
+                await asyncio.sleep(interval)
+            try:
+                rows = await sync_to_async(self.fetch)(last, gaps)
+            except DatabaseError:
+                logger.exception("Polling order events failed")
+                rows = []
+                continue
+            now = time.monotonic()
+            for row in rows:
+                if gaps.pop(row["id"], None) is None:
+                    gaps.update(dict.fromkeys(range(max(last + 1, row["id"] - MAX_GAPS), row["id"]), now))
+                    last = row["id"]
+                self.deliver(row)
+            for gap in [gap for gap, noticed in gaps.items() if now - noticed > LATE_COMMIT_SECONDS]:
+                del gaps[gap]
+            for gap in sorted(gaps)[:-MAX_GAPS]:
+                del gaps[gap]
+
+
+_broker = None
+_broker_path = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker, _broker_path
+    path = getattr(settings, "ORDER_EVENTS_BROKER", "food.events.DatabaseBroker")
+    with _broker_lock:
+        if _broker is None or _broker_path != path:
+            _broker, _broker_path = import_string(path)(), path
+        return _broker
+
+
+def format_event(event):
+    data = {
+        "order": event["order_id"],
+        "status": event["status"],
+        "previous": event["previous"],
+        "created_at": _datetime(event["created_at"]),
+    }
+    return f"id: {event['id']}\nevent: order-status\ndata: {_renderer.render(data).decode()}\n\n"
+
+
+def history(user):
+    return OrderEvent.objects.filter(Q(user=user) | Q(owner_id=str(user.id)))
+
+
+async def stream(user, last_id=None):
+    """The text/event-stream body for `user`, resuming after event `last_id` if given."""
+    broker = get_broker()
+    subscription = await broker.asubscribe(channels_for(user))
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+
+        # Subscribed first, so nothing committed during the replay is lost;
+        # anything seen twice is skipped by id below
+        if last_id is not None:
+            backlog = history(user).filter(id__gt=last_id).order_by("id").values(*EVENT_FIELDS)
+            rows = [row async for row in backlog[:REPLAY_LIMIT + 1]]
+            if len(rows) > REPLAY_LIMIT:
+                # Too far behind to replay: tell the client to reload its
+                # orders, and resume from the newest event from here on
+                last_id = (await history(user).aaggregate(last=Max("id")))["last"]
+                yield f"id: {last_id}\nevent: reset\ndata: {{}}\n\n"
+            else:
+                for row in rows:
+                    last_id = row["id"]
+                    yield format_event(row)
+
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                return
+            if last_id is not None and event["id"] <= last_id:
+                continue
+            last_id = event["id"]
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
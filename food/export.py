@@ -0,0 +1,153 @@
+"""
+Streaming order exports, NDJSON or CSV, in the same newest-first order and
+with the same row shape as the paginated order lists (OrderProjection).
+
+Rows are read with iterator()/aiterator() in chunks of EXPORT_CHUNK_SIZE and
+written out EXPORT_BATCH_ROWS at a time, so memory stays flat whatever the
+number of orders. An interrupted export resumes with ?after=<id of the last
+order received>.
+"""
+import csv
+import io
+
+from rest_framework.exceptions import ValidationError
+
+from barirswad.renderers import FastJSONRenderer
+
+from .models import MAX_ID
+from .pagination import after_cursor
+from .projections import OrderProjection
+
+EXPORT_CHUNK_SIZE = 2000
+# Each batch is one write (and one compressed flush, see barirswad.compression)
+EXPORT_BATCH_ROWS = 500
+
+FIELDS = ["id", "food", "food_name", "kitchen_name", "quantity", "total_price", "status", "created_at"]
+
+renderer = FastJSONRenderer()
+
+
+class NDJSONWriter:
+    content_type = "application/x-ndjson"
+    extension = "ndjson"
+
+    def header(self):
+        return b""
+
+    def rows(self, rows):
+        return b"".join(renderer.render(row) + b"\n" for row in rows)
+
+
+class CSVWriter:
+    content_type = "text/csv; charset=utf-8"
+    extension = "csv"
+
+    def __init__(self):
+        self.buffer = io.StringIO()
+        self.writer = csv.DictWriter(self.buffer, FIELDS)
+
+    def _flush(self):
+        data = self.buffer.getvalue().encode()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
+
+    def header(self):
+        self.writer.writeheader()
+        return self._flush()
+
+    def rows(self, rows):
+        self.writer.writerows(rows)
+        return self._flush()
+
+
+WRITERS = {"ndjson": NDJSONWriter, "csv": CSVWriter}
+
+
+def get_writer(params):
+    """The writer for ?type= (default ndjson)."""
+    name = params.get("type") or "ndjson"
+    if name not in WRITERS:
+        raise ValidationError({"error": f"Invalid type; choose from {', '.join(WRITERS)}"})
+    return WRITERS[name]()
+
+
+def _invalid_after():
+    return ValidationError({"error": "Invalid 'after' cursor"})
+
+
+def _after_id(params):
+    after = params.get("after")
+    if not after:
+        return None
+    try:
+        after = int(after)
+    except ValueError:
+        raise _invalid_after()
+    if not 1 <= after <= MAX_ID:
+        raise _invalid_after()
+    return after
+
+
+def _ordered(queryset, position):
+    if position is not None:
+        queryset = after_cursor(queryset, position)
+    return OrderProjection().values(queryset).order_by("-created_at", "-id")
+
+
+def export_queryset(queryset, params):
+    """The values() rows to export, resumed after ?after= when given."""
+    after = _after_id(params)
+    position = None
+    if after is not None:
+        # Looked up in the caller's own orders, so other sellers' ids are unknown here
+        position = queryset.filter(id=after).values_list("created_at", "id").first()
+        if position is None:
+            raise _invalid_after()
+    return _ordered(queryset, position)
+
+
+async def aexport_queryset(queryset, params):
+    """Same as export_queryset, using the async ORM."""
+    after = _after_id(params)
+    position = None
+    if after is not None:
+        position = await queryset.filter(id=after).values_list("created_at", "id").afirst()
+        if position is None:
+            raise _invalid_after()
+    return _ordered(queryset, position)
+
+
+def stream(queryset, writer):
+    projection = OrderProjection()
+    yield writer.header()
+    batch = []
+    for row in queryset.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        batch.append(projection.row(row))
+        if len(batch) == EXPORT_BATCH_ROWS:
+            yield writer.rows(batch)
+            batch = []
+    if batch:
+        yield writer.rows(batch)
+
+
+async def astream(queryset, writer):
+    projection = OrderProjection()
+    yield writer.header()
+    batch = []
+    async for row in queryset.aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+        batch.append(projection.row(row))
+        if len(batch) == EXPORT_BATCH_ROWS:
+            yield writer.rows(batch)
+            batch = []
+    if batch:
+        yield writer.rows(batch)
+
+
+def headers(writer):
+    return {
+        "Content-Disposition": f'attachment; filename="orders.{writer.extension}"',
+        "Cache-Control": "no-store",
+        # Let nginx pass batches on as they come instead of spooling the export
+        "X-Accel-Buffering": "no",
+    }
@@ -0,0 +1,37 @@
+from operator import attrgetter
+
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import Food, Kitchen
+
+HOMEPAGE_KITCHENS = 10
+HOMEPAGE_FOODS_PER_KITCHEN = 5
+
+
+def homepage_kitchens():
+    # "id" breaks rating ties so pages never overlap or skip kitchens
+    return Kitchen.objects.all().order_by("-rating", "id")
+
+
+def top_foods_queryset(kitchen_ids, limit=HOMEPAGE_FOODS_PER_KITCHEN):
+    """Latest `limit` foods for every kitchen in `kitchen_ids`, in one query."""
+    return (
+        Food.objects.filter(kitchen_id__in=kitchen_ids)
+        .annotate(
+            kitchen_rank=Window(
+                expression=RowNumber(),
+                partition_by=[F("kitchen_id")],
+                order_by=[F("created_at").desc(), F("id").desc()],
+            )
+        )
+        .filter(kitchen_rank__lte=limit)
+        .order_by("kitchen_id", "kitchen_rank")
+    )
+
+
+def group_by_kitchen(kitchen_ids, foods, key=attrgetter("kitchen_id")):
+    grouped = {kitchen_id: [] for kitchen_id in kitchen_ids}
+    for food in foods:
+        grouped[key(food)].append(food)
+    return grouped
@@ -0,0 +1,143 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models.functions import Now
+from PIL import Image, ImageOps, features
+
+from .cache import bump_version
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels; images are never upscaled
+VARIANT_SIZES = {
+    "thumb": 320,
+    "medium": 960,
+}
+
+FORMAT_OPTIONS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "avif": {"format": "AVIF", "quality": 60},
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def available_formats():
+    formats = ["webp"] if features.check("webp") else []
+    if "avif" in features.modules and features.check("avif"):
+        formats.append("avif")
+    return formats
+
+
+def variant_dir(model_label, pk, image_name):
+    """food.Food 7 with foods/pilau.jpg -> foods/variants/food.food-7"""
+    folder = os.path.dirname(image_name)
+    return os.path.join(folder, "variants", f"{model_label.lower()}-{pk}")
+
+
+def variant_name(directory, image_name, variant, fmt):
+    """-> <directory>/pilau.jpg_thumb.webp; the full file name keeps pilau.jpg and pilau.png apart"""
+    return os.path.join(directory, f"{os.path.basename(image_name)}_{variant}.{fmt}")
+
+
+def render_variants(image_file, image_name, storage, directory):
+    """Write every size/format variant of an image into `directory` and return their storage names."""
+    with Image.open(image_file) as source:
+        source = ImageOps.exif_transpose(source)
+        source = source.convert("RGBA" if "A" in source.getbands() else "RGB")
+
+        variants = {}
+        for variant, edge in VARIANT_SIZES.items():
+            resized = source.copy()
+            resized.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+            for fmt in available_formats():
+                buffer = BytesIO()
+                resized.save(buffer, **FORMAT_OPTIONS[fmt])
+                # The directory belongs to one object, so an existing file is
+                # an earlier rendering of this same image
+                name = variant_name(directory, image_name, variant, fmt)
+                if storage.exists(name):
+                    storage.delete(name)
+                variants.setdefault(variant, {})[fmt] = storage.save(name, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def delete_variants(storage, directory, keep=()):
+    """Delete the files in `directory` that are not in `keep`."""
+    try:
+        _, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for filename in files:
+        name = os.path.join(directory, filename)
+        if name not in keep:
+            storage.delete(name)
+
+
+def process_image(model_label, pk):
+    Model = apps.get_model(model_label)
+    try:
+        obj = Model.objects.only("id", "image").get(pk=pk)
+        if not obj.image:
+            return
+        storage = obj.image.storage
+        directory = variant_dir(model_label, pk, obj.image.name)
+        with obj.image.open("rb") as image_file:
+            variants = render_variants(image_file, obj.image.name, storage, directory)
+        names = {name for formats in variants.values() for name in formats.values()}
+        # Skip the write if the image was replaced while we were resizing;
+        # the newer upload has its own job queued
+        current = Model.objects.filter(pk=pk, image=obj.image.name)
+        if current.update(image_variants=variants, updated_at=Now()):
+            bump_version(Model)
+            # Variants of the image this one replaced
+            delete_variants(storage, directory, keep=names)
+        else:
+            for name in names:
+                storage.delete(name)
+    except Exception:
+        logger.exception("Image processing failed for %s %s", model_label, pk)
+
+
+def _process_in_worker(model_label, pk):
+    try:
+        process_image(model_label, pk)
+    finally:
+        # Pool threads outlive requests, so nothing else closes their connections
+        connection.close()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "IMAGE_PIPELINE_WORKERS", 2),
+                thread_name_prefix="image-pipeline",
+            )
+    return _executor
+
+
+def submit_variants(model_label, pk):
+    return get_executor().submit(_process_in_worker, model_label, pk)
+
+
+def schedule_variants(instance):
+    """Generate variants for `instance.image` once the current transaction commits."""
+    model_label, pk = instance._meta.label, instance.pk
+
+    def submit():
+        if getattr(settings, "IMAGE_PIPELINE_ASYNC", True):
+            submit_variants(model_label, pk)
+        else:
+            process_image(model_label, pk)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,119 @@
+"""
+Materialized kitchen leaderboard (LeaderboardEntry).
+
+Ratings, deliveries, new and cancelled orders update only the affected
+entries, with single UPDATEs inside the transaction that caused them. rebuild() recomputes
+every entry from Kitchen and Order. `manage.py rebuild_leaderboard` runs it on
+a schedule to age old orders out of the velocity window and to repair drift,
+e.g. from bulk imports that bypass the hooks.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from .cache import bump_version
+from .models import Kitchen, LeaderboardEntry, Order
+
+WINDOW_DAYS = 7
+
+# ?by= value -> LeaderboardEntry column
+BOARDS = {"rating": "rating", "orders": "total_orders", "velocity": "recent_orders"}
+
+STAT_FIELDS = ["rating", "rating_count", "total_orders", "recent_orders"]
+
+
+def _changed():
+    transaction.on_commit(lambda: bump_version(LeaderboardEntry))
+
+
+def create_entry(kitchen):
+    LeaderboardEntry.objects.get_or_create(kitchen=kitchen, defaults={
+        "rating": kitchen.rating, "rating_count": kitchen.rating_count, "total_orders": kitchen.total_orders,
+    })
+    _changed()
+
+
+def sync_ratings(kitchen_ids):
+    """Copy the kitchens' just-updated rating aggregates into their entries."""
+    kitchen = Kitchen.objects.filter(id=OuterRef("kitchen_id"))
+    LeaderboardEntry.objects.filter(kitchen_id__in=kitchen_ids).update(
+        rating=Subquery(kitchen.values("rating")[:1]),
+        rating_count=Subquery(kitchen.values("rating_count")[:1]),
+        updated_at=Now(),
+    )
+    _changed()
+
+
+def record_delivery(kitchen_id):
+    LeaderboardEntry.objects.filter(kitchen_id=kitchen_id).update(
+        total_orders=F("total_orders") + 1, updated_at=Now()
+    )
+    _changed()
+
+
+def record_orders(counts):
+    """Add newly placed orders, given as {kitchen_id: count}, to the velocity board."""
+    if not counts:
+        return
+    delta = Case(
+        *[When(kitchen_id=kitchen_id, then=Value(count)) for kitchen_id, count in counts.items()],
+        output_field=IntegerField(),
+    )
+    LeaderboardEntry.objects.filter(kitchen_id__in=counts).update(
+        recent_orders=F("recent_orders") + delta, updated_at=Now()
+    )
+    _changed()
+
+
+def record_status_change(order, old_status):
+    """Take a cancelled order off the velocity board (or put it back), as rebuild() counts them."""
+    if (old_status == "cancelled") == (order.status == "cancelled"):
+        return
+    if order.created_at < timezone.now() - timedelta(days=WINDOW_DAYS):
+        return
+    delta = 1 if old_status == "cancelled" else -1
+    LeaderboardEntry.objects.filter(kitchen_id=order.food.kitchen_id).update(
+        recent_orders=F("recent_orders") + delta, updated_at=Now()
+    )
+    _changed()
+
+
+def recent_order_counts(since):
+    return dict(
+        Order.objects.filter(created_at__gte=since)
+        .exclude(status="cancelled")
+        .values_list("food__kitchen_id")
+        .annotate(n=Count("id"))
+        .order_by()
+    )
+
+
+def rebuild(batch_size=1000):
+    """
+    Recompute every entry and write only the ones that are missing or have
+    drifted. Returns how many were written.
+    """
+    recent = recent_order_counts(timezone.now() - timedelta(days=WINDOW_DAYS))
+    current = {
+        kitchen_id: tuple(stats)
+        for kitchen_id, *stats in LeaderboardEntry.objects.values_list("kitchen_id", *STAT_FIELDS)
+    }
+
+    changed = []
+    kitchens = Kitchen.objects.values_list("id", "rating", "rating_count", "total_orders")
+    for kitchen_id, *stats in kitchens.iterator(chunk_size=batch_size):
+        stats = (*stats, recent.get(kitchen_id, 0))
+        if current.get(kitchen_id) != stats:
+            changed.append(LeaderboardEntry(kitchen_id=kitchen_id, **dict(zip(STAT_FIELDS, stats))))
+
+    with transaction.atomic():
+        LeaderboardEntry.objects.bulk_create(
+            changed, batch_size=batch_size, update_conflicts=True,
+            unique_fields=["kitchen"], update_fields=[*STAT_FIELDS, "updated_at"],
+        )
+        if changed:
+            _changed()
+    return len(changed)
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from food import analytics
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily order rollups behind orders/seller/stats/ from the Order table"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="Only rebuild days from this ISO date on (default: all time)")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = parse_date(options["since"])
+            except ValueError:
+                since = None
+            if since is None:
+                raise CommandError("--since must be an ISO date, e.g. 2025-01-31")
+
+        started = time.perf_counter()
+        written = analytics.rebuild(since=since, batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} order rollups in {elapsed:.2f}s"))
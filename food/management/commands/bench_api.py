@@ -0,0 +1,318 @@
+import argparse
+import json
+import platform
+import random
+import time
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from food import analytics, leaderboard
+from food.bench import isolated_database, summarize
+from food.cache import get_cache
+from food.models import Food, Kitchen, Order
+from user.authentication import token_cache
+from user.models import UserProfile
+
+PASSWORD = "bench-password"
+
+DISHES = [
+    "Chicken Biryani", "Beef Tehari", "Kacchi", "Morog Polao", "Khichuri",
+    "Fish Curry", "Vegetable Fried Rice", "Mutton Rezala", "Egg Curry", "Dal Bhuna",
+]
+SEARCHES = ["biryani", "chi", "fish curry", "beef", "veg"]
+
+# Relative request rates of the default traffic mix; reads dominate, as in production
+DEFAULT_MIX = {
+    "homepage": 20,
+    "foods": 10,
+    "foods_search": 10,
+    "kitchens": 5,
+    "kitchens_top": 5,
+    "user_orders": 10,
+    "seller_orders": 10,
+    "seller_stats": 5,
+    "create_order": 10,
+    "rate_kitchen": 10,
+    "login": 5,
+}
+
+
+def parse_mix(value):
+    """"homepage=20,login=5" -> {"homepage": 20, "login": 5}"""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown endpoint '{name}'; choose from {', '.join(DEFAULT_MIX)}")
+        try:
+            mix[name] = int(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"weight for '{name}' must be an integer")
+    return mix
+
+
+class Traffic:
+    """Builds one realistic request for each endpoint of the mix."""
+
+    def __init__(self, rng, dataset):
+        self.rng = rng
+        self.buyers = dataset["buyers"]
+        self.sellers = dataset["sellers"]
+        self.kitchen_ids = dataset["kitchen_ids"]
+        self.food_ids = dataset["food_ids"]
+        self.kitchen_pages = max(1, len(self.kitchen_ids) // 10)
+
+    # Each returns (method, path, data, token, expected status)
+    def homepage(self):
+        return "get", f"/api/food/homepage/?page={self.rng.randint(1, min(5, self.kitchen_pages))}", None, None, 200
+
+    def foods(self):
+        return "get", f"/api/food/foods/?page={self.rng.randint(1, 3)}", None, None, 200
+
+    def foods_search(self):
+        return "get", f"/api/food/foods/?search={self.rng.choice(SEARCHES)}", None, None, 200
+
+    def kitchens(self):
+        return "get", "/api/food/kitchens/", None, None, 200
+
+    def kitchens_top(self):
+        by = self.rng.choice(["rating", "orders", "velocity"])
+        return "get", f"/api/food/kitchens/top/?by={by}", None, None, 200
+
+    def user_orders(self):
+        return "get", "/api/food/orders/list/", None, self.rng.choice(self.buyers)["token"], 200
+
+    def seller_orders(self):
+        return "get", "/api/food/orders/seller/", None, self.rng.choice(self.sellers)["token"], 200
+
+    def seller_stats(self):
+        return "get", "/api/food/orders/seller/stats/", None, self.rng.choice(self.sellers)["token"], 200
+
+    def create_order(self):
+        data = {"food": self.rng.choice(self.food_ids), "quantity": self.rng.randint(1, 3)}
+        return "post", "/api/food/orders/", data, self.rng.choice(self.buyers)["token"], 201
+
+    def rate_kitchen(self):
+        data = {"rating": self.rng.randint(1, 5)}
+        return "post", f"/api/food/kitchens/{self.rng.choice(self.kitchen_ids)}/rate/", data, None, 200
+
+    def login(self):
+        buyer = self.rng.choice(self.buyers)
+        return "post", "/api/user/login/", {"email": buyer["email"], "password": PASSWORD}, None, 200
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a weighted mix of API traffic in process against a seeded throwaway database and "
+        "report throughput, p50/p95/p99 latency and queries per endpoint. --output saves the "
+        "results as JSON; --baseline compares against an earlier run and fails on regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--kitchens", type=int, default=50)
+        parser.add_argument("--foods-per-kitchen", type=int, default=20)
+        parser.add_argument("--buyers", type=int, default=50)
+        parser.add_argument("--orders", type=int, default=5000)
+        parser.add_argument("--requests", type=int, default=2000, help="Measured requests across the mix")
+        parser.add_argument("--warmup", type=int, default=200, help="Unmeasured requests first, to fill caches")
+        parser.add_argument("--mix", type=parse_mix, help="Endpoint weights, e.g. homepage=20,login=5")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Write the results to this JSON file")
+        parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.2,
+            help="Allowed relative increase in p95 latency or queries per request (default 0.2 = 20%%)",
+        )
+
+    def handle(self, *args, **options):
+        mix = {**DEFAULT_MIX, **(options["mix"] or {})}
+        mix = {name: weight for name, weight in mix.items() if weight > 0}
+        if not mix:
+            raise CommandError("--mix leaves no endpoints to run")
+        baseline = self.load(options["baseline"]) if options["baseline"] else None
+
+        # A few simulated clients send all the traffic: keep the throttle
+        # checks on the request path, at rates they can never reach
+        unthrottled = {scope: "1000000/s" for scope in getattr(settings, "THROTTLE_RATES", {})}
+        with isolated_database(), override_settings(THROTTLE_RATES=unthrottled):
+            started = time.perf_counter()
+            dataset = self.seed(options)
+            self.stdout.write(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+            get_cache().clear()
+            token_cache.clear()
+            rng = random.Random(options["seed"])
+            traffic = Traffic(rng, dataset)
+            names, weights = list(mix), list(mix.values())
+            client = Client()
+
+            for _ in range(options["warmup"]):
+                self.send(client, getattr(traffic, rng.choices(names, weights)[0])())
+
+            samples = {name: {"ms": [], "queries": [], "errors": 0} for name in names}
+            started = time.perf_counter()
+            for _ in range(options["requests"]):
+                name = rng.choices(names, weights)[0]
+                ms, queries, ok = self.send(client, getattr(traffic, name)())
+                samples[name]["ms"].append(ms)
+                samples[name]["queries"].append(queries)
+                samples[name]["errors"] += not ok
+            elapsed = time.perf_counter() - started
+
+        results = self.results(samples, elapsed, options, mix)
+        self.report(results)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+        if baseline is not None:
+            regressions = self.compare(results, baseline, options["tolerance"])
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+
+    def seed(self, options):
+        rng = random.Random(options["seed"])
+        # One hash for every account; hashing per user would dominate seeding
+        password = make_password(PASSWORD)
+
+        def users(role, count):
+            created = User.objects.bulk_create([
+                User(username=f"{role}{i}@bench.local", email=f"{role}{i}@bench.local", password=password)
+                for i in range(count)
+            ])
+            UserProfile.objects.bulk_create([
+                UserProfile(uid=user, name=f"{role.title()} {i}", role=role) for i, user in enumerate(created)
+            ])
+            tokens = Token.objects.bulk_create([Token(user=user, key=Token.generate_key()) for user in created])
+            return [{"id": user.id, "email": user.email, "token": token.key} for user, token in zip(created, tokens)]
+
+        sellers = users("seller", max(1, options["kitchens"] // 5))
+        buyers = users("user", max(1, options["buyers"]))
+        kitchens = Kitchen.objects.bulk_create([
+            Kitchen(
+                name=f"Kitchen {i}", owner_id=str(sellers[i % len(sellers)]["id"]), owner_name="Owner",
+                rating=round(rng.uniform(1, 5), 2),
+            )
+            for i in range(options["kitchens"])
+        ])
+        foods = Food.objects.bulk_create([
+            Food(
+                name=rng.choice(DISHES), kitchen=kitchen, kitchen_name=kitchen.name,
+                price=round(rng.uniform(120, 650), 2), description=f"{rng.choice(DISHES)} with salad",
+                # Enough stock that create_order never runs out mid-run
+                quantity=10**9,
+            )
+            for kitchen in kitchens for _ in range(options["foods_per_kitchen"])
+        ])
+        statuses = [status for status, _ in Order.STATUS_CHOICES]
+        Order.objects.bulk_create([
+            Order(
+                user_id=rng.choice(buyers)["id"], food=food, quantity=1,
+                total_price=food.price, status=rng.choice(statuses), owner_id=food.kitchen.owner_id,
+            )
+            for food in (rng.choice(foods) for _ in range(options["orders"]))
+        ], batch_size=1000)
+        # bulk_create skips the hooks that maintain these
+        leaderboard.rebuild()
+        analytics.rebuild()
+        return {
+            "buyers": buyers,
+            "sellers": sellers,
+            "kitchen_ids": [kitchen.id for kitchen in kitchens],
+            "food_ids": [food.id for food in foods],
+        }
+
+    def send(self, client, request):
+        method, path, data, token, expected = request
+        headers = {"HTTP_AUTHORIZATION": f"Token {token}"} if token else {}
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            if method == "get":
+                response = client.get(path, **headers)
+            else:
+                response = client.post(path, data, content_type="application/json", **headers)
+            ms = (time.perf_counter() - start) * 1000
+        return ms, len(ctx.captured_queries), response.status_code == expected
+
+    def results(self, samples, elapsed, options, mix):
+        endpoints = {}
+        for name, sample in samples.items():
+            if not sample["ms"]:
+                continue
+            endpoints[name] = {
+                "requests": len(sample["ms"]),
+                "errors": sample["errors"],
+                # In-process requests run one at a time, so this is 1 / mean latency
+                "rps": round(len(sample["ms"]) / (sum(sample["ms"]) / 1000), 1),
+                **summarize(sample["ms"]),
+                "queries_mean": round(sum(sample["queries"]) / len(sample["queries"]), 2),
+                "queries_max": max(sample["queries"]),
+            }
+        total = sum(len(sample["ms"]) for sample in samples.values())
+        return {
+            "meta": {
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "database": connection.vendor,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "options": {
+                    key: options[key]
+                    for key in ("kitchens", "foods_per_kitchen", "buyers", "orders", "requests", "warmup", "seed")
+                },
+                "mix": mix,
+            },
+            "total": {"requests": total, "seconds": round(elapsed, 3), "rps": round(total / elapsed, 1)},
+            "endpoints": endpoints,
+        }
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'endpoint':<15}{'reqs':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+            f"{'queries':>9}{'errors':>8}"
+        )
+        for name, row in results["endpoints"].items():
+            self.stdout.write(
+                f"{name:<15}{row['requests']:>6}{row['rps']:>9.1f}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}"
+                f"{row['p99_ms']:>9.2f}{row['queries_mean']:>9.2f}{row['errors']:>8}"
+            )
+        total = results["total"]
+        self.stdout.write(f"{'total':<15}{total['requests']:>6}{total['rps']:>9.1f}")
+
+    def load(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot read baseline {path}: {e}")
+
+    def compare(self, results, baseline, tolerance):
+        """Print and return the endpoints whose p95 latency or query count grew beyond `tolerance`."""
+        meta = baseline.get("meta", {})
+        if (meta.get("options"), meta.get("mix")) != (results["meta"]["options"], results["meta"]["mix"]):
+            # Cache hit rates, and so queries per request, depend on the dataset and run length
+            self.stdout.write(self.style.WARNING("Baseline was run with different options; expect noise"))
+        regressions = []
+        for name, row in results["endpoints"].items():
+            before = baseline.get("endpoints", {}).get(name)
+            if before is None:
+                continue
+            for metric in ("p95_ms", "queries_mean"):
+                if row[metric] > before[metric] * (1 + tolerance) and row[metric] - before[metric] > 0.01:
+                    regressions.append((name, metric))
+                    self.stdout.write(self.style.ERROR(
+                        f"REGRESSION {name} {metric}: {before[metric]} -> {row[metric]}"
+                    ))
+            if row["errors"] > before.get("errors", 0):
+                regressions.append((name, "errors"))
+                self.stdout.write(self.style.ERROR(f"REGRESSION {name} errors: {before['errors']} -> {row['errors']}"))
+        return regressions
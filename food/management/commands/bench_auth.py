@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from food.bench import isolated_database, measure, summarize
+from food.models import Food, Kitchen, Order
+from user.authentication import token_cache
+from user.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Measure per-request queries and latency on orders/list/ with a cold vs warm token cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--orders", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            key = self.seed(options["orders"])
+            client = Client(HTTP_AUTHORIZATION=f"Token {key}")
+
+            def cold():
+                # Every request pays for the token lookup, as TokenAuthentication does
+                token_cache.delete(key)
+                client.get("/api/food/orders/list/")
+
+            def warm():
+                client.get("/api/food/orders/list/")
+
+            self.stdout.write(f"{'mode':<6}{'queries/req':>13}{'p50 ms':>9}{'p99 ms':>9}")
+            for name, func in (("cold", cold), ("warm", warm)):
+                func()
+                with CaptureQueriesContext(connection) as ctx:
+                    samples = measure(func, options["requests"])
+                stats = summarize(samples)
+                self.stdout.write(
+                    f"{name:<6}{len(ctx.captured_queries) / options['requests']:>13.2f}"
+                    f"{stats['p50_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+                )
+
+    def seed(self, num_orders):
+        user = User.objects.create_user(username="bench@example.com", email="bench@example.com", password="x")
+        UserProfile.objects.create(uid=user, name="Bench", role="user")
+        kitchen = Kitchen.objects.create(name="Bench Kitchen", owner_id="0", owner_name="Owner")
+        food = Food.objects.create(
+            name="Biryani", kitchen=kitchen, kitchen_name=kitchen.name,
+            price=200, description="", quantity=100,
+        )
+        Order.objects.bulk_create([Order(user=user, food=food, total_price=200) for _ in range(num_orders)])
+        return Token.objects.create(user=user).key
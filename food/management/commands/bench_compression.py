@@ -0,0 +1,49 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from barirswad.compression import available_codecs
+from barirswad.renderers import FastJSONRenderer
+from food.bench import demo_foods, measure, summarize
+from food.serializers import FoodSerializer
+
+# Levels worth comparing per encoding: fastest, the middleware default, densest
+LEVELS = {"zstd": [1, 3, 9, 19], "br": [1, 4, 6, 11], "gzip": [1, 6, 9]}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compress rendered FoodSerializer pages with every installed encoding and level and report "
+        "bytes saved against CPU time, to pick COMPRESSION_LEVELS"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 1000])
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        codecs = available_codecs()
+        missing = [name for name in LEVELS if name not in codecs]
+        if missing:
+            self.stdout.write(self.style.WARNING(f"Not installed, skipped: {', '.join(missing)}"))
+        rng = random.Random(options["seed"])
+        request = RequestFactory().get("/api/food/foods/")
+
+        self.stdout.write(f"{'page':>6}{'bytes':>10}{'encoding':>10}{'level':>7}{'compressed':>12}{'ratio':>8}"
+                          f"{'p50':>11}{'MB/s':>9}")
+        for size in options["sizes"]:
+            body = FastJSONRenderer().render({
+                "count": size, "next": None, "previous": None,
+                "results": FoodSerializer(demo_foods(rng, size), many=True, context={"request": request}).data,
+            })
+            for name, codec in codecs.items():
+                for level in LEVELS[name]:
+                    compressed = codec.compress(body, level)
+                    timing = summarize(measure(lambda: codec.compress(body, level), options["repeat"]))
+                    self.stdout.write(
+                        f"{size:>6}{len(body):>10}{name:>10}{level:>7}{len(compressed):>12}"
+                        f"{len(body) / len(compressed):>7.1f}x{timing['p50_ms']:>9.3f}ms"
+                        f"{len(body) / 1000 / timing['p50_ms']:>9.1f}"
+                    )
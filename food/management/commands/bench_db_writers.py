@@ -0,0 +1,160 @@
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+
+from barirswad.database import sqlite_options
+from food.bench import isolated_database, percentile
+from food.checkout import CheckoutError, place_order
+from food.feed import homepage_kitchens
+from food.models import Food, Kitchen, Order
+from food.ratings import rate_kitchen
+from user.models import UserProfile
+
+PROFILES = {
+    # What settings.DATABASES used to be: rollback journal, deferred BEGIN
+    "default": {},
+    "tuned": sqlite_options(),
+}
+
+# mixed:   half the workers place orders, rate and advance orders, half read
+# upgrade: every worker reads a row and then writes it in one transaction.
+#          Under a deferred BEGIN the read lock cannot be upgraded while
+#          another worker writes, and SQLite fails the upgrade at once
+#          rather than wait (busy_timeout only covers taking a lock from
+#          nothing), so this one fails without the tuning
+MIXES = ("mixed", "upgrade")
+
+
+class Command(BaseCommand):
+    help = "Hammer a file SQLite database with concurrent orders, ratings and reads under each connection profile"
+
+    def add_arguments(self, parser):
+        # Processes, like WSGI workers: threads would mostly measure the GIL
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=5)
+        parser.add_argument("--kitchens", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("This stress test is for SQLite; point DATABASE_URL at a sqlite:// URL")
+
+        self.stdout.write(
+            f"{'profile':<9}{'mix':<9}{'writes/s':>10}{'reads/s':>10}{'locked':>8}{'write p50':>11}{'write p99':>11}"
+        )
+        locked = {}
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, profile in PROFILES.items():
+                for mix in MIXES:
+                    path = os.path.join(tmp, f"{name}-{mix}.sqlite3")
+                    with isolated_database(name=path, options=dict(profile)):
+                        buyers, food_ids, kitchen_ids = self.seed(options["kitchens"])
+                        result = self.run(mix, buyers, food_ids, kitchen_ids, options)
+                    self.report(name, mix, result)
+                    locked[name, mix] = result["locked"]
+
+        if any(count for (name, _), count in locked.items() if name == "tuned"):
+            raise CommandError("The tuned profile hit 'database is locked'")
+        if not locked["default", "upgrade"]:
+            self.stdout.write("The default profile did not fail the upgrade mix; try more --workers")
+
+    def seed(self, num_kitchens):
+        buyers = []
+        for i in range(8):
+            user = User.objects.create_user(username=f"buyer{i}@example.com", password="x")
+            UserProfile.objects.create(uid=user, name=f"Buyer {i}", role="user")
+            buyers.append(user)
+        kitchens = Kitchen.objects.bulk_create([
+            Kitchen(name=f"Kitchen {i}", owner_id="0", owner_name="Owner") for i in range(num_kitchens)
+        ])
+        foods = Food.objects.bulk_create([
+            Food(name=f"Dish {i}", kitchen=k, kitchen_name=k.name, price=100, description="", quantity=10**9)
+            for k in kitchens for i in range(5)
+        ])
+        return buyers, [f.id for f in foods], [k.id for k in kitchens]
+
+    def run(self, mix, buyers, food_ids, kitchen_ids, options):
+        # Children must open their own connections
+        connection.close()
+        context = multiprocessing.get_context("fork")
+        queue = context.Queue()
+        deadline = time.time() + options["seconds"]
+        workers = [
+            context.Process(
+                target=self.worker, args=(i, mix, queue, deadline, buyers, food_ids, kitchen_ids, options)
+            )
+            for i in range(options["workers"])
+        ]
+        for worker in workers:
+            worker.start()
+
+        result = {"writes": 0, "reads": 0, "locked": 0, "write_ms": [], "seconds": options["seconds"]}
+        for _ in workers:
+            for key, value in queue.get().items():
+                result[key] += value
+        for worker in workers:
+            worker.join()
+        return result
+
+    def worker(self, index, mix, queue, deadline, buyers, food_ids, kitchen_ids, options):
+        rng = random.Random(options["seed"] + index)
+        result = {"writes": 0, "reads": 0, "locked": 0, "write_ms": []}
+        try:
+            while time.time() < deadline:
+                started = time.perf_counter()
+                try:
+                    if mix == "upgrade":
+                        self.take_stock(rng.choice(food_ids))
+                        result["writes"] += 1
+                        result["write_ms"].append((time.perf_counter() - started) * 1000)
+                        continue
+                    if index % 2:
+                        list(homepage_kitchens()[:10])
+                        list(Order.objects.filter(user=rng.choice(buyers)).order_by("-created_at")[:20])
+                        result["reads"] += 1
+                        continue
+                    op = rng.random()
+                    if op < 0.4:
+                        place_order(rng.choice(buyers), {rng.choice(food_ids): 1})
+                    elif op < 0.8:
+                        rate_kitchen(rng.choice(kitchen_ids), rng.randint(1, 5))
+                    else:
+                        self.advance_order(rng)
+                    result["writes"] += 1
+                    result["write_ms"].append((time.perf_counter() - started) * 1000)
+                except OperationalError as e:
+                    if "locked" not in str(e):
+                        raise
+                    result["locked"] += 1
+                except CheckoutError:
+                    pass
+        finally:
+            connection.close()
+            queue.put(result)
+
+    def advance_order(self, rng):
+        # Read-then-write transaction, the shape that a deferred BEGIN turns
+        # into an immediate "database is locked" when another writer is active
+        with transaction.atomic():
+            order = Order.objects.filter(status="pending").order_by("?").first()
+            if order is not None:
+                order.status = rng.choice(["accepted", "delivered"])
+                order.save(update_fields=["status"])
+
+    def take_stock(self, food_id):
+        with transaction.atomic():
+            quantity = Food.objects.filter(id=food_id).values_list("quantity", flat=True).get()
+            Food.objects.filter(id=food_id).update(quantity=quantity - 1)
+
+    def report(self, name, mix, result):
+        samples = result["write_ms"] or [0]
+        self.stdout.write(
+            f"{name:<9}{mix:<9}{result['writes'] / result['seconds']:>10.0f}{result['reads'] / result['seconds']:>10.0f}"
+            f"{result['locked']:>8}{percentile(samples, 50):>9.1f}ms{percentile(samples, 99):>9.1f}ms"
+        )
@@ -0,0 +1,51 @@
+import random
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from barirswad.renderers import FastJSONParser, FastJSONRenderer, orjson
+from food.bench import demo_foods, measure, summarize
+from food.serializers import FoodSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare the stdlib and orjson renderer/parser on serialized FoodSerializer pages"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 1000])
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson is not installed; both paths use the stdlib"))
+        rng = random.Random(options["seed"])
+        request = RequestFactory().get("/api/food/foods/")
+
+        self.stdout.write(
+            f"{'page':>6}{'bytes':>10}{'render std':>13}{'render fast':>13}{'speedup':>9}"
+            f"{'parse std':>12}{'parse fast':>12}{'speedup':>9}"
+        )
+        for size in options["sizes"]:
+            data = {
+                "count": size, "next": None, "previous": None,
+                "results": FoodSerializer(demo_foods(rng, size), many=True, context={"request": request}).data,
+            }
+            std, fast = JSONRenderer().render(data), FastJSONRenderer().render(data)
+            if std != fast:
+                raise CommandError(f"Renderers disagree on a page of {size} foods")
+
+            render_std = summarize(measure(lambda: JSONRenderer().render(data), options["repeat"]))
+            render_fast = summarize(measure(lambda: FastJSONRenderer().render(data), options["repeat"]))
+            parse_std = summarize(measure(lambda: JSONParser().parse(BytesIO(std)), options["repeat"]))
+            parse_fast = summarize(measure(lambda: FastJSONParser().parse(BytesIO(std)), options["repeat"]))
+            self.stdout.write(
+                f"{size:>6}{len(std):>10}"
+                f"{render_std['p50_ms']:>11.3f}ms{render_fast['p50_ms']:>11.3f}ms"
+                f"{render_std['p50_ms'] / render_fast['p50_ms']:>8.1f}x"
+                f"{parse_std['p50_ms']:>10.3f}ms{parse_fast['p50_ms']:>10.3f}ms"
+                f"{parse_std['p50_ms'] / parse_fast['p50_ms']:>8.1f}x"
+            )
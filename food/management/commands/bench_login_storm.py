@@ -0,0 +1,151 @@
+import http.client
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+
+from food.bench import isolated_database, percentile
+from food.models import Food, Kitchen, Order
+from user import passwords
+from user.models import UserProfile
+
+PASSWORD = "bench-password"
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the API from a threaded WSGI server and measure the latency of mixed read traffic "
+        "while concurrent clients hammer login, with password hashing inline and in the hashing pool"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seconds", type=float, default=10)
+        parser.add_argument("--storm", type=int, default=16, help="Concurrent login clients")
+        parser.add_argument("--readers", type=int, default=4, help="Concurrent clients of the other endpoints")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        # One IP sends all the traffic: keep the throttle checks, at rates it can never reach
+        unthrottled = {scope: "1000000/s" for scope in getattr(settings, "THROTTLE_RATES", {})}
+        phases = [
+            ("no storm", 0, None),
+            ("inline", options["storm"], 0),
+            ("pool", options["storm"], getattr(settings, "PASSWORD_HASH_WORKERS", None)),
+        ]
+        with tempfile.TemporaryDirectory() as tmp, override_settings(THROTTLE_RATES=unthrottled):
+            with isolated_database(name=os.path.join(tmp, "storm.sqlite3")):
+                emails, token = self.seed()
+                server = ThreadedWSGIServer(("127.0.0.1", 0), QuietHandler)
+                server.set_app(get_wsgi_application())
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                port = server.server_address[1]
+                # 503s from the pool's backpressure are expected here; don't log each one
+                request_logger = logging.getLogger("django.request")
+                level = request_logger.level
+                request_logger.setLevel(logging.ERROR)
+                try:
+                    self.stdout.write(
+                        f"{'hashing':<10}{'reads':>7}{'read p50':>10}{'read p95':>10}{'read p99':>10}"
+                        f"{'logins/s':>10}{'login p50':>11}{'503s':>6}"
+                    )
+                    for name, storm, workers in phases:
+                        with override_settings(PASSWORD_HASH_WORKERS=workers):
+                            # Start the pool processes before the clock does
+                            passwords.make_password("warm-up")
+                            self.report(name, self.run(port, storm, emails, token, options))
+                finally:
+                    request_logger.setLevel(level)
+                    server.shutdown()
+                    server.server_close()
+                    passwords.get_pool().shutdown()
+
+    def seed(self):
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create([
+            User(username=f"user{i}@bench.local", email=f"user{i}@bench.local", password=password) for i in range(50)
+        ])
+        UserProfile.objects.bulk_create([UserProfile(uid=user, name=f"User {i}") for i, user in enumerate(users)])
+        kitchens = Kitchen.objects.bulk_create([
+            Kitchen(name=f"Kitchen {i}", owner_id="0", owner_name="Owner", rating=i % 5) for i in range(30)
+        ])
+        foods = Food.objects.bulk_create([
+            Food(name=f"Dish {i}", kitchen=k, kitchen_name=k.name, price=100, description="", quantity=100)
+            for k in kitchens for i in range(10)
+        ])
+        Order.objects.bulk_create([Order(user=users[0], food=food, total_price=100) for food in foods[:50]])
+        return [user.email for user in users], Token.objects.create(user=users[0]).key
+
+    def run(self, port, storm, emails, token, options):
+        deadline = time.perf_counter() + options["seconds"]
+        reads, logins, statuses = [], [], Counter()
+        lock = threading.Lock()
+
+        def request(method, path, body=None, headers=None):
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            try:
+                start = time.perf_counter()
+                conn.request(method, path, body, headers or {})
+                response = conn.getresponse()
+                response.read()
+                return response.status, (time.perf_counter() - start) * 1000
+            finally:
+                conn.close()
+
+        def reader(seed):
+            rng = random.Random(seed)
+            paths = [
+                ("/api/food/foods/", {}),
+                ("/api/food/homepage/", {}),
+                ("/api/food/kitchens/top/", {}),
+                ("/api/food/orders/list/", {"Authorization": f"Token {token}"}),
+            ]
+            while time.perf_counter() < deadline:
+                path, headers = rng.choice(paths)
+                _, ms = request("GET", path, headers=headers)
+                with lock:
+                    reads.append(ms)
+
+        def attacker(seed):
+            rng = random.Random(seed)
+            while time.perf_counter() < deadline:
+                body = json.dumps({"email": rng.choice(emails), "password": PASSWORD})
+                status, ms = request("POST", "/api/user/login/", body, {"Content-Type": "application/json"})
+                with lock:
+                    statuses[status] += 1
+                    if status == 200:
+                        logins.append(ms)
+
+        threads = [threading.Thread(target=reader, args=(options["seed"] + i,)) for i in range(options["readers"])]
+        threads += [threading.Thread(target=attacker, args=(options["seed"] + 1000 + i,)) for i in range(storm)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return {"reads": reads, "logins": logins, "statuses": statuses, "seconds": options["seconds"]}
+
+    def report(self, name, result):
+        reads, logins = result["reads"], result["logins"]
+        login_p50 = f"{percentile(logins, 50):>9.0f}ms" if logins else f"{'-':>11}"
+        self.stdout.write(
+            f"{name:<10}{len(reads):>7}"
+            f"{percentile(reads, 50):>8.1f}ms{percentile(reads, 95):>8.1f}ms{percentile(reads, 99):>8.1f}ms"
+            f"{len(logins) / result['seconds']:>10.1f}{login_p50}{result['statuses'][503]:>6}"
+        )
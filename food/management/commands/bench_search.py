@@ -0,0 +1,81 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from faker import Faker
+
+from food.bench import isolated_database, measure, summarize
+from food.models import Food, Kitchen
+from food.search import get_search_backend, search_terms
+
+DISHES = [
+    "Chicken Biryani", "Beef Tehari", "Kacchi", "Morog Polao", "Khichuri",
+    "Fish Curry", "Vegetable Fried Rice", "Mutton Rezala", "Egg Curry", "Dal Bhuna",
+]
+QUERIES = ["chi", "biryani", "beef teh", "fish curry", "veg", "spicy", "zzz"]
+
+
+class Command(BaseCommand):
+    help = "Compare full-text search against the icontains SearchFilter on a synthetic dataset"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--foods", type=int, default=100_000)
+        parser.add_argument("--kitchens", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            self.seed(options["foods"], options["kitchens"], options["seed"])
+            self.run(options["repeat"])
+
+    def seed(self, num_foods, num_kitchens, seed):
+        rng = random.Random(seed)
+        fake = Faker()
+        fake.seed_instance(seed)
+
+        kitchens = Kitchen.objects.bulk_create([
+            Kitchen(name=fake.company() + " Kitchen", owner_id="1", owner_name=fake.name())
+            for _ in range(num_kitchens)
+        ])
+        batch = []
+        for i in range(num_foods):
+            kitchen = rng.choice(kitchens)
+            batch.append(Food(
+                name=rng.choice(DISHES), kitchen=kitchen, kitchen_name=kitchen.name,
+                price=round(rng.uniform(120, 650), 2), description=fake.sentence(nb_words=12),
+                quantity=rng.randint(1, 20),
+            ))
+            if len(batch) == 5000:
+                Food.objects.bulk_create(batch)
+                batch = []
+        Food.objects.bulk_create(batch)
+        self.stdout.write(f"Seeded {num_foods} foods across {num_kitchens} kitchens")
+
+    def run(self, repeat):
+        backend = get_search_backend(Food.objects.all())
+        if backend is None:
+            self.stdout.write(self.style.WARNING("No full-text backend for this database"))
+            return
+
+        def icontains(query):
+            q = Q()
+            for term in query.split():
+                q &= Q(name__icontains=term) | Q(kitchen_name__icontains=term) | Q(description__icontains=term)
+            qs = Food.objects.filter(q).order_by("created_at")
+            return qs.count(), list(qs[:50])
+
+        def fulltext(query):
+            qs = backend.filter(Food.objects.all(), search_terms(query))
+            qs = qs.order_by(backend.rank(), "created_at")
+            return qs.count(), list(qs[:50])
+
+        self.stdout.write(f"{'query':<12}{'matches':>9}{'icontains p50':>16}{'fulltext p50':>15}{'speedup':>9}")
+        for query in QUERIES:
+            count, _ = fulltext(query)
+            slow = summarize(measure(lambda: icontains(query), repeat))
+            fast = summarize(measure(lambda: fulltext(query), repeat))
+            speedup = slow["p50_ms"] / fast["p50_ms"] if fast["p50_ms"] else float("inf")
+            self.stdout.write(
+                f"{query:<12}{count:>9}{slow['p50_ms']:>14.2f}ms{fast['p50_ms']:>13.2f}ms{speedup:>8.1f}x"
+            )
@@ -0,0 +1,82 @@
+import random
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+
+from food.bench import isolated_database, measure, summarize
+from food.models import Food, Kitchen, Order
+from food.projections import FoodProjection, KitchenProjection, OrderProjection
+from food.serializers import FoodSerializer, KitchenSerializer, OrderSerializer
+
+# Awkward names on purpose: the projection quotes them itself
+IMAGE_NAMES = ["foods/plain.jpg", "foods/with space.jpg", "foods/ভাত (1).jpg", "foods/a+b&c.png", ""]
+
+
+class Command(BaseCommand):
+    help = "Time the values() list projections against the serializers (food.tests checks they match)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            self.seed(options["rows"], options["seed"])
+            request = Request(RequestFactory().get("/api/food/foods/", HTTP_HOST="api.example.com"))
+            cases = [
+                ("foods", Food.objects.order_by("created_at"), FoodSerializer, FoodProjection),
+                ("kitchens", Kitchen.objects.order_by("-rating", "id"), KitchenSerializer, KitchenProjection),
+                ("orders", Order.objects.select_related("food").order_by("-created_at", "-id"),
+                 OrderSerializer, OrderProjection),
+            ]
+
+            self.stdout.write(f"{'list':<10}{'rows':>6}{'queries':>9}{'serializer p50':>16}{'values p50':>12}{'speedup':>9}")
+            for name, queryset, serializer_class, projection_class in cases:
+                def serializer():
+                    return serializer_class(list(queryset), many=True, context={"request": request}).data
+
+                def projection():
+                    projection = projection_class(request)
+                    return projection.render(projection.values(queryset))
+
+                with CaptureQueriesContext(connection) as ctx:
+                    projection()
+                slow = summarize(measure(serializer, options["repeat"]))
+                fast = summarize(measure(projection, options["repeat"]))
+                self.stdout.write(
+                    f"{name:<10}{queryset.count():>6}{len(ctx.captured_queries):>9}"
+                    f"{slow['p50_ms']:>14.2f}ms{fast['p50_ms']:>10.2f}ms{slow['p50_ms'] / fast['p50_ms']:>8.1f}x"
+                )
+
+    def seed(self, rows, seed):
+        rng = random.Random(seed)
+        user = User.objects.create_user(username="bench@example.com", password="x")
+        kitchens = Kitchen.objects.bulk_create([
+            Kitchen(
+                name=f"Kitchen {i}", owner_id=str(user.id), owner_name="Owner",
+                image=rng.choice(IMAGE_NAMES).replace("foods/", "kitchens/"),
+                rating=round(rng.uniform(0, 5), 2), rating_count=rng.randint(0, 50),
+            )
+            for i in range(max(1, rows // 10))
+        ])
+        foods = []
+        for i in range(rows):
+            image = rng.choice(IMAGE_NAMES)
+            stem = image.rsplit(".", 1)[0]
+            kitchen = rng.choice(kitchens)
+            foods.append(Food(
+                name=f"Dish {i}", kitchen=kitchen, kitchen_name=kitchen.name,
+                price=rng.choice([200, 149.5, 0.1, 1e16]), description="Rice — with salad",
+                quantity=rng.randint(0, 20), delivery_time=rng.randint(10, 90), image=image,
+                image_variants={"thumb": {"webp": f"{stem}_thumb.webp"}} if image else {},
+            ))
+        foods = Food.objects.bulk_create(foods)
+        Order.objects.bulk_create([
+            Order(user=user, food=rng.choice(foods), quantity=2, total_price=rng.uniform(100, 900))
+            for _ in range(rows)
+        ])
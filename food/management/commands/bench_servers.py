@@ -0,0 +1,70 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from food.bench import summarize
+
+# Sync (WSGI/DRF) path and its ASGI-native twin
+ENDPOINTS = {
+    "homepage": ("api/food/homepage/", "api/food/async/homepage/"),
+    "foods": ("api/food/foods/", "api/food/async/foods/"),
+    "kitchens": ("api/food/kitchens/", "api/food/async/kitchens/"),
+    "orders": ("api/food/orders/list/", "api/food/async/orders/list/"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare throughput and latency of the WSGI and ASGI read paths under concurrency. "
+        "Start both servers first, e.g. `manage.py runserver 8080` and "
+        "`uvicorn barirswad.asgi:application --port 8081`."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--wsgi-url", default="http://127.0.0.1:8080/")
+        parser.add_argument("--asgi-url", default="http://127.0.0.1:8081/")
+        parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=["homepage", "foods", "kitchens"])
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint per server")
+        parser.add_argument("--token", help="Token for the orders endpoint")
+
+    def handle(self, *args, **options):
+        if "orders" in options["endpoints"] and not options["token"]:
+            raise CommandError("--token is required to benchmark orders")
+        headers = {"Authorization": f"Token {options['token']}"} if options["token"] else {}
+
+        self.stdout.write(f"{'endpoint':<10}{'server':<7}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for name in options["endpoints"]:
+            sync_path, async_path = ENDPOINTS[name]
+            for server, url in (("wsgi", options["wsgi_url"] + sync_path), ("asgi", options["asgi_url"] + async_path)):
+                result = self.run(url, headers, options["concurrency"], options["requests"])
+                self.stdout.write(
+                    f"{name:<10}{server:<7}{result['rps']:>9.1f}{result['p50_ms']:>9.1f}"
+                    f"{result['p99_ms']:>9.1f}{result['errors']:>8}"
+                )
+
+    def run(self, url, headers, concurrency, total):
+        local = threading.local()
+        samples, errors = [], []
+
+        def fetch(_):
+            session = getattr(local, "session", None)
+            if session is None:
+                session = local.session = requests.Session()
+            start = time.perf_counter()
+            try:
+                ok = session.get(url, headers=headers, timeout=30).status_code == 200
+            except requests.RequestException:
+                ok = False
+            samples.append((time.perf_counter() - start) * 1000)
+            if not ok:
+                errors.append(url)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(fetch, range(total)))
+        elapsed = time.perf_counter() - started
+        return {"rps": total / elapsed, "errors": len(errors), **summarize(samples)}
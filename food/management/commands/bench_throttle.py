@@ -0,0 +1,94 @@
+import random
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+from rest_framework.request import Request
+
+from barirswad import throttling
+from food.bench import measure, summarize
+
+STORES = {
+    "local": "barirswad.throttling.LocalBucketStore",
+    "cache": "barirswad.throttling.CacheBucketStore",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the throttle checks DRF runs per request (anon, user and one endpoint bucket) with each "
+        "bucket store, for requests that pass and requests that are rejected. Fails if p99 is over budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=10000, help="Distinct users and IPs")
+        parser.add_argument("--repeat", type=int, default=20000)
+        parser.add_argument(
+            "--cache-alias",
+            help="CACHES alias for the cache store (default: a private LocMemCache sized for --clients)",
+        )
+        parser.add_argument("--budget-ms", type=float, default=1.0, help="Allowed p99 per request")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        factory = RequestFactory()
+        requests = []
+        for i in range(options["clients"]):
+            address = f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+            request = Request(factory.post("/api/user/login/", REMOTE_ADDR=address))
+            # Half anonymous, half signed in; unsaved users need no database
+            if i % 2:
+                request.user = User(id=i)
+            requests.append(request)
+        classes = throttling.throttles("bench")
+        cache_alias = options["cache_alias"] or "throttle-bench"
+        caches = settings.CACHES
+        if not options["cache_alias"]:
+            caches = {**caches, cache_alias: {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "throttle-bench",
+                "OPTIONS": {"MAX_ENTRIES": options["clients"] * 4},
+            }}
+
+        def check():
+            request = rng.choice(requests)
+            # What APIView.check_throttles() does
+            for throttle in [cls() for cls in classes]:
+                if not throttle.allow_request(request, None):
+                    throttle.wait()
+                    return
+
+        self.stdout.write(f"{'store':>8}{'scenario':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'rejected':>10}")
+        over_budget = []
+        # Rates no client reaches, then rates every client is over
+        scenarios = {"pass": "1000000/s", "reject": {"rate": "1/day", "burst": 1}}
+        for store_name, path in STORES.items():
+            for scenario, rate in scenarios.items():
+                rates = {"anon": rate, "user": rate, "bench": rate}
+                with override_settings(
+                    CACHES=caches, THROTTLE_CACHE_ALIAS=cache_alias, THROTTLE_STORE=path, THROTTLE_RATES=rates,
+                ):
+                    throttling.get_store().clear()
+                    throttling.reset_throttle_stats()
+                    # Warm up every client's buckets first
+                    for request in requests:
+                        for throttle in [cls() for cls in classes]:
+                            throttle.allow_request(request, None)
+                    throttling.reset_throttle_stats()
+                    stats = summarize(measure(check, options["repeat"]))
+                    rejected = sum(throttling.throttle_stats().values())
+                    throttling.get_store().clear()
+                self.stdout.write(
+                    f"{store_name:>8}{scenario:>10}"
+                    f"{stats['p50_ms'] * 1000:>8.1f}us{stats['p95_ms'] * 1000:>8.1f}us{stats['p99_ms'] * 1000:>8.1f}us"
+                    f"{rejected:>10}"
+                )
+                if stats["p99_ms"] > options["budget_ms"]:
+                    over_budget.append(f"{store_name}/{scenario} p99 {stats['p99_ms']:.3f}ms")
+
+        throttling.reset_throttle_stats()
+        if over_budget:
+            raise CommandError(f"Over the {options['budget_ms']}ms budget: {', '.join(over_budget)}")
+        self.stdout.write(self.style.SUCCESS(f"All checks within {options['budget_ms']}ms at p99"))
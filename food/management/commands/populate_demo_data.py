@@ -1,98 +1,266 @@
 import random
-import requests
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
-from django.core.files import File
-from django.core.management.base import BaseCommand
+
+import requests
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
 from faker import Faker
-from food.models import Kitchen, Food
+from PIL import Image, ImageDraw
+
+from food import analytics, leaderboard
+from food.cache import bump_version
+from food.models import Food, Kitchen, Order
 from user.models import UserProfile
 
-fake = Faker()
+DEMO_PASSWORD = "demoSeller123"
+
+OFFLINE_DISHES = [
+    "Chicken Biryani", "Beef Tehari", "Kacchi Biryani", "Morog Polao", "Bhuna Khichuri",
+    "Egg Fried Rice", "Vegetable Pulao", "Shrimp Fried Rice", "Mutton Polao", "Panta Bhat",
+    "Lemon Rice", "Jeera Rice", "Chicken Fried Rice", "Mixed Khichuri", "Rice Pudding",
+]
+
 
 class Command(BaseCommand):
-    help = "Generate demo seller users, many kitchens, and lots of rice foods from TheMealDB"
+    help = "Generate demo sellers, kitchens, rice foods and orders in bulk (optionally offline)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sellers", type=int, default=12)
+        parser.add_argument("--kitchens-per-seller", type=int, default=4)
+        parser.add_argument("--foods-min", type=int, default=8, help="Minimum foods per kitchen")
+        parser.add_argument("--foods-max", type=int, default=12, help="Maximum foods per kitchen")
+        parser.add_argument("--buyers", type=int, default=0)
+        parser.add_argument("--orders", type=int, default=0, help="Orders spread across buyers and foods")
+        parser.add_argument("--offline", action="store_true",
+                            help="Generate synthetic images locally instead of fetching TheMealDB")
+        parser.add_argument("--images", type=int, default=20,
+                            help="Distinct images to fetch/generate; foods share them")
+        parser.add_argument("--seed", type=int, default=None, help="Make the generated data reproducible")
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--workers", type=int, default=8, help="Threads used for image fetching/generation")
+
+    def handle(self, *args, **options):
+        if options["foods_min"] > options["foods_max"]:
+            raise CommandError("--foods-min cannot be larger than --foods-max")
+        if options["orders"] and not options["buyers"]:
+            raise CommandError("--orders needs at least one --buyers")
+
+        self.rng = random.Random(options["seed"])
+        self.fake = Faker()
+        self.fake.seed_instance(options["seed"])
+        self.batch_size = options["batch_size"]
+        # Tags usernames and image files so separate runs never collide
+        self.run_tag = f"{options['seed']}" if options["seed"] is not None else f"{int(time.time())}"
+        if User.objects.filter(username__regex=rf"^(seller|user)\d+\.{self.run_tag}@").exists():
+            # Rerunning a seed leaves its data as it is
+            self.stdout.write(f"Demo data for seed {self.run_tag} already exists, nothing to do")
+            return
+        self.started = time.perf_counter()
+        self.rows = 0
 
-    def handle(self, *args, **kwargs):
-        NUM_SELLERS = 12
-        KITCHENS_PER_SELLER = 4
-        FOOD_MIN = 8
-        FOOD_MAX = 12
+        meals = self.collect_images(options)
+        sellers = self.create_users(options["sellers"], "seller")
+        kitchens = self.create_kitchens(sellers, options["kitchens_per_seller"])
+        foods = self.create_foods(kitchens, meals, options["foods_min"], options["foods_max"])
+        if options["buyers"]:
+            buyers = self.create_users(options["buyers"], "user")
+            self.create_orders([user_id for user_id, _ in buyers], *foods, options["orders"])
 
+        # bulk_create skips post_save and the checkout hooks, so build
+        # leaderboard entries and rollups and invalidate cached responses by hand
+        leaderboard.rebuild(batch_size=self.batch_size)
+        analytics.rebuild(batch_size=self.batch_size)
+        bump_version(Kitchen)
+        bump_version(Food)
+
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f"\nDemo database populated: {self.rows} rows in {elapsed:.1f}s "
+            f"({self.rows / elapsed:,.0f} rows/s)\n"
+        ))
+
+    def report(self, label, count, started):
+        self.rows += count
+        elapsed = time.perf_counter() - started
+        rate = count / elapsed if elapsed else float("inf")
+        self.stdout.write(f"{label}: {count} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)")
+
+    def batches(self, objects):
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    # Images
+
+    def collect_images(self, options):
+        if options["offline"]:
+            meals = [{"name": self.rng.choice(OFFLINE_DISHES), "index": i} for i in range(options["images"])]
+            producer = self.generate_image
+        else:
+            meals = [dict(meal, index=i) for i, meal in enumerate(self.fetch_meal_list()[:options["images"]])]
+            producer = self.download_image
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            names = list(pool.map(producer, meals))
+
+        # Keep a meal without an image rather than losing it
+        for meal, name in zip(meals, names):
+            meal["image"] = name
+        stored = sum(1 for name in names if name)
+        self.stdout.write(f"Images: {stored}/{len(meals)} stored in {time.perf_counter() - started:.1f}s")
+        return meals
+
+    def fetch_meal_list(self):
         # Only "rice" meals
         self.stdout.write("\nFetching rice meals from TheMealDB...\n")
-        all_foods = []
-
+        meals = []
         try:
             resp = requests.get("https://www.themealdb.com/api/json/v1/1/search.php?s=rice", timeout=10)
-            meals = resp.json().get("meals", [])
-            if meals:
-                for meal in meals:
-                    if meal.get("strMeal") and meal.get("strMealThumb"):
-                        all_foods.append({
-                            "name": meal["strMeal"],
-                            "image_url": meal["strMealThumb"]
-                        })
+            for meal in resp.json().get("meals") or []:
+                if meal.get("strMeal") and meal.get("strMealThumb"):
+                    meals.append({"name": meal["strMeal"], "image_url": meal["strMealThumb"]})
         except Exception as e:
             self.stdout.write(f"Failed to fetch rice meals: {e}")
 
-        if not all_foods:
+        if not meals:
             self.stdout.write("No rice meals found! Using placeholder images instead.")
-            all_foods = [{"name": f"Rice Dish {i+1}", "image_url": "https://via.placeholder.com/200"} for i in range(20)]
-
-        self.stdout.write(f"Collected {len(all_foods)} rice meals.\n")
-
-        for _ in range(NUM_SELLERS):
-            email = fake.unique.email()
-            password = "demoSeller123"
-
-            seller = User.objects.create_user(
-                username=email,
-                email=email,
-                password=password
-            )
-
-            profile_name = fake.name()
-            UserProfile.objects.create(
-                uid=seller,
-                name=profile_name,
-                role="seller"
-            )
-
-            self.stdout.write(f"Seller created → {email}")
-
-            for i in range(KITCHENS_PER_SELLER):
-                kitchen_name = fake.company() + " Kitchen"
-                kitchen = Kitchen.objects.create(
-                    name=kitchen_name,
-                    owner_name=profile_name,
-                    owner_id=seller.id,
-                    rating=round(random.uniform(3.5, 5), 2),
-                    total_orders=random.randint(10, 300)
+            meals = [{"name": f"Rice Dish {i+1}", "image_url": "https://via.placeholder.com/200"} for i in range(20)]
+
+        self.stdout.write(f"Collected {len(meals)} rice meals.\n")
+        return meals
+
+    def download_image(self, meal):
+        try:
+            img_r = requests.get(meal["image_url"], timeout=10)
+            img_r.raise_for_status()
+        except Exception as e:
+            self.stdout.write(f"Failed to fetch image for {meal['name']}: {e}")
+            return None
+        return default_storage.save(f"foods/demo_{self.run_tag}_{meal['index']}.jpg", ContentFile(img_r.content))
+
+    def generate_image(self, meal):
+        # Each worker gets its own generator so output does not depend on scheduling
+        rng = random.Random(f"{self.run_tag}-{meal['index']}")
+        top = tuple(rng.randint(60, 255) for _ in range(3))
+        bottom = tuple(rng.randint(0, 160) for _ in range(3))
+
+        image = Image.new("RGB", (640, 480))
+        draw = ImageDraw.Draw(image)
+        for y in range(480):
+            mix = y / 479
+            draw.line([(0, y), (640, y)], fill=tuple(int(t + (b - t) * mix) for t, b in zip(top, bottom)))
+        draw.ellipse([170, 90, 470, 390], fill=(245, 240, 225), outline=(90, 60, 30), width=6)
+        draw.text((20, 440), meal["name"], fill=(255, 255, 255))
+
+        buffer = BytesIO()
+        image.save(buffer, "JPEG", quality=85)
+        return default_storage.save(f"foods/demo_{self.run_tag}_{meal['index']}.jpg", ContentFile(buffer.getvalue()))
+
+    # Rows
+
+    def create_users(self, count, role):
+        started = time.perf_counter()
+        # Hash once: PBKDF2 per user would dominate the whole run
+        password = make_password(DEMO_PASSWORD)
+        created = []
+        for batch in self.batches(range(count)):
+            users = User.objects.bulk_create([
+                User(username=email, email=email, password=password)
+                for email in (f"{role}{i}.{self.run_tag}@{self.fake.free_email_domain()}" for i in batch)
+            ])
+            names = [self.fake.name() for _ in users]
+            UserProfile.objects.bulk_create([
+                UserProfile(uid=user, name=name, role=role) for user, name in zip(users, names)
+            ])
+            created.extend((user.id, name) for user, name in zip(users, names))
+        self.report(f"{role.capitalize()}s (+ profiles)", count * 2, started)
+        return created
+
+    def create_kitchens(self, sellers, per_seller):
+        started = time.perf_counter()
+        kitchens = []
+
+        def build():
+            for seller_id, owner_name in sellers:
+                for _ in range(per_seller):
+                    rating_count = self.rng.randint(0, 200)
+                    rating = round(self.rng.uniform(3.5, 5), 2) if rating_count else 0
+                    yield Kitchen(
+                        name=self.fake.company() + " Kitchen",
+                        owner_name=owner_name,
+                        owner_id=seller_id,
+                        rating=rating,
+                        rating_sum=rating * rating_count,
+                        rating_count=rating_count,
+                        total_orders=self.rng.randint(10, 300),
+                    )
+
+        for batch in self.batches(build()):
+            kitchens.extend((k.id, k.name, k.owner_id) for k in Kitchen.objects.bulk_create(batch))
+        self.report("Kitchens", len(kitchens), started)
+        return kitchens
+
+    def create_foods(self, kitchens, meals, foods_min, foods_max):
+        started = time.perf_counter()
+        # Orders copy the owner of the food's kitchen (Order.owner_id)
+        food_ids, food_prices, food_owners = array("q"), array("d"), array("q")
+        sentences = [self.fake.text(140) for _ in range(200)]
+
+        def build():
+            for kitchen_id, kitchen_name, _ in kitchens:
+                for _ in range(self.rng.randint(foods_min, foods_max)):
+                    meal = self.rng.choice(meals)
+                    yield Food(
+                        name=meal["name"],
+                        kitchen_id=kitchen_id,
+                        kitchen_name=kitchen_name,
+                        price=round(self.rng.uniform(120, 650), 2),
+                        delivery_time=self.rng.randint(10, 90),
+                        description=self.rng.choice(sentences),
+                        quantity=self.rng.randint(1, 20),
+                        image=meal["image"],
+                    )
+
+        owners = {kitchen_id: owner_id for kitchen_id, _, owner_id in kitchens}
+        for batch in self.batches(build()):
+            for food in Food.objects.bulk_create(batch):
+                food_ids.append(food.id)
+                food_prices.append(food.price)
+                food_owners.append(int(owners[food.kitchen_id]))
+        self.report("Foods", len(food_ids), started)
+        return food_ids, food_prices, food_owners
+
+    def create_orders(self, buyer_ids, food_ids, food_prices, food_owners, count):
+        if not count or not food_ids:
+            return
+        started = time.perf_counter()
+        statuses = [status for status, _ in Order.STATUS_CHOICES]
+
+        def build():
+            for _ in range(count):
+                index = self.rng.randrange(len(food_ids))
+                quantity = self.rng.randint(1, 4)
+                yield Order(
+                    user_id=self.rng.choice(buyer_ids),
+                    food_id=food_ids[index],
+                    quantity=quantity,
+                    total_price=round(food_prices[index] * quantity, 2),
+                    owner_id=str(food_owners[index]),
+                    status=self.rng.choice(statuses),
                 )
 
-                self.stdout.write(f"  Kitchen #{i+1} → {kitchen.name}")
-
-                num_foods = random.randint(FOOD_MIN, FOOD_MAX)
-                for f in range(num_foods):
-                    meal = random.choice(all_foods)
-                    try:
-                        img_r = requests.get(meal["image_url"], timeout=10)
-                        food_img = File(BytesIO(img_r.content), name=f"food_{random.randint(1000,9999)}.jpg")
-
-                        Food.objects.create(
-                            name=meal["name"],
-                            kitchen=kitchen,
-                            price=round(random.uniform(120, 650), 2),
-                            delivery_time=random.randint(10, 90),
-                            description=fake.text(140),
-                            quantity=random.randint(1, 20),
-                            image=food_img
-                        )
-                    except Exception as e:
-                        self.stdout.write(f"Failed to create food image: {e}")
-                        continue
-
-            self.stdout.write("")
-
-        self.stdout.write(self.style.SUCCESS("\nDemo database populated successfully with rice meals!\n"))
+        for batch in self.batches(build()):
+            Order.objects.bulk_create(batch)
+        self.report("Orders", count, started)
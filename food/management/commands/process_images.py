@@ -0,0 +1,25 @@
+from concurrent.futures import wait
+
+from django.core.management.base import BaseCommand
+
+from food.images import submit_variants
+from food.models import Food, Kitchen
+
+
+class Command(BaseCommand):
+    help = "Generate thumbnail/WebP/AVIF variants for images that do not have them yet"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Regenerate variants for every image")
+
+    def handle(self, *args, **options):
+        futures = []
+        for Model in (Kitchen, Food):
+            qs = Model.objects.exclude(image="").exclude(image__isnull=True)
+            if not options["all"]:
+                qs = qs.filter(image_variants={})
+            for pk in qs.values_list("id", flat=True).iterator():
+                futures.append(submit_variants(Model._meta.label, pk))
+
+        wait(futures)
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(futures)} images"))
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from food import leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the kitchen leaderboard. Run it periodically (e.g. hourly from cron) "
+        f"to age orders out of the {leaderboard.WINDOW_DAYS}-day velocity window"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = leaderboard.rebuild(batch_size=options["batch_size"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt leaderboard: {written} entries updated in {elapsed:.2f}s"))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from food import denormalized
+
+
+class Command(BaseCommand):
+    help = "Find and fix stale Food.kitchen_name, Kitchen.owner_name and Order.owner_id copies, in chunks of kitchens"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Kitchens per transaction")
+        parser.add_argument("--check", action="store_true", help="Only report drift; exit non-zero if any")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        foods, kitchens, orders = denormalized.repair(chunk_size=options["chunk_size"], dry_run=options["check"])
+        elapsed = time.perf_counter() - started
+
+        if options["check"]:
+            if foods or kitchens or orders:
+                raise CommandError(
+                    f"Stale copies: {foods} food kitchen names, {kitchens} kitchen owner names, {orders} order owners"
+                )
+            self.stdout.write(self.style.SUCCESS(f"No stale copies ({elapsed:.2f}s)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Repaired {foods} food kitchen names, {kitchens} kitchen owner names and {orders} order owners "
+                f"in {elapsed:.2f}s"
+            ))
@@ -0,0 +1,119 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:41
+
+import django.db.models.deletion
+import food.models
+from django.db import migrations, models
+
+
+SQLITE_INDEXES = {
+    "food_food": ["name", "kitchen_name", "description"],
+    "food_kitchen": ["name", "owner_name"],
+}
+
+SQLITE_RANK_WEIGHTS = {
+    "food_food": "bm25(10.0, 5.0, 1.0)",
+    "food_kitchen": "bm25(10.0, 2.0)",
+}
+
+POSTGRES_INDEXES = {
+    "food_food": [("name", "A"), ("kitchen_name", "B"), ("description", "C")],
+    "food_kitchen": [("name", "A"), ("owner_name", "B")],
+}
+
+
+def sqlite_forwards(cursor):
+    for table, columns in SQLITE_INDEXES.items():
+        fts = f"{table}_fts"
+        cols = ", ".join(columns)
+        new_cols = ", ".join(f"new.{c}" for c in columns)
+        old_cols = ", ".join(f"old.{c}" for c in columns)
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', "
+            f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        cursor.execute(f"INSERT INTO {fts}({fts}, rank) VALUES ('rank', '{SQLITE_RANK_WEIGHTS[table]}')")
+        cursor.execute(
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+            f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+        )
+        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def sqlite_backwards(cursor):
+    for table in SQLITE_INDEXES:
+        fts = f"{table}_fts"
+        for suffix in ("ai", "ad", "au"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        cursor.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+def postgres_forwards(cursor):
+    for table, columns in POSTGRES_INDEXES.items():
+        vector = " || ".join(
+            f"setweight(to_tsvector('simple', coalesce({column}, '')), '{weight}')"
+            for column, weight in columns
+        )
+        cursor.execute(f"CREATE INDEX {table}_search_gin ON {table} USING gin (({vector}))")
+
+
+def postgres_backwards(cursor):
+    for table in POSTGRES_INDEXES:
+        cursor.execute(f"DROP INDEX IF EXISTS {table}_search_gin")
+
+
+def create_search_indexes(apps, schema_editor):
+    handler = {"sqlite": sqlite_forwards, "postgresql": postgres_forwards}.get(schema_editor.connection.vendor)
+    if handler:
+        with schema_editor.connection.cursor() as cursor:
+            handler(cursor)
+
+
+def drop_search_indexes(apps, schema_editor):
+    handler = {"sqlite": sqlite_backwards, "postgresql": postgres_backwards}.get(schema_editor.connection.vendor)
+    if handler:
+        with schema_editor.connection.cursor() as cursor:
+            handler(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0003_kitchen_rating_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FoodSearchIndex',
+            fields=[
+                ('food', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='food.food')),
+                ('document', food.models.FullTextField(db_column='food_food_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'food_food_fts',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='KitchenSearchIndex',
+            fields=[
+                ('kitchen', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='food.kitchen')),
+                ('document', food.models.FullTextField(db_column='food_kitchen_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'food_kitchen_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:43
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_rating_sum(apps, schema_editor):
+    Kitchen = apps.get_model("food", "Kitchen")
+    Kitchen.objects.update(rating_sum=models.F("rating") * models.F("rating_count"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0004_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kitchen',
+            name='rating_sum',
+            field=models.FloatField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Rating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.FloatField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('kitchen', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ratings', to='food.kitchen')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='kitchen_ratings', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_rating_sum, migrations.RunPython.noop),
+    ]
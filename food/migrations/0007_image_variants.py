@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0006_order_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='food',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='kitchen',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:12
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_updated_at(apps, schema_editor):
+    for name in ("Kitchen", "Food"):
+        apps.get_model("food", name).objects.update(updated_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0007_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='food',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='kitchen',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
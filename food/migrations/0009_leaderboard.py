@@ -0,0 +1,75 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:17
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_leaderboard(apps, schema_editor):
+    Kitchen = apps.get_model("food", "Kitchen")
+    Order = apps.get_model("food", "Order")
+    LeaderboardEntry = apps.get_model("food", "LeaderboardEntry")
+
+    # Same 7-day window as food.leaderboard.WINDOW_DAYS
+    recent = dict(
+        Order.objects.filter(created_at__gte=timezone.now() - timedelta(days=7))
+        .exclude(status="cancelled")
+        .values_list("food__kitchen_id")
+        .annotate(n=models.Count("id"))
+        .order_by()
+    )
+    LeaderboardEntry.objects.bulk_create(
+        [
+            LeaderboardEntry(
+                kitchen_id=kitchen_id, rating=rating, rating_count=rating_count,
+                total_orders=total_orders, recent_orders=recent.get(kitchen_id, 0),
+            )
+            for kitchen_id, rating, rating_count, total_orders
+            in Kitchen.objects.values_list("id", "rating", "rating_count", "total_orders").iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0008_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('kitchen', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard', serialize=False, to='food.kitchen')),
+                ('rating', models.FloatField(default=0)),
+                ('rating_count', models.IntegerField(default=0)),
+                ('total_orders', models.IntegerField(default=0)),
+                ('recent_orders', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='kitchen',
+            index=models.Index(fields=['-rating', 'id'], name='kitchen_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='kitchen',
+            index=models.Index(fields=['-total_orders', 'id'], name='kitchen_orders_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['-rating', 'kitchen'], name='leaderboard_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['-total_orders', 'kitchen'], name='leaderboard_orders_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['-recent_orders', 'kitchen'], name='leaderboard_velocity_idx'),
+        ),
+        migrations.RunPython(backfill_leaderboard, migrations.RunPython.noop),
+    ]
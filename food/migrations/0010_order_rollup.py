@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0009_leaderboard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('orders', models.IntegerField(default=0)),
+                ('quantity', models.IntegerField(default=0)),
+                ('revenue', models.FloatField(default=0)),
+                ('pending', models.IntegerField(default=0)),
+                ('accepted', models.IntegerField(default=0)),
+                ('preparing', models.IntegerField(default=0)),
+                ('ontheway', models.IntegerField(default=0)),
+                ('delivered', models.IntegerField(default=0)),
+                ('cancelled', models.IntegerField(default=0)),
+                ('food', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='food.food')),
+                ('kitchen', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='food.kitchen')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kitchen', 'day'], name='rollup_kitchen_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('food', 'day'), name='rollup_food_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_order_owners(apps, schema_editor):
+    Kitchen = apps.get_model("food", "Kitchen")
+    Order = apps.get_model("food", "Order")
+    owners = Kitchen.objects.filter(foods=models.OuterRef("food_id")).values("owner_id")[:1]
+    Order.objects.update(owner_id=models.Subquery(owners))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0011_order_event'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_food_recent_idx',
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='owner_id',
+            field=models.CharField(default='', max_length=50),
+        ),
+        migrations.RunPython(backfill_order_owners, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['owner_id', '-created_at', '-id'], name='order_owner_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+from datetime import timezone as dt_timezone
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+
+# Same columns as food.analytics.STATUSES
+STATUSES = ["pending", "accepted", "preparing", "ontheway", "delivered", "cancelled"]
+
+
+def backfill_order_rollups(apps, schema_editor):
+    """0010 created the rollups empty; rebuild them from every order, as food.analytics.rebuild() does."""
+    Order = apps.get_model("food", "Order")
+    OrderRollup = apps.get_model("food", "OrderRollup")
+
+    rows = (
+        Order.objects.annotate(day=TruncDate("created_at", tzinfo=dt_timezone.utc))
+        .values("day", "food_id", "food__kitchen_id")
+        .annotate(
+            n_orders=models.Count("id"),
+            n_quantity=models.Sum("quantity"),
+            n_revenue=models.Sum("total_price"),
+            **{f"n_{status}": models.Count("id", filter=models.Q(status=status)) for status in STATUSES},
+        )
+        .order_by()
+    )
+    OrderRollup.objects.all().delete()
+    OrderRollup.objects.bulk_create(
+        [
+            OrderRollup(
+                day=row["day"], food_id=row["food_id"], kitchen_id=row["food__kitchen_id"],
+                orders=row["n_orders"], quantity=row["n_quantity"], revenue=row["n_revenue"],
+                **{status: row[f"n_{status}"] for status in STATUSES},
+            )
+            for row in rows.iterator(chunk_size=1000)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food', '0012_order_owner'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_order_rollups, migrations.RunPython.noop),
+    ]
@@ -2,15 +2,31 @@ from django.contrib.auth.models import User
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 
+# Largest value a BigAutoField (any 64-bit integer column) holds; bigger
+# numbers from clients overflow the database driver
+MAX_ID = 2**63 - 1
+
 class Kitchen(models.Model):
     name = models.CharField(max_length=120)
     owner_id = models.CharField(max_length=50)
     owner_name = models.CharField(max_length=120)
     image = models.ImageField(upload_to="kitchens/", null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True)
     rating = models.FloatField(default=0)
+    rating_sum = models.FloatField(default=0)
     rating_count = models.IntegerField(default=0)
     total_orders = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also set by the bulk UPDATEs in food.ratings / food.views
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner_id"], name="kitchen_owner_idx"),
+            # Default KitchenViewSet / homepage ordering, and ?ordering=-total_orders
+            models.Index(fields=["-rating", "id"], name="kitchen_rating_idx"),
+            models.Index(fields=["-total_orders", "id"], name="kitchen_orders_idx"),
+        ]
 
     @property
     def imageUrl(self):
@@ -45,7 +61,10 @@ class Food(models.Model):
     )
 
     image = models.ImageField(upload_to="foods/", null=True, blank=True)
+    image_variants = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also set by the bulk UPDATEs in food.checkout / food.images
+    updated_at = models.DateTimeField(auto_now=True)
 
     @property
     def imageUrl(self):
@@ -68,7 +87,144 @@ class Order(models.Model):
     quantity = models.PositiveIntegerField(default=1)
     total_price = models.FloatField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    # Kitchen.owner_id of the food's kitchen, copied so seller order lists
+    # range-scan one index instead of joining through Food and Kitchen
+    # (kept in step by food.denormalized)
+    owner_id = models.CharField(max_length=50, default="")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Keyset pagination walks these newest-first (see food.pagination)
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"], name="order_user_recent_idx"),
+            models.Index(fields=["owner_id", "-created_at", "-id"], name="order_owner_recent_idx"),
+        ]
+
     def __str__(self):
-        return f"Order {self.id} by {self.user.email}"
\ No newline at end of file
+        return f"Order {self.id} by {self.user.email}"
+
+
+class OrderEvent(models.Model):
+    """
+    Log of order status changes. Streamed to buyers and sellers by
+    food.events, and replayed from here when a stream resumes with
+    Last-Event-ID; the id is the event id.
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="events")
+    # The buyer and the kitchen owner, the two parties who are sent the event
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    owner_id = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    previous = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "id"], name="order_event_user_idx"),
+            models.Index(fields=["owner_id", "id"], name="order_event_owner_idx"),
+        ]
+
+
+class OrderRollup(models.Model):
+    """
+    Orders of one food on one day (UTC), kept in step by food.analytics and
+    rebuilt by `manage.py backfill_order_rollups`. `orders`, `quantity` and
+    `revenue` cover every order placed; the status columns count the orders
+    currently in each status.
+    """
+    day = models.DateField()
+    food = models.ForeignKey(Food, on_delete=models.CASCADE, related_name="rollups")
+    # Copied from the food so kitchen dashboards never join through Food
+    kitchen = models.ForeignKey(Kitchen, on_delete=models.CASCADE, related_name="rollups")
+    orders = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.FloatField(default=0)
+    pending = models.IntegerField(default=0)
+    accepted = models.IntegerField(default=0)
+    preparing = models.IntegerField(default=0)
+    ontheway = models.IntegerField(default=0)
+    delivered = models.IntegerField(default=0)
+    cancelled = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["food", "day"], name="rollup_food_day_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["kitchen", "day"], name="rollup_kitchen_day_idx"),
+        ]
+
+
+class Rating(models.Model):
+    kitchen = models.ForeignKey(Kitchen, on_delete=models.CASCADE, related_name="ratings")
+    user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="kitchen_ratings"
+    )
+    value = models.FloatField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    created_at = models.DateTimeField(auto_now_add=True)
+
+class LeaderboardEntry(models.Model):
+    """
+    Materialized ranking stats for one kitchen, kept in step by food.leaderboard
+    and rebuilt periodically by `manage.py rebuild_leaderboard`.
+    """
+    kitchen = models.OneToOneField(
+        Kitchen, on_delete=models.CASCADE, primary_key=True, related_name="leaderboard"
+    )
+    rating = models.FloatField(default=0)
+    rating_count = models.IntegerField(default=0)
+    total_orders = models.IntegerField(default=0)
+    # Orders placed in the last food.leaderboard.WINDOW_DAYS days
+    recent_orders = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-rating", "kitchen"], name="leaderboard_rating_idx"),
+            models.Index(fields=["-total_orders", "kitchen"], name="leaderboard_orders_idx"),
+            models.Index(fields=["-recent_orders", "kitchen"], name="leaderboard_velocity_idx"),
+        ]
+
+
+class FullTextField(models.TextField):
+    """FTS5 hidden column named after its table; supports the `match` lookup."""
+
+
+@FullTextField.register_lookup
+class FullTextMatch(models.Lookup):
+    lookup_name = "match"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+class FoodSearchIndex(models.Model):
+    """SQLite FTS5 index over Food, kept in sync by triggers (see migration 0004)."""
+
+    food = models.OneToOneField(
+        Food, on_delete=models.DO_NOTHING, primary_key=True,
+        db_column="rowid", related_name="search_index",
+    )
+    document = FullTextField(db_column="food_food_fts")
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "food_food_fts"
+
+
+class KitchenSearchIndex(models.Model):
+    """SQLite FTS5 index over Kitchen, kept in sync by triggers (see migration 0004)."""
+
+    kitchen = models.OneToOneField(
+        Kitchen, on_delete=models.DO_NOTHING, primary_key=True,
+        db_column="rowid", related_name="search_index",
+    )
+    document = FullTextField(db_column="food_kitchen_fts")
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = "food_kitchen_fts"
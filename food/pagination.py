@@ -0,0 +1,151 @@
+import base64
+import json
+import math
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .models import MAX_ID
+
+
+def encode_cursor(created_at, pk):
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split("|")
+        created_at, pk = datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise NotFound("Invalid cursor")
+    if not 0 <= pk <= MAX_ID:
+        raise NotFound("Invalid cursor")
+    return created_at, pk
+
+
+def decode_ranked_cursor(cursor):
+    """RankedPagination's cursor -> (value, pk, offset), checking each type."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, pk, offset = json.loads(raw)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise NotFound("Invalid cursor")
+    # bool is an int subclass; NaN and infinity are valid JSON to Python.
+    # Every number ends up compared with (or counts) 64-bit columns, so
+    # anything wider would overflow the driver or echo a nonsense rank
+    if (
+        isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value)
+        or not -MAX_ID <= value <= MAX_ID
+        or isinstance(pk, bool) or not isinstance(pk, int) or not 0 <= pk <= MAX_ID
+        or isinstance(offset, bool) or not isinstance(offset, int) or not 0 <= offset <= MAX_ID
+    ):
+        raise NotFound("Invalid cursor")
+    return value, pk, offset
+
+
+def after_cursor(queryset, cursor):
+    """Rows strictly after `cursor` in (-created_at, -id) order."""
+    created_at, pk = cursor
+    # The plain created_at bound is what the index seeks on; the OR alone
+    # would make it scan every newer row to reach a deep page
+    return queryset.filter(created_at__lte=created_at).filter(
+        Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+    )
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first cursor pagination on (created_at, id). Each page is a single
+    index range scan: no COUNT and no OFFSET, however deep the client pages.
+    """
+
+    page_size = 20
+    page_size_query_param = "pageSize"
+    max_page_size = 100
+    cursor_query_param = "cursor"
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.GET[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def _window(self, queryset, request):
+        self.request = request
+        self.page_size_for_request = self.get_page_size(request)
+
+        cursor = request.GET.get(self.cursor_query_param)
+        if cursor:
+            queryset = after_cursor(queryset, decode_cursor(cursor))
+        return queryset.order_by("-created_at", "-id")[:self.page_size_for_request + 1]
+
+    def _page(self, rows):
+        page = rows[:self.page_size_for_request]
+        has_next = len(rows) > self.page_size_for_request
+        self.next_cursor = None
+        if has_next:
+            last = page[-1]
+            # Rows are model instances or values() dicts
+            if isinstance(last, dict):
+                self.next_cursor = encode_cursor(last["created_at"], last["id"])
+            else:
+                self.next_cursor = encode_cursor(last.created_at, last.id)
+        return page
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self._page(list(self._window(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """Same as paginate_queryset, using the async ORM."""
+        return self._page([row async for row in self._window(queryset, request)])
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+
+class RankedPagination(KeysetPagination):
+    """
+    Cursor pagination for a leaderboard ordered by (-value_field, id_field).
+    The cursor carries the last row's value, id and rank, so every page is
+    one index range scan and still knows its absolute rank numbers.
+    """
+
+    def __init__(self, value_field, id_field="id"):
+        self.value_field = value_field
+        self.id_field = id_field
+
+    def _window(self, queryset, request):
+        self.request = request
+        self.page_size_for_request = self.get_page_size(request)
+        self.offset = 0
+
+        cursor = request.GET.get(self.cursor_query_param)
+        if cursor:
+            value, pk, self.offset = decode_ranked_cursor(cursor)
+            queryset = queryset.filter(
+                Q(**{f"{self.value_field}__lt": value})
+                | Q(**{self.value_field: value, f"{self.id_field}__gt": pk})
+            )
+        return queryset.order_by(f"-{self.value_field}", self.id_field)[:self.page_size_for_request + 1]
+
+    def _page(self, rows):
+        page = rows[:self.page_size_for_request]
+        self.next_cursor = None
+        if len(rows) > self.page_size_for_request:
+            last = page[-1]
+            raw = json.dumps([last[self.value_field], last[self.id_field], self.offset + len(page)])
+            self.next_cursor = base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+        return page
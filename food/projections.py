@@ -0,0 +1,180 @@
+"""
+Read-only list output built straight from values() rows.
+
+Each projection produces exactly what its serializer would for the same row
+(same keys, order and value types) without instantiating model objects or
+running per-row SerializerMethodFields. The absolute media URL prefix and
+the time zone are resolved once per request, and URLs once per distinct image.
+"""
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from rest_framework import serializers
+
+from .models import Food, Kitchen
+
+
+class MediaURLs:
+    """Media URLs as FileField and the imageUrl/imageVariants methods render them."""
+
+    def __init__(self, request, storage):
+        self.request = request
+        self.storage = storage
+        self.prefix = None
+        self.urls = {}
+        base_url = getattr(storage, "base_url", "") or ""
+        # For local files, build_absolute_uri(storage.url(name)) is always
+        # scheme://host + base_url + quoted name
+        if request is not None and isinstance(storage, FileSystemStorage) \
+                and base_url.startswith("/") and not base_url.startswith("//"):
+            self.prefix = request.build_absolute_uri(base_url)
+
+    def url(self, name):
+        """The `image` field: absolute with a request, storage URL without."""
+        url = self.urls.get(name)
+        if url is None:
+            if self.request is None:
+                url = self.storage.url(name)
+            elif self.prefix is not None and "/." not in name:
+                url = self.prefix + filepath_to_uri(name).lstrip("/")
+            else:
+                url = self.request.build_absolute_uri(self.storage.url(name))
+            self.urls[name] = url
+        return url
+
+    def link(self, name):
+        """`imageUrl` and `imageVariants`: absolute with a request, MEDIA_URL + name without."""
+        return self.url(name) if self.request is not None else settings.MEDIA_URL + name
+
+    def variants(self, image_variants):
+        return {
+            variant: {fmt: self.link(name) for fmt, name in formats.items()}
+            for variant, formats in (image_variants or {}).items()
+        }
+
+
+class ListProjection:
+    columns = ()
+    model = None
+
+    def __init__(self, request=None):
+        self.request = request
+        # Same formatting as the serializers' DateTimeField, with the zone looked up once
+        zone = timezone.get_current_timezone() if settings.USE_TZ else None
+        self.datetime = serializers.DateTimeField(default_timezone=zone).to_representation
+        if self.model is not None:
+            self.media = MediaURLs(request, self.model._meta.get_field("image").storage)
+
+    def values(self, queryset):
+        return queryset.values(*self.columns)
+
+    def render(self, rows):
+        return [self.row(row) for row in rows]
+
+    def row(self, row):
+        raise NotImplementedError
+
+
+class KitchenProjection(ListProjection):
+    """values() twin of KitchenSerializer."""
+
+    model = Kitchen
+    columns = (
+        "id", "name", "owner_id", "owner_name", "image", "image_variants",
+        "rating", "rating_count", "total_orders", "created_at",
+    )
+
+    def row(self, row):
+        image = row["image"]
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "owner_id": row["owner_id"],
+            "owner_name": row["owner_name"],
+            "image": self.media.url(image) if image else None,
+            "rating": float(row["rating"]),
+            "rating_count": int(row["rating_count"]),
+            "total_orders": int(row["total_orders"]),
+            "created_at": self.datetime(row["created_at"]),
+            "imageUrl": self.media.link(image) if image else None,
+            "imageVariants": self.media.variants(row["image_variants"]),
+        }
+
+
+class LeaderboardProjection(KitchenProjection):
+    """
+    KitchenProjection over LeaderboardEntry rows, plus `recent_orders`. The
+    ranking stats come from the entry so they match the order of the board.
+    """
+
+    columns = (
+        "kitchen_id", "kitchen__name", "kitchen__owner_id", "kitchen__owner_name",
+        "kitchen__image", "kitchen__image_variants", "kitchen__created_at",
+        "rating", "rating_count", "total_orders", "recent_orders",
+    )
+
+    def row(self, row):
+        data = super().row({
+            "id": row["kitchen_id"],
+            "name": row["kitchen__name"],
+            "owner_id": row["kitchen__owner_id"],
+            "owner_name": row["kitchen__owner_name"],
+            "image": row["kitchen__image"],
+            "image_variants": row["kitchen__image_variants"],
+            "rating": row["rating"],
+            "rating_count": row["rating_count"],
+            "total_orders": row["total_orders"],
+            "created_at": row["kitchen__created_at"],
+        })
+        data["recent_orders"] = int(row["recent_orders"])
+        return data
+
+
+class FoodProjection(ListProjection):
+    """values() twin of FoodSerializer."""
+
+    model = Food
+    columns = (
+        "id", "name", "kitchen_id", "kitchen_name", "price", "description", "quantity",
+        "delivery_time", "delivery_status", "image", "image_variants", "created_at",
+    )
+
+    def row(self, row):
+        image = row["image"]
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "kitchen": row["kitchen_id"],
+            "kitchenName": row["kitchen_name"],
+            "price": float(row["price"]),
+            "description": row["description"],
+            "quantity": int(row["quantity"]),
+            "deliveryTime": int(row["delivery_time"]),
+            "deliveryStatus": row["delivery_status"],
+            "image": self.media.url(image) if image else None,
+            "created_at": self.datetime(row["created_at"]),
+            "imageUrl": self.media.link(image) if image else None,
+            "imageVariants": self.media.variants(row["image_variants"]),
+        }
+
+
+class OrderProjection(ListProjection):
+    """values() twin of OrderSerializer (no media fields)."""
+
+    columns = (
+        "id", "food_id", "food__name", "food__kitchen_name",
+        "quantity", "total_price", "status", "created_at",
+    )
+
+    def row(self, row):
+        return {
+            "id": row["id"],
+            "food": row["food_id"],
+            "food_name": row["food__name"],
+            "kitchen_name": row["food__kitchen_name"],
+            "quantity": int(row["quantity"]),
+            "total_price": float(row["total_price"]),
+            "status": row["status"],
+            "created_at": self.datetime(row["created_at"]),
+        }
@@ -0,0 +1,71 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, FloatField, IntegerField, Value, When
+from django.db.models.functions import Now, Round
+
+from . import leaderboard
+from .cache import bump_version
+from .models import Kitchen, Rating
+
+
+def _aggregate_update(sum_delta, count_delta):
+    # Every right-hand side is evaluated against the row as it was before the
+    # UPDATE, so the new average is computed from the same sum and count
+    # that are being written, with no read-modify-write race
+    new_sum = F("rating_sum") + sum_delta
+    new_count = F("rating_count") + count_delta
+    return {
+        "rating_sum": new_sum,
+        "rating_count": new_count,
+        "rating": Round(new_sum / new_count, 2),
+        "updated_at": Now(),
+    }
+
+
+def rate_kitchen(kitchen_id, value, user=None):
+    """
+    Apply one rating with a single atomic UPDATE. Returns the kitchen's new
+    (rating, rating_count), or None if the kitchen does not exist.
+    """
+    with transaction.atomic():
+        updated = Kitchen.objects.filter(id=kitchen_id).update(
+            **_aggregate_update(Value(float(value)), Value(1))
+        )
+        if not updated:
+            return None
+        Rating.objects.create(kitchen_id=kitchen_id, user=user, value=value)
+        leaderboard.sync_ratings([kitchen_id])
+        result = Kitchen.objects.filter(id=kitchen_id).values_list("rating", "rating_count").get()
+        transaction.on_commit(lambda: bump_version(Kitchen))
+    return result
+
+
+def apply_ratings(ratings):
+    """
+    Apply a burst of ratings, given as (kitchen_id, value, user) tuples, with
+    one INSERT into the rating history and one UPDATE across all kitchens.
+    """
+    totals = defaultdict(lambda: [0.0, 0])
+    history = []
+    for kitchen_id, value, user in ratings:
+        totals[kitchen_id][0] += float(value)
+        totals[kitchen_id][1] += 1
+        history.append(Rating(kitchen_id=kitchen_id, user=user, value=value))
+    if not totals:
+        return 0
+
+    sum_delta = Case(
+        *[When(id=kitchen_id, then=Value(total)) for kitchen_id, (total, _) in totals.items()],
+        output_field=FloatField(),
+    )
+    count_delta = Case(
+        *[When(id=kitchen_id, then=Value(count)) for kitchen_id, (_, count) in totals.items()],
+        output_field=IntegerField(),
+    )
+    with transaction.atomic():
+        Rating.objects.bulk_create(history)
+        updated = Kitchen.objects.filter(id__in=totals).update(**_aggregate_update(sum_delta, count_delta))
+        leaderboard.sync_ratings(list(totals))
+        transaction.on_commit(lambda: bump_version(Kitchen))
+    return updated
@@ -0,0 +1,134 @@
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+from .models import Food, Kitchen
+
+TERM_RE = re.compile(r"\w+")
+MAX_TERMS = 8
+
+# Weighted columns per model; name matches outrank description matches.
+# The Postgres expressions must stay identical to the GIN indexes in
+# migration 0004 or the planner will not use them.
+SEARCH_COLUMNS = {
+    Food: [("name", "A"), ("kitchen_name", "B"), ("description", "C")],
+    Kitchen: [("name", "A"), ("owner_name", "B")],
+}
+
+
+# FTS5 tables and the source columns their triggers copy
+SQLITE_INDEXES = {
+    "food_food": ["name", "kitchen_name", "description"],
+    "food_kitchen": ["name", "owner_name"],
+}
+
+
+def ensure_sqlite_search_triggers(connection):
+    """
+    (Re)create the triggers that keep the FTS5 tables in sync. SQLite drops
+    triggers whenever a migration rebuilds a table, so this runs after every
+    migrate; it is a no-op when the triggers already exist.
+    """
+    with connection.cursor() as cursor:
+        existing = set(connection.introspection.table_names(cursor))
+        for table, columns in SQLITE_INDEXES.items():
+            fts = f"{table}_fts"
+            if fts not in existing or table not in existing:
+                continue
+            cols = ", ".join(columns)
+            new_cols = ", ".join(f"new.{c}" for c in columns)
+            old_cols = ", ".join(f"old.{c}" for c in columns)
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+                f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+                f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+                f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END"
+            )
+
+
+def search_terms(query):
+    return TERM_RE.findall(query.lower())[:MAX_TERMS]
+
+
+class SQLiteSearchBackend:
+    """FTS5 tables joined through the `search_index` relation."""
+
+    def filter(self, queryset, terms):
+        # Every term is a quoted prefix query, so "chick bir" matches
+        # "Chicken Biryani" while the user is still typing
+        match = " ".join(f'"{term}"*' for term in terms)
+        return queryset.filter(search_index__document__match=match)
+
+    def rank(self):
+        # bm25 is lower-is-better
+        return "search_index__rank"
+
+
+class PostgresSearchBackend:
+    """tsvector/tsquery matching backed by expression GIN indexes."""
+
+    def vector(self, model):
+        table = model._meta.db_table
+        return " || ".join(
+            f"setweight(to_tsvector('simple', coalesce(\"{table}\".\"{column}\", '')), '{weight}')"
+            for column, weight in SEARCH_COLUMNS[model]
+        )
+
+    def filter(self, queryset, terms):
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        vector = self.vector(queryset.model)
+        return queryset.annotate(
+            search_rank=RawSQL(
+                f"ts_rank(({vector}), to_tsquery('simple', %s))", [tsquery], output_field=FloatField()
+            )
+        ).filter(
+            RawSQL(f"({vector}) @@ to_tsquery('simple', %s)", [tsquery], output_field=BooleanField())
+        )
+
+    def rank(self):
+        return "-search_rank"
+
+
+SEARCH_BACKENDS = {
+    "sqlite": SQLiteSearchBackend(),
+    "postgresql": PostgresSearchBackend(),
+}
+
+
+def get_search_backend(queryset):
+    if queryset.model not in SEARCH_COLUMNS:
+        return None
+    return SEARCH_BACKENDS.get(connections[queryset.db].vendor)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    Drop-in replacement for SearchFilter that uses the database's full-text
+    index, ranks results by relevance unless the client asked for an explicit
+    ordering, and falls back to SearchFilter on other databases.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = search_terms(request.query_params.get(self.search_param, ""))
+        if not terms:
+            return queryset
+
+        backend = get_search_backend(queryset)
+        if backend is None:
+            return super().filter_queryset(request, queryset, view)
+
+        queryset = backend.filter(queryset, terms)
+        if not request.query_params.get(api_settings.ORDERING_PARAM):
+            queryset = queryset.order_by(backend.rank(), *queryset.query.order_by)
+        return queryset
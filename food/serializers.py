@@ -1,17 +1,47 @@
 from rest_framework import serializers
 from django.conf import settings
+from .images import schedule_variants
 from .models import Food, Kitchen, Order
 
-class KitchenSerializer(serializers.ModelSerializer):
+
+class ImageVariantsMixin:
+    """Exposes processed thumbnails/WebP/AVIF copies of `image` (see food.images)."""
+
+    def get_imageVariants(self, obj):
+        request = self.context.get('request')
+        storage = obj.image.storage
+        return {
+            variant: {
+                fmt: request.build_absolute_uri(storage.url(name)) if request else settings.MEDIA_URL + name
+                for fmt, name in formats.items()
+            }
+            for variant, formats in (obj.image_variants or {}).items()
+        }
+
+    def reset_variants(self, validated_data):
+        # Variants of a replaced image must not outlive it
+        if "image" in validated_data:
+            validated_data["image_variants"] = {}
+
+    def queue_variants(self, instance, validated_data):
+        # Resizing runs in the image worker pool after commit, never in the request
+        if validated_data.get("image"):
+            schedule_variants(instance)
+
+
+class KitchenSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     imageUrl = serializers.SerializerMethodField()
+    imageVariants = serializers.SerializerMethodField()
 
     class Meta:
         model = Kitchen
         fields = [
             "id", "name", "owner_id", "owner_name",
             "image", "rating","rating_count", "total_orders",
-            "created_at", "imageUrl"
+            "created_at", "imageUrl", "imageVariants"
         ]
+        # Aggregates are maintained with atomic UPDATEs (see food.ratings)
+        read_only_fields = ["rating", "rating_count", "total_orders"]
 
     def get_imageUrl(self, obj):
         request = self.context.get('request')
@@ -19,9 +49,25 @@ class KitchenSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.image.url) if request else settings.MEDIA_URL + obj.image.name
         return None
 
+    def create(self, validated_data):
+        self.reset_variants(validated_data)
+        instance = super().create(validated_data)
+        self.queue_variants(instance, validated_data)
+        return instance
+
+    def update(self, instance, validated_data):
+        self.reset_variants(validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Only write the edited columns so a concurrent rating is not overwritten
+        instance.save(update_fields=[*validated_data, "updated_at"])
+        self.queue_variants(instance, validated_data)
+        return instance
+
 
-class FoodSerializer(serializers.ModelSerializer):
+class FoodSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     imageUrl = serializers.SerializerMethodField()
+    imageVariants = serializers.SerializerMethodField()
     kitchen = serializers.PrimaryKeyRelatedField(queryset=Kitchen.objects.all())
     kitchenName = serializers.CharField(source="kitchen_name", read_only=True)
     deliveryTime = serializers.IntegerField(source="delivery_time")
@@ -38,7 +84,7 @@ class FoodSerializer(serializers.ModelSerializer):
             "id", "name", "kitchen", "kitchenName",
             "price", "description", "quantity",
             "deliveryTime", "deliveryStatus",
-            "image", "created_at", "imageUrl"
+            "image", "created_at", "imageUrl", "imageVariants"
         ]
         extra_kwargs = {
             "image": {"required": False, "allow_null": True},
@@ -60,8 +106,24 @@ class FoodSerializer(serializers.ModelSerializer):
         # Set default delivery_status if not provided
         if 'delivery_status' not in validated_data:
             validated_data['delivery_status'] = 'pending'
-        
-        return super().create(validated_data)
+
+        self.reset_variants(validated_data)
+        instance = super().create(validated_data)
+        self.queue_variants(instance, validated_data)
+        return instance
+
+    def update(self, instance, validated_data):
+        # A food moved to another kitchen takes that kitchen's name
+        if "kitchen" in validated_data:
+            validated_data["kitchen_name"] = validated_data["kitchen"].name
+        self.reset_variants(validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Only write the edited columns so stock taken by a concurrent
+        # checkout is not put back from this request's stale copy
+        instance.save(update_fields=[*validated_data, "updated_at"])
+        self.queue_variants(instance, validated_data)
+        return instance
 
 
 class OrderSerializer(serializers.ModelSerializer):
@@ -0,0 +1,58 @@
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from user.models import UserProfile
+
+from . import analytics, denormalized, leaderboard
+from .cache import bump_version
+from .models import Food, Kitchen
+from .search import ensure_sqlite_search_triggers
+
+
+@receiver([post_save, post_delete], sender=Kitchen)
+@receiver([post_save, post_delete], sender=Food)
+def invalidate_cached_responses(sender, **kwargs):
+    bump_version(sender)
+
+
+@receiver(post_save, sender=Kitchen)
+def create_leaderboard_entry(sender, instance, created, **kwargs):
+    if created:
+        leaderboard.create_entry(instance)
+
+
+@receiver(post_save, sender=Kitchen)
+def propagate_kitchen_name(sender, instance, created, update_fields, **kwargs):
+    if not created and (update_fields is None or "name" in update_fields):
+        denormalized.sync_kitchen_name(instance.id, instance.name)
+
+
+@receiver(post_save, sender=Kitchen)
+def propagate_kitchen_owner(sender, instance, created, update_fields, **kwargs):
+    if not created and (update_fields is None or "owner_id" in update_fields):
+        denormalized.sync_kitchen_owner(instance.id)
+
+
+@receiver(post_save, sender=Food)
+def propagate_food_owner(sender, instance, created, update_fields, **kwargs):
+    if not created and (update_fields is None or "kitchen" in update_fields):
+        denormalized.sync_food_owner(instance.id)
+
+
+@receiver(post_save, sender=Food)
+def move_order_rollups(sender, instance, created, update_fields, **kwargs):
+    if not created and (update_fields is None or "kitchen" in update_fields):
+        analytics.record_move(instance.id, instance.kitchen_id)
+
+
+@receiver(post_save, sender=UserProfile)
+def propagate_owner_name(sender, instance, created, update_fields, **kwargs):
+    if not created and (update_fields is None or "name" in update_fields):
+        denormalized.sync_owner_name(instance.uid_id, instance.name)
+
+
+@receiver(post_migrate)
+def restore_search_triggers(sender, using, **kwargs):
+    if sender.label == "food" and connections[using].vendor == "sqlite":
+        ensure_sqlite_search_triggers(connections[using])
@@ -1,3 +1,1128 @@
-from django.test import TestCase
+import asyncio
+import base64
+import csv
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.db.models import F
+from django.test import (
+    Client, LiveServerTestCase, RequestFactory, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+
+from barirswad.handlers import ASGIHandler
+from barirswad.renderers import FastJSONRenderer
+from user.models import UserProfile
+
+from . import analytics, export, leaderboard
+from .cache import get_cache, reset_response_cache_stats, response_cache_metrics, response_cache_stats
+from .checks import check_response_cache
+from .checkout import place_order
+from .events import DatabaseBroker, channels_for, get_broker
+from .images import available_formats, process_image, render_variants
+from .models import Food, Kitchen, LeaderboardEntry, Order, OrderEvent, OrderRollup, Rating
+from .pagination import encode_cursor
+from .projections import FoodProjection, KitchenProjection, OrderProjection
+from .serializers import FoodSerializer, KitchenSerializer, OrderSerializer
+
+# Tests run in one process, so a LocMemCache behaves like the shared cache;
+# throttling has its own tests (barirswad.tests), not every test client
+TEST_SETTINGS = {
+    "CACHES": {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "food-tests"}},
+    "THROTTLE_RATES": {},
+}
+
+
+def run_concurrently(func, calls):
+    """Call func(*args) for each args in `calls`, all at once, one thread each; returns the results."""
+    barrier = threading.Barrier(len(calls))
+    results, errors = [None] * len(calls), []
+
+    def worker(i, args):
+        try:
+            barrier.wait()
+            results[i] = func(*args)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(i, args)) for i, args in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+def create_kitchen(name="Kitchen", **kwargs):
+    return Kitchen.objects.create(name=name, owner_id="0", owner_name="Owner", **kwargs)
+
+
+def create_food(kitchen, name="Dish", **kwargs):
+    kwargs = {"price": 100, "description": "", "quantity": 10, **kwargs}
+    return Food.objects.create(name=name, kitchen=kitchen, kitchen_name=kitchen.name, **kwargs)
+
+
+@override_settings(**TEST_SETTINGS)
+class HomepageTests(TestCase):
+    url = "/api/food/homepage/"
+
+    def setUp(self):
+        for i in range(25):
+            kitchen = create_kitchen(name=f"Kitchen {i}", rating=i % 5)
+            Food.objects.bulk_create([
+                Food(name=f"Dish {i}-{j}", kitchen=kitchen, kitchen_name=kitchen.name, price=100, description="",
+                     quantity=10)
+                for j in range(8)
+            ])
+        # Start from an empty cache, as after a restart
+        get_cache().clear()
+
+    def test_queries(self):
+        # Cold: count, kitchen page and foods, plus one Max(updated_at) per
+        # model to seed the Last-Modified stamps
+        with self.assertNumQueries(5):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "MISS")
+        data = response.json()
+        self.assertEqual(data["count"], 25)
+        self.assertEqual(len(data["results"]), 10)
+        for kitchen in data["results"]:
+            self.assertEqual(len(kitchen["foods"]), 5)
+            self.assertTrue(all(food["kitchen"] == kitchen["id"] for food in kitchen["foods"]))
+
+        # Warm: served from the response cache
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached["X-Cache"], "HIT")
+        self.assertEqual(cached.json(), data)
+
+        # Another page: the stamps are already seeded
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {"page": 3})
+        self.assertEqual(len(response.json()["results"]), 5)
+
+
+class ProjectionTests(TestCase):
+    # Awkward names on purpose: the projection quotes them itself
+    image_names = ["foods/plain.jpg", "foods/with space.jpg", "foods/ভাত (1).jpg", "foods/a+b&c.png", ""]
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(42)
+        user = User.objects.create_user(username="owner@example.com", password="x")
+        kitchens = Kitchen.objects.bulk_create([
+            Kitchen(
+                name=f"Kitchen {i}", owner_id=str(user.id), owner_name="Owner",
+                image=rng.choice(cls.image_names).replace("foods/", "kitchens/"),
+                rating=round(rng.uniform(0, 5), 2), rating_count=rng.randint(0, 50),
+            )
+            for i in range(10)
+        ])
+        foods = []
+        for i in range(100):
+            image = rng.choice(cls.image_names)
+            kitchen = rng.choice(kitchens)
+            foods.append(Food(
+                name=f"Dish {i}", kitchen=kitchen, kitchen_name=kitchen.name,
+                price=rng.choice([200, 149.5, 0.1, 1e16]), description="Rice — with salad",
+                quantity=rng.randint(0, 20), delivery_time=rng.randint(10, 90), image=image,
+                image_variants={"thumb": {"webp": f"{image.rsplit('.', 1)[0]}_thumb.webp"}} if image else {},
+            ))
+        foods = Food.objects.bulk_create(foods)
+        Order.objects.bulk_create([
+            Order(user=user, food=rng.choice(foods), quantity=2, total_price=rng.uniform(100, 900))
+            for _ in range(100)
+        ])
+
+    def test_projections_match_serializers(self):
+        renderer = FastJSONRenderer()
+        request = Request(RequestFactory().get("/api/food/foods/", HTTP_HOST="api.example.com"))
+        cases = [
+            (Food.objects.order_by("created_at"), FoodSerializer, FoodProjection, (request, None)),
+            (Kitchen.objects.order_by("-rating", "id"), KitchenSerializer, KitchenProjection, (request, None)),
+            (Order.objects.select_related("food").order_by("-created_at", "-id"), OrderSerializer, OrderProjection,
+             (None,)),
+        ]
+        for queryset, serializer_class, projection_class, requests in cases:
+            for context_request in requests:
+                with self.subTest(serializer=serializer_class.__name__, request=context_request):
+                    serializer = serializer_class(list(queryset), many=True, context={"request": context_request})
+                    projection = projection_class(context_request)
+                    self.assertEqual(
+                        renderer.render(projection.render(projection.values(queryset))),
+                        renderer.render(serializer.data),
+                    )
+
+
+@override_settings(**TEST_SETTINGS)
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        self.kitchen = create_kitchen()
+        create_food(self.kitchen)
+
+    def add_food(self):
+        create_food(self.kitchen, name="New dish")
+
+    def rename_kitchen(self):
+        self.kitchen.name = "Renamed"
+        self.kitchen.save(update_fields=["name", "updated_at"])
+
+    def add_kitchen(self):
+        # A new kitchen also gets a leaderboard entry
+        create_kitchen(name="Another kitchen")
+
+    def assert_revalidates(self, url, write):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag, last_modified = first["ETag"], first["Last-Modified"]
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        # Last-Modified has one-second resolution: make the write land in a later second
+        with mock.patch("food.cache.time.time", return_value=time.time() + 2):
+            with self.captureOnCommitCallbacks(execute=True):
+                write()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    def test_homepage(self):
+        self.assert_revalidates("/api/food/homepage/", self.add_food)
+
+    def test_kitchen_list(self):
+        self.assert_revalidates("/api/food/kitchens/", self.rename_kitchen)
+
+    def test_food_list(self):
+        self.assert_revalidates("/api/food/foods/", self.add_food)
+
+    def test_food_list_after_kitchen_change(self):
+        self.assert_revalidates("/api/food/foods/", self.rename_kitchen)
+
+    def test_top_kitchens(self):
+        self.assert_revalidates("/api/food/kitchens/top/", self.add_kitchen)
+
+    def test_async_homepage(self):
+        self.assert_revalidates("/api/food/async/homepage/", self.add_food)
+
+    def test_async_kitchen_list(self):
+        self.assert_revalidates("/api/food/async/kitchens/", self.rename_kitchen)
+
+    def test_async_food_list(self):
+        self.assert_revalidates("/api/food/async/foods/", self.add_food)
+
+    def test_errors_not_revalidated(self):
+        # Validators that match anything must not turn the view's error into a 304
+        future = http_date(time.time() + 3600)
+        for url, status in [("/api/food/kitchens/top/?by=bogus", 400), ("/api/food/async/foods/?page=bogus", 404)]:
+            for headers in [{"HTTP_IF_NONE_MATCH": "*"}, {"HTTP_IF_MODIFIED_SINCE": future}]:
+                with self.subTest(url=url, headers=headers):
+                    self.assertEqual(self.client.get(url, **headers).status_code, status)
+        # Once a 200 is stored for the key, the same validators get a 304
+        url = "/api/food/kitchens/top/?by=orders"
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH="*").status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=future).status_code, 304)
+
+
+@override_settings(**TEST_SETTINGS)
+class ResponseCacheTests(TestCase):
+    url = "/api/food/kitchens/"
+
+    def setUp(self):
+        create_kitchen()
+        reset_response_cache_stats()
+
+    def test_stats_and_metrics(self):
+        self.assertEqual(self.client.get(self.url)["X-Cache"], "MISS")
+        response = self.client.get(self.url)
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        self.assertEqual(response_cache_stats(), {"hits": 1, "misses": 1, "not_modified": 1})
+        lines = response_cache_metrics()
+        self.assertIn('response_cache_requests_total{outcome="hit"} 1', lines)
+        self.assertIn('response_cache_requests_total{outcome="miss"} 1', lines)
+        self.assertIn('response_cache_requests_total{outcome="not_modified"} 1', lines)
+
+        reset_response_cache_stats()
+        self.assertEqual(response_cache_stats(), {"hits": 0, "misses": 0, "not_modified": 0})
+
+    def test_per_process_cache_check(self):
+        self.assertEqual([error.id for error in check_response_cache(None)], ["food.W001"])
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={"default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": directory,
+        }}):
+            self.assertEqual(check_response_cache(None), [])
+
+
+@override_settings(**TEST_SETTINGS)
+class SearchTests(TestCase):
+    def setUp(self):
+        self.grill = Kitchen.objects.create(name="Dhaka Grill", owner_id="0", owner_name="Rahim")
+        self.spice = Kitchen.objects.create(name="Spice Home", owner_id="0", owner_name="Karim")
+        self.biryani = create_food(self.grill, "Chicken Biryani", description="Basmati rice", price=300)
+        self.tehari = create_food(self.spice, "Beef Tehari", description="Cooked in chicken stock", price=250)
+        self.kebab = create_food(self.grill, "Chicken Kebab", description="Charcoal grilled", price=200)
+
+    def search(self, query, model="foods", **params):
+        # Every request is a cache miss, so each one reads the index
+        get_cache().clear()
+        response = self.client.get(f"/api/food/{model}/", {"search": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row["name"] for row in response.json()["results"]]
+
+    def test_prefix_matching(self):
+        self.assertEqual(set(self.search("chick bir")), {"Chicken Biryani"})
+        self.assertEqual(set(self.search("KEB")), {"Chicken Kebab"})
+        # Kitchen and owner names are indexed too
+        self.assertEqual(set(self.search("dhaka")), {"Chicken Biryani", "Chicken Kebab"})
+        self.assertEqual(self.search("rah", model="kitchens"), ["Dhaka Grill"])
+        self.assertEqual(self.search("pizza"), [])
+
+    def test_rank(self):
+        # Name matches outrank a description match
+        names = self.search("chicken")
+        self.assertEqual(set(names[:2]), {"Chicken Biryani", "Chicken Kebab"})
+        self.assertEqual(names[2], "Beef Tehari")
+
+    def test_explicit_ordering_wins(self):
+        self.assertEqual(self.search("chicken", ordering="price"), ["Chicken Kebab", "Beef Tehari", "Chicken Biryani"])
+        self.assertEqual(self.search("chicken", ordering="-price"), ["Chicken Biryani", "Beef Tehari", "Chicken Kebab"])
+
+    def test_quotes_and_operators(self):
+        # Punctuation never reaches the MATCH syntax and operator words are
+        # plain terms, required like any other
+        self.assertEqual(self.search('"*( OR'), [])
+        self.assertEqual(self.search('chicken" OR "beef'), [])
+        self.assertEqual(self.search("beef NEAR("), [])
+        self.assertEqual(set(self.search("-tehari*")), {"Beef Tehari"})
+        # Nothing searchable: the list is not filtered at all
+        self.assertEqual(len(self.search('"*()')), 3)
+
+    def test_index_follows_writes(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Only SQLite keeps a separate index")
+        self.biryani.name = "Mutton Biryani"
+        self.biryani.save()
+        self.assertEqual(set(self.search("mutton")), {"Mutton Biryani"})
+        self.assertEqual(set(self.search("chicken bir")), set())
+
+        # Renaming a kitchen rewrites its foods' kitchen_name in one UPDATE
+        self.grill.name = "Old Dhaka Grill"
+        self.grill.save()
+        self.assertEqual(set(self.search("old dhaka")), {"Mutton Biryani", "Chicken Kebab"})
+        self.assertEqual(self.search("old", model="kitchens"), ["Old Dhaka Grill"])
+
+        self.kebab.delete()
+        self.assertEqual(set(self.search("kebab")), set())
+        self.spice.delete()
+        self.assertEqual(self.search("spice", model="kitchens"), [])
+        self.assertEqual(self.search("tehari"), [])
+
+
+@override_settings(**TEST_SETTINGS)
+class DenormalizedTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("seller@example.com")
+        self.profile = UserProfile.objects.create(uid=self.user, name="Seller", role="seller")
+        self.kitchens = [
+            Kitchen.objects.create(name=f"Kitchen {i}", owner_id=str(self.user.id), owner_name="Seller")
+            for i in range(4)
+        ]
+        for kitchen in self.kitchens:
+            Food.objects.bulk_create([
+                Food(name=f"Dish {j}", kitchen=kitchen, kitchen_name=kitchen.name, price=100, description="",
+                     quantity=10)
+                for j in range(25)
+            ])
+        buyer = User.objects.create_user("buyer@example.com")
+        Order.objects.bulk_create([
+            Order(user=buyer, food=food, total_price=100, owner_id=str(self.user.id)) for food in Food.objects.all()
+        ])
+
+    def test_kitchen_rename(self):
+        kitchen = self.kitchens[0]
+        kitchen.name = "Renamed"
+        # The kitchen, then all of its foods in one UPDATE
+        with self.assertNumQueries(2):
+            kitchen.save(update_fields=["name"])
+        self.assertEqual(set(kitchen.foods.values_list("kitchen_name", flat=True)), {"Renamed"})
+        self.assertFalse(Food.objects.exclude(kitchen=kitchen).filter(kitchen_name="Renamed").exists())
+
+    def test_profile_rename(self):
+        self.profile.name = "New Name"
+        # The profile, the user's tokens to evict from the token cache, then
+        # all of their kitchens in one UPDATE
+        with self.assertNumQueries(3):
+            self.profile.save(update_fields=["name"])
+        self.assertEqual(set(Kitchen.objects.values_list("owner_name", flat=True)), {"New Name"})
+
+    def test_repair(self):
+        # Writes that bypass the ORM signals
+        Food.objects.filter(kitchen=self.kitchens[1]).update(kitchen_name="Stale")
+        Kitchen.objects.filter(id__in=[k.id for k in self.kitchens[2:]]).update(owner_name="Stale")
+        Order.objects.filter(food__kitchen=self.kitchens[3]).update(owner_id="Stale")
+
+        with self.assertRaisesMessage(
+            CommandError, "Stale copies: 25 food kitchen names, 2 kitchen owner names, 25 order owners"
+        ):
+            call_command("repair_denormalized", "--check", stdout=StringIO())
+        out = StringIO()
+        call_command("repair_denormalized", "--chunk-size", "3", stdout=out)
+        self.assertIn("Repaired 25 food kitchen names, 2 kitchen owner names and 25 order owners", out.getvalue())
+
+        self.assertFalse(Food.objects.exclude(kitchen_name=F("kitchen__name")).exists())
+        self.assertEqual(set(Kitchen.objects.values_list("owner_name", flat=True)), {"Seller"})
+        self.assertEqual(set(Order.objects.values_list("owner_id", flat=True)), {str(self.user.id)})
+        call_command("repair_denormalized", "--check", stdout=StringIO())
+
+
+@override_settings(**TEST_SETTINGS)
+class RankedPaginationTests(TestCase):
+    url = "/api/food/kitchens/top/"
+
+    def setUp(self):
+        for i in range(5):
+            create_kitchen(name=f"Kitchen {i}")
+
+    def cursor(self, value):
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+    def test_pages_carry_ranks(self):
+        first = self.client.get(self.url, {"pageSize": 2}).json()
+        self.assertEqual([k["rank"] for k in first["results"]], [1, 2])
+        second = self.client.get(first["next"]).json()
+        self.assertEqual([k["rank"] for k in second["results"]], [3, 4])
+
+    def test_invalid_cursors(self):
+        cursors = [
+            "not base64!",
+            self.cursor([1, 1]),
+            self.cursor({"a": 1}),
+            # [1, 1, "a"]: used to reach the rank arithmetic and fail with a 500
+            "WzEsMSwiYSJd",
+            self.cursor([1, 1, -1]),
+            self.cursor([1, 1, 1.5]),
+            self.cursor([1, 1, True]),
+            self.cursor([1, "1", 0]),
+            self.cursor([1, None, 0]),
+            self.cursor(["1", 1, 0]),
+            self.cursor([[1], 1, 0]),
+            base64.urlsafe_b64encode(b"[NaN, 1, 0]").decode(),
+            # Out of the 64-bit range: used to overflow the driver or echo the rank
+            self.cursor([2**70, 1, 0]),
+            self.cursor([1, 2**70, 0]),
+            self.cursor([1, 1, 2**70]),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), {"detail": "Invalid cursor"})
+
+
+@override_settings(**TEST_SETTINGS)
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        seller = User.objects.create_user("seller@example.com")
+        self.kitchen = Kitchen.objects.create(name="Kitchen", owner_id=str(seller.id), owner_name="Seller")
+        self.food = create_food(self.kitchen)
+        self.token = Token.objects.create(user=seller).key
+        self.buyer = User.objects.create_user("buyer@example.com")
+
+    def recent_orders(self):
+        return LeaderboardEntry.objects.get(kitchen=self.kitchen).recent_orders
+
+    def set_status(self, order, status):
+        response = self.client.patch(
+            f"/api/food/orders/{order.id}/status/", {"status": status},
+            content_type="application/json", HTTP_AUTHORIZATION=f"Token {self.token}",
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_cancelled_orders_leave_the_velocity_board(self):
+        first, = place_order(self.buyer, {self.food.id: 1})
+        place_order(self.buyer, {self.food.id: 2})
+        self.assertEqual(self.recent_orders(), 2)
+
+        self.set_status(first, "cancelled")
+        self.assertEqual(self.recent_orders(), 1)
+        # Nothing for rebuild() to correct
+        self.assertEqual(leaderboard.rebuild(), 0)
+
+        self.set_status(first, "pending")
+        self.assertEqual(self.recent_orders(), 2)
+        self.assertEqual(leaderboard.rebuild(), 0)
+
+    def test_orders_outside_the_window(self):
+        order, = place_order(self.buyer, {self.food.id: 1})
+        Order.objects.update(created_at=timezone.now() - timedelta(days=leaderboard.WINDOW_DAYS + 1))
+        leaderboard.rebuild()
+        self.set_status(order, "cancelled")
+        self.assertEqual(self.recent_orders(), 0)
+
+
+@override_settings(**TEST_SETTINGS)
+class SellerStatsTests(TestCase):
+    url = "/api/food/orders/seller/stats/"
+
+    def setUp(self):
+        seller = User.objects.create_user("seller@example.com")
+        self.token = Token.objects.create(user=seller).key
+        self.kitchens = [
+            Kitchen.objects.create(name=f"Kitchen {i}", owner_id=str(seller.id), owner_name="Seller") for i in range(2)
+        ]
+        self.foods = [create_food(kitchen, price=100) for kitchen in self.kitchens]
+        self.other = create_food(create_kitchen(name="Someone else's"), price=100)
+        buyer = User.objects.create_user("buyer@example.com")
+        self.today = timezone.now().date()
+        # (food, days ago, quantity)
+        for food, days, quantity in [
+            (self.foods[0], 0, 1), (self.foods[0], 2, 2), (self.foods[1], 2, 3), (self.foods[1], 40, 4),
+            (self.other, 0, 5),
+        ]:
+            order, = place_order(buyer, {food.id: quantity})
+            Order.objects.filter(id=order.id).update(created_at=timezone.now() - timedelta(days=days))
+        analytics.rebuild()
+
+    def stats(self, **params):
+        response = self.client.get(self.url, params, HTTP_AUTHORIZATION=f"Token {self.token}")
+        return response.status_code, response.json()
+
+    def test_default_range(self):
+        status, data = self.stats()
+        self.assertEqual(status, 200)
+        self.assertEqual(data["from"], (self.today - timedelta(days=29)).isoformat())
+        self.assertEqual(data["to"], self.today.isoformat())
+        self.assertEqual(data["totals"]["orders"], 3)
+        self.assertEqual(data["totals"]["quantity"], 6)
+        self.assertEqual(data["totals"]["revenue"], 600)
+        self.assertEqual(data["totals"]["status"]["pending"], 3)
+        self.assertEqual(
+            [(k["id"], k["orders"]) for k in data["kitchens"]], [(self.kitchens[0].id, 2), (self.kitchens[1].id, 1)]
+        )
+        self.assertEqual(
+            [(day["day"], day["orders"]) for day in data["days"]],
+            [((self.today - timedelta(days=2)).isoformat(), 2), (self.today.isoformat(), 1)],
+        )
+
+    def test_date_range(self):
+        start = (self.today - timedelta(days=45)).isoformat()
+        _, data = self.stats(**{"from": start, "to": (self.today - timedelta(days=1)).isoformat()})
+        self.assertEqual((data["totals"]["orders"], data["totals"]["quantity"]), (3, 9))
+        _, data = self.stats(**{"from": self.today.isoformat()})
+        self.assertEqual(data["totals"]["orders"], 1)
+
+    def test_kitchen_filter(self):
+        _, data = self.stats(kitchen=self.kitchens[1].id, **{"from": (self.today - timedelta(days=45)).isoformat()})
+        self.assertEqual([k["id"] for k in data["kitchens"]], [self.kitchens[1].id])
+        self.assertEqual(data["totals"]["quantity"], 7)
+        # Not the seller's kitchen
+        _, data = self.stats(kitchen=self.other.kitchen_id)
+        self.assertEqual((data["kitchens"], data["totals"]["orders"]), ([], 0))
+
+    def test_invalid_params(self):
+        for params in [{"from": "yesterday"}, {"to": "2024-02-30"}, {"kitchen": "one"},
+                       {"from": self.today.isoformat(), "to": (self.today - timedelta(days=1)).isoformat()}]:
+            with self.subTest(params=params):
+                self.assertEqual(self.stats(**params)[0], 400)
+
+    def test_moved_food_takes_its_orders(self):
+        food = self.foods[0]
+        food.kitchen = self.kitchens[1]
+        food.save(update_fields=["kitchen"])
+        _, data = self.stats()
+        self.assertEqual([(k["id"], k["orders"]) for k in data["kitchens"]], [(self.kitchens[1].id, 3)])
+        # The same as rebuilding them from Order
+        before = list(OrderRollup.objects.order_by("id").values("day", "food", "kitchen", "orders"))
+        analytics.rebuild()
+        self.assertCountEqual(list(OrderRollup.objects.values("day", "food", "kitchen", "orders")), before)
+
+
+@override_settings(**TEST_SETTINGS)
+class OrderExportTests(TestCase):
+    urls = ["/api/food/orders/seller/export/", "/api/food/async/orders/seller/export/"]
+
+    def setUp(self):
+        seller = User.objects.create_user("seller@example.com")
+        self.auth = {"HTTP_AUTHORIZATION": f"Token {Token.objects.create(user=seller).key}"}
+        food = create_food(Kitchen.objects.create(name="Kitchen", owner_id=str(seller.id), owner_name="Seller"))
+        other = create_food(create_kitchen(name="Other"))
+        buyer = User.objects.create_user("buyer@example.com")
+        orders = Order.objects.bulk_create(
+            [Order(user=buyer, food=food, total_price=100, owner_id=str(seller.id)) for _ in range(7)]
+            + [Order(user=buyer, food=other, total_price=100, owner_id="0") for _ in range(2)]
+        )
+        self.other_id = orders[-1].id
+        # Newest first, ties broken by id
+        Order.objects.filter(id__in=[o.id for o in orders[:3]]).update(created_at=timezone.now() - timedelta(hours=1))
+        self.ids = list(
+            Order.objects.filter(food=food).order_by("-created_at", "-id").values_list("id", flat=True)
+        )
+
+    def export(self, url, **params):
+        response = self.client.get(url, params, **self.auth)
+        if response.status_code != 200:
+            return response, None
+        if response.is_async:
+            async def collect():
+                return [chunk async for chunk in response.streaming_content]
+            return response, async_to_sync(collect)()
+        return response, list(response.streaming_content)
+
+    def test_ndjson(self):
+        for url in self.urls:
+            with self.subTest(url=url), mock.patch("food.export.EXPORT_BATCH_ROWS", 3):
+                response, chunks = self.export(url)
+                self.assertEqual(response["Content-Type"], "application/x-ndjson")
+                # Empty header, then batches of 3 written as they are read
+                self.assertEqual([chunk.count(b"\n") for chunk in chunks], [0, 3, 3, 1])
+                rows = [json.loads(line) for line in b"".join(chunks).splitlines()]
+                self.assertEqual([row["id"] for row in rows], self.ids)
+                self.assertEqual(list(rows[0]), export.FIELDS)
+
+    def test_csv(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response, chunks = self.export(url, type="csv")
+                self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+                self.assertIn('filename="orders.csv"', response["Content-Disposition"])
+                rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+                self.assertEqual([int(row["id"]) for row in rows], self.ids)
+                self.assertEqual(rows[0]["food_name"], "Dish")
+
+    def test_resume(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                # Across the created_at tie and past it
+                for position in (1, 4):
+                    _, chunks = self.export(url, after=self.ids[position])
+                    rows = [json.loads(line) for line in b"".join(chunks).splitlines()]
+                    self.assertEqual([row["id"] for row in rows], self.ids[position + 1:])
+
+    def test_invalid_params(self):
+        for url in self.urls:
+            # Another seller's order is not a cursor into this export
+            for after in ["abc", "0", "-1", str(2**70), str(self.other_id), "1.5"]:
+                with self.subTest(url=url, after=after):
+                    response, _ = self.export(url, after=after)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json(), {"error": "Invalid 'after' cursor"})
+            response, _ = self.export(url, type="xml")
+            self.assertEqual(response.status_code, 400)
+
+
+@override_settings(**TEST_SETTINGS)
+class OrderPaginationTests(TestCase):
+    def setUp(self):
+        self.buyer = User.objects.create_user("buyer@example.com", "buyer@example.com", "password")
+        self.seller = User.objects.create_user("seller@example.com", "seller@example.com", "password")
+        kitchen = Kitchen.objects.create(name="Kitchen", owner_id=str(self.seller.id), owner_name="Seller")
+        food = create_food(kitchen)
+        other = create_food(create_kitchen(name="Other"))
+        Order.objects.bulk_create([
+            Order(user=self.buyer, food=food, total_price=100, owner_id=kitchen.owner_id) for _ in range(11)
+        ] + [
+            # Somebody else's orders: never on either list
+            Order(user=self.seller, food=other, total_price=100, owner_id=other.kitchen.owner_id) for _ in range(3)
+        ])
+
+    def get(self, url, user, params=None):
+        token, _ = Token.objects.get_or_create(user=user)
+        return self.client.get(url, params, HTTP_AUTHORIZATION=f"Token {token.key}")
+
+    def pages(self, url, user):
+        ids, url, params = [], url, {"pageSize": 3}
+        while url:
+            data = self.get(url, user, params).json()
+            ids += [order["id"] for order in data["results"]]
+            url, params = data["next"], None
+        return ids
+
+    def expected(self, **filters):
+        return list(Order.objects.filter(**filters).order_by("-created_at", "-id").values_list("id", flat=True))
+
+    def test_round_trip(self):
+        self.assertEqual(self.pages("/api/food/orders/list/", self.buyer), self.expected(user=self.buyer))
+        self.assertEqual(
+            self.pages("/api/food/orders/seller/", self.seller), self.expected(owner_id=str(self.seller.id))
+        )
+
+    def test_invalid_cursor(self):
+        for cursor in [encode_cursor(timezone.now(), 2**70), encode_cursor(timezone.now(), -1), "bm90fGE"]:
+            with self.subTest(cursor=cursor):
+                response = self.get("/api/food/orders/list/", self.buyer, {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_ties_on_created_at(self):
+        # Checkouts commit many orders in the same instant; id breaks the tie
+        Order.objects.update(created_at=timezone.now())
+        ids = self.pages("/api/food/orders/list/", self.buyer)
+        self.assertEqual(ids, self.expected(user=self.buyer))
+        self.assertEqual(ids, sorted(ids, reverse=True))
+
+    def test_query_plans(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("EXPLAIN QUERY PLAN is SQLite's")
+        for url, user, index in [
+            ("/api/food/orders/list/", self.buyer, "order_user_recent_idx"),
+            ("/api/food/orders/seller/", self.seller, "order_owner_recent_idx"),
+        ]:
+            first = self.get(url, user, {"pageSize": 3}).json()
+            with CaptureQueriesContext(connection) as queries:
+                self.get(first["next"], user)
+            sql = next(q["sql"] for q in queries.captured_queries if 'FROM "food_order"' in q["sql"])
+            with connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                plan = " ".join(row[-1] for row in cursor.fetchall())
+            with self.subTest(url=url):
+                self.assertIn(f"SEARCH food_order USING INDEX {index} ", plan)
+                self.assertIn("created_at<?", plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_owner_follows_kitchen(self):
+        kitchen = Kitchen.objects.get(name="Kitchen")
+        kitchen.owner_id = "42"
+        kitchen.save()
+        self.assertEqual(set(Order.objects.filter(user=self.buyer).values_list("owner_id", flat=True)), {"42"})
+
+        # A food moved to another kitchen takes its orders to that owner
+        food = kitchen.foods.get()
+        food.kitchen = Kitchen.objects.get(name="Other")
+        food.save(update_fields=["kitchen"])
+        self.assertEqual(set(Order.objects.filter(user=self.buyer).values_list("owner_id", flat=True)), {"0"})
+
+
+@override_settings(**TEST_SETTINGS, ORDER_EVENTS_BROKER="food.events.LocalBroker")
+class OrderEventStreamTests(TransactionTestCase):
+    streams = 20
+
+    def setUp(self):
+        user = User.objects.create_user("buyer@example.com", "buyer@example.com", "password")
+        self.user_id = user.id
+        self.token = Token.objects.create(user=user).key
+
+    def scope(self):
+        return {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": "/api/food/async/orders/events/", "raw_path": b"/api/food/async/orders/events/",
+            "root_path": "", "query_string": b"", "client": ("127.0.0.1", 5000), "server": ("testserver", 80),
+            "headers": [(b"host", b"testserver"), (b"authorization", f"Token {self.token}".encode())],
+        }
+
+    async def open_stream(self, application):
+        stream = ApplicationCommunicator(application, self.scope())
+        await stream.send_input({"type": "http.request"})
+        self.assertEqual((await stream.receive_output(5))["status"], 200)
+        self.assertTrue((await stream.receive_output(5))["body"].startswith(b"retry:"))
+        return stream
+
+    def test_idle_streams_do_not_hold_a_thread_each(self):
+        async def run():
+            application = ASGIHandler()
+            streams = [await self.open_stream(application)]
+            # Counted after the first stream, which may start the sync thread they share
+            baseline = threading.active_count()
+            try:
+                streams += [await self.open_stream(application) for _ in range(self.streams - 1)]
+                idle_threads = threading.active_count()
+                get_broker().publish({
+                    "id": 1, "order_id": 7, "user_id": self.user_id, "owner_id": "0",
+                    "status": "accepted", "previous": "pending", "created_at": timezone.now(),
+                })
+                for stream in streams:
+                    body = (await stream.receive_output(5))["body"]
+                    self.assertTrue(body.startswith(b"id: 1\nevent: order-status\n"))
+            finally:
+                for stream in streams:
+                    await stream.send_input({"type": "http.disconnect"})
+                for stream in streams:
+                    await stream.wait(5)
+            return baseline, idle_threads
+
+        baseline, idle_threads = asyncio.run(run())
+        self.assertLessEqual(idle_threads - baseline, 1)
+        self.assertEqual(get_broker().channels, {})
+
+
+@override_settings(**TEST_SETTINGS, ORDER_EVENTS_POLL_INTERVAL=0.01)
+class DatabaseBrokerTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("buyer@example.com")
+        self.order = Order.objects.create(user=self.user, food=create_food(create_kitchen()), total_price=100)
+
+    def log(self, event_id):
+        OrderEvent.objects.create(
+            id=event_id, order=self.order, user=self.user, owner_id="0", status="accepted", previous="pending"
+        )
+
+    async def received(self, subscription, count):
+        return [(await asyncio.wait_for(subscription.get(), 5))["id"] for _ in range(count)]
+
+    def test_late_commits_are_delivered_once(self):
+        async def run():
+            log = sync_to_async(self.log)
+            broker = DatabaseBroker()
+            await log(1)
+            await log(3)
+            subscription = await broker.asubscribe(channels_for(self.user))
+            try:
+                # Logged after subscribing, before the poller's first query
+                await log(4)
+                # 2 and 5 commit after ids above them were already read
+                await log(6)
+                self.assertEqual(await self.received(subscription, 2), [4, 6])
+                await log(5)
+                await log(2)
+                self.assertEqual(await self.received(subscription, 2), [2, 5])
+                await log(7)
+                self.assertEqual(await self.received(subscription, 1), [7])
+                self.assertTrue(subscription.queue.empty())
+            finally:
+                broker.unsubscribe(subscription)
+            self.assertIsNone(broker.poller)
+
+        asyncio.run(run())
+
+    def test_gaps_expire(self):
+        async def run():
+            broker = DatabaseBroker()
+            subscription = await broker.asubscribe(channels_for(self.user))
+            try:
+                with mock.patch("food.events.LATE_COMMIT_SECONDS", 0):
+                    await sync_to_async(self.log)(3)
+                    await self.received(subscription, 1)
+                    with mock.patch.object(broker, "fetch", wraps=broker.fetch) as fetch:
+                        await asyncio.sleep(0.1)
+                self.assertEqual(fetch.call_args.args, (3, {}))
+            finally:
+                broker.unsubscribe(subscription)
+
+        asyncio.run(run())
+
+
+@override_settings(**TEST_SETTINGS)
+class CheckoutValidationTests(TestCase):
+    def setUp(self):
+        self.food = create_food(create_kitchen())
+        self.token = Token.objects.create(user=User.objects.create_user("buyer@example.com")).key
+
+    def checkout(self, items):
+        return self.client.post(
+            "/api/food/orders/checkout/", json.dumps({"items": items}),
+            content_type="application/json", HTTP_AUTHORIZATION=f"Token {self.token}",
+        )
+
+    def test_out_of_range_items(self):
+        carts = {
+            "Invalid food id": [[{"food": 2**70}], [{"food": 1e300}], [{"food": 0}], [{"food": -1}]],
+            "Invalid item format": [[{"food": "one"}], [{"quantity": 1}], ["1"]],
+            "Quantity must be at least 1": [[{"food": self.food.id, "quantity": 0}]],
+            "Quantity must be at most 1000": [
+                [{"food": self.food.id, "quantity": 2**70}],
+                [{"food": self.food.id, "quantity": 1e300}],
+                [{"food": self.food.id, "quantity": 600}, {"food": self.food.id, "quantity": 600}],
+            ],
+        }
+        for error, items_list in carts.items():
+            for items in items_list:
+                with self.subTest(items=items):
+                    response = self.checkout(items)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(response.json()["error"], error)
+        self.assertFalse(Order.objects.exists())
+
+    def test_valid_cart(self):
+        response = self.checkout([{"food": self.food.id, "quantity": 2}, {"food": str(self.food.id)}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()[0]["quantity"], 3)
+
+
+@override_settings(**TEST_SETTINGS)
+class CheckoutRaceTests(TransactionTestCase):
+    buyers = 20
+    stock = 10
+
+    def setUp(self):
+        self.food = create_food(create_kitchen(), quantity=self.stock)
+        self.tokens = [
+            Token.objects.create(user=User.objects.create_user(f"buyer{i}@example.com")).key
+            for i in range(self.buyers)
+        ]
+
+    def buy(self, token):
+        response = Client().post(
+            "/api/food/orders/checkout/", {"items": [{"food": self.food.id, "quantity": 1}]},
+            content_type="application/json", HTTP_AUTHORIZATION=f"Token {token}",
+        )
+        return response.status_code
+
+    def edit_price(self, price):
+        response = Client().patch(f"/api/food/foods/{self.food.id}/", {"price": price}, content_type="application/json")
+        return response.status_code
+
+    def test_parallel_buyers_take_each_unit_once(self):
+        statuses = run_concurrently(self.buy, [(token,) for token in self.tokens])
+        self.assertEqual(Counter(statuses), {201: self.stock, 409: self.buyers - self.stock})
+        self.food.refresh_from_db()
+        self.assertEqual(self.food.quantity, 0)
+        self.assertEqual(Order.objects.count(), self.stock)
+
+    def test_edit_keeps_stock_taken_after_it_was_loaded(self):
+        serializer = FoodSerializer(Food.objects.get(id=self.food.id), data={"price": 150}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        place_order(User.objects.first(), {self.food.id: 3})
+        serializer.save()
+        self.food.refresh_from_db()
+        self.assertEqual((self.food.price, self.food.quantity), (150, self.stock - 3))
+
+    def test_parallel_buyers_and_edits(self):
+        calls = [(self.buy, token) for token in self.tokens] + [(self.edit_price, 100 + i) for i in range(10)]
+        statuses = run_concurrently(lambda func, arg: func(arg), calls)
+        self.assertEqual(statuses[self.buyers:], [200] * 10)
+        sold = statuses[:self.buyers].count(201)
+        self.assertEqual(sold, self.stock)
+        self.food.refresh_from_db()
+        self.assertEqual(self.food.quantity, 0)
+        self.assertEqual(Order.objects.count(), sold)
+
+
+@override_settings(**TEST_SETTINGS)
+class RatingRaceTests(TransactionTestCase):
+    def test_parallel_ratings_are_all_counted(self):
+        kitchen = create_kitchen()
+        values = [5] * 33 + [4] * 67
+
+        def rate(value):
+            response = Client().post(f"/api/food/kitchens/{kitchen.id}/rate/", {"rating": value})
+            self.assertEqual(response.status_code, 200)
+            return response.json()["totalRatings"]
+
+        totals = run_concurrently(rate, [(value,) for value in values])
+        # Each rating saw its own count, so none was lost or applied twice
+        self.assertEqual(sorted(totals), list(range(1, 101)))
+        kitchen.refresh_from_db()
+        self.assertEqual((kitchen.rating_sum, kitchen.rating_count, kitchen.rating), (433, 100, 4.33))
+        self.assertEqual(Rating.objects.filter(kitchen=kitchen).count(), 100)
+        entry = LeaderboardEntry.objects.get(kitchen=kitchen)
+        self.assertEqual((entry.rating, entry.rating_count), (4.33, 100))
+
+
+@override_settings(**TEST_SETTINGS, IMAGE_PIPELINE_ASYNC=False)
+class ImagePipelineTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.kitchen = create_kitchen()
+
+    def upload(self, name, color="red"):
+        buffer = BytesIO()
+        Image.new("RGB", (640, 480), color).save(buffer, format=Image.registered_extensions()[name[-4:]])
+        return SimpleUploadedFile(name, buffer.getvalue())
+
+    def save(self, food, image):
+        serializer = FoodSerializer(food, data={"image": image}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            serializer.save()
+        food.refresh_from_db()
+        return food
+
+    def names(self, food):
+        return {name for formats in food.image_variants.values() for name in formats.values()}
+
+    def assert_stored(self, names):
+        for name in names:
+            self.assertTrue(default_storage.exists(name), name)
+
+    def test_variants(self):
+        food = self.save(create_food(self.kitchen), self.upload("pilau.jpg"))
+        self.assertEqual(set(food.image_variants), {"thumb", "medium"})
+        self.assertEqual(set(food.image_variants["thumb"]), set(available_formats()))
+        with default_storage.open(food.image_variants["thumb"]["webp"]) as f, Image.open(f) as thumb:
+            self.assertEqual(thumb.size, (320, 240))
+
+    def test_names_do_not_collide(self):
+        jpg = self.save(create_food(self.kitchen), self.upload("pilau.jpg"))
+        png = self.save(create_food(self.kitchen), self.upload("pilau.png"))
+        # Two foods on one stored image, as populate_demo_data creates them
+        shared = [create_food(self.kitchen, image=jpg.image.name) for _ in range(2)]
+        for food in shared:
+            process_image("food.Food", food.pk)
+            food.refresh_from_db()
+
+        foods = [jpg, png, *shared]
+        names = [self.names(food) for food in foods]
+        self.assertEqual(len(set().union(*names)), sum(map(len, names)))
+        for food in foods:
+            self.assert_stored(self.names(food))
+
+    def test_replaced_image_drops_old_variants(self):
+        food = self.save(create_food(self.kitchen), self.upload("pilau.jpg"))
+        old = self.names(food)
+        food = self.save(food, self.upload("biryani.png", "blue"))
+        self.assert_stored(self.names(food))
+        for name in old:
+            self.assertFalse(default_storage.exists(name), name)
+
+        # Regenerating the same image keeps it
+        process_image("food.Food", food.pk)
+        food.refresh_from_db()
+        self.assert_stored(self.names(food))
+
+    def test_superseded_job_cleans_up(self):
+        food = create_food(self.kitchen, image=default_storage.save("foods/pilau.jpg", self.upload("pilau.jpg")))
+        rendered = []
+
+        def replaced_while_rendering(*args):
+            rendered.append(render_variants(*args))
+            Food.objects.filter(pk=food.pk).update(image="foods/other.jpg")
+            return rendered[0]
+
+        with mock.patch("food.images.render_variants", replaced_while_rendering):
+            process_image("food.Food", food.pk)
+        food.refresh_from_db()
+        self.assertEqual(food.image_variants, {})
+        for formats in rendered[0].values():
+            for name in formats.values():
+                self.assertFalse(default_storage.exists(name), name)
+
+
+@override_settings(**TEST_SETTINGS)
+class PopulateDemoDataTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def populate(self, seed=7):
+        call_command(
+            "populate_demo_data", "--offline", "--seed", str(seed), "--sellers", "2", "--kitchens-per-seller", "2",
+            "--foods-min", "3", "--foods-max", "3", "--buyers", "3", "--orders", "10", "--images", "2",
+            "--batch-size", "4", stdout=StringIO(),
+        )
+
+    def counts(self):
+        return {
+            "users": User.objects.count(),
+            "sellers": UserProfile.objects.filter(role="seller").count(),
+            "buyers": UserProfile.objects.filter(role="user").count(),
+            "kitchens": Kitchen.objects.count(),
+            "foods": Food.objects.count(),
+            "orders": Order.objects.count(),
+            "leaderboard": LeaderboardEntry.objects.count(),
+            "rollup orders": sum(OrderRollup.objects.values_list("orders", flat=True)),
+            "images": len(set(Food.objects.values_list("image", flat=True))),
+        }
+
+    def test_counts_and_rerun(self):
+        self.populate()
+        expected = {
+            "users": 5, "sellers": 2, "buyers": 3, "kitchens": 4, "foods": 12, "orders": 10,
+            "leaderboard": 4, "rollup orders": 10, "images": 2,
+        }
+        self.assertEqual(self.counts(), expected)
+        for name in Food.objects.values_list("image", flat=True).distinct():
+            self.assertTrue(default_storage.exists(name), name)
+        # Denormalized columns agree with the rows they copy
+        sellers = {str(profile.uid_id): profile.name for profile in UserProfile.objects.filter(role="seller")}
+        for kitchen in Kitchen.objects.all():
+            self.assertEqual(kitchen.owner_name, sellers[kitchen.owner_id])
+        for order in Order.objects.select_related("food__kitchen"):
+            self.assertEqual(order.owner_id, order.food.kitchen.owner_id)
+            self.assertEqual(order.food.kitchen_name, order.food.kitchen.name)
+
+        # The same seed again changes nothing; another seed adds its own rows
+        self.populate()
+        self.assertEqual(self.counts(), expected)
+        self.populate(seed=8)
+        self.assertEqual(self.counts()["kitchens"], 8)
+
+
+# The benches seed users of their own; a fast hasher keeps that out of the way
+@override_settings(**TEST_SETTINGS, PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class BenchCommandTests(TransactionTestCase):
+    """Every bench command still runs end to end at size 1; numbers are not checked."""
+
+    def bench(self, name, *args):
+        stdout = StringIO()
+        call_command(name, *args, stdout=stdout)
+        self.assertTrue(stdout.getvalue().strip(), name)
+        return stdout.getvalue()
+
+    def test_bench_api(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            size = ["--kitchens", "1", "--foods-per-kitchen", "1", "--buyers", "1", "--orders", "1",
+                    "--requests", "1", "--warmup", "1"]
+            output = os.path.join(tmp, "results.json")
+            self.bench("bench_api", *size, "--output", output)
+            self.bench("bench_api", *size, "--baseline", output, "--tolerance", "1000")
+
+    def test_bench_auth(self):
+        self.bench("bench_auth", "--requests", "1", "--orders", "1")
+
+    def test_bench_compression(self):
+        self.bench("bench_compression", "--sizes", "1", "--repeat", "1")
+
+    def test_bench_db_writers(self):
+        self.bench("bench_db_writers", "--workers", "1", "--seconds", "0.1", "--kitchens", "1")
+
+    def test_bench_json(self):
+        self.bench("bench_json", "--sizes", "1", "--repeat", "1")
+
+    def test_bench_login_storm(self):
+        self.bench("bench_login_storm", "--seconds", "0.1", "--storm", "1", "--readers", "1")
+
+    def test_bench_search(self):
+        self.bench("bench_search", "--foods", "1", "--kitchens", "1", "--repeat", "1")
+
+    def test_bench_serializers(self):
+        self.bench("bench_serializers", "--rows", "1", "--repeat", "1")
+
+    def test_bench_throttle(self):
+        self.bench("bench_throttle", "--clients", "1", "--repeat", "1", "--budget-ms", "1000")
+
+
+@override_settings(**TEST_SETTINGS)
+class BenchServersTests(LiveServerTestCase):
+    def test_bench_servers(self):
+        create_food(create_kitchen())
+        # Both paths through one server: the async views also run under WSGI
+        url = self.live_server_url + "/"
+        stdout = StringIO()
+        call_command(
+            "bench_servers", "--wsgi-url", url, "--asgi-url", url, "--concurrency", "1", "--requests", "1",
+            stdout=stdout,
+        )
+        rows = stdout.getvalue().splitlines()[1:]
+        self.assertEqual(len(rows), 6)
+        # No errors on any endpoint
+        self.assertEqual({row.split()[-1] for row in rows}, {"0"})
@@ -1,7 +1,8 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import KitchenViewSet, FoodViewSet, create_order, homepage, rate_kitchen, seller_orders, update_order_status,user_orders
+from . import async_views
+from .views import KitchenViewSet, FoodViewSet, checkout, create_order, homepage, rate_kitchen, seller_order_stats, seller_orders, seller_orders_export, top_kitchens, update_order_status,user_orders
 
 router = DefaultRouter()
 router.register("kitchens", KitchenViewSet,basename="kitchen")
@@ -9,11 +10,22 @@ router.register("foods", FoodViewSet, basename="food")
 
 urlpatterns = [
     path("homepage/", homepage),
+    path("kitchens/top/", top_kitchens),
     path("kitchens/<int:kitchen_id>/rate/", rate_kitchen),
     path("orders/",create_order),
+    path("orders/checkout/", checkout),
     path("orders/list/",user_orders) ,
-    path("orders/seller/", seller_orders),  
+    path("orders/seller/", seller_orders),
+    path("orders/seller/stats/", seller_order_stats),  
+    path("orders/seller/export/", seller_orders_export),
     path("orders/<int:order_id>/status/", update_order_status),
+    # ASGI-native read path; same responses as the endpoints above
+    path("async/homepage/", async_views.homepage),
+    path("async/kitchens/", async_views.kitchen_list),
+    path("async/foods/", async_views.food_list),
+    path("async/orders/list/", async_views.user_orders),
+    path("async/orders/seller/export/", async_views.seller_orders_export),
+    path("async/orders/events/", async_views.order_events),
     path("", include(router.urls)),
     
 ]
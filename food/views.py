@@ -1,25 +1,62 @@
+from datetime import datetime, time, timedelta
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Now
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.decorators import method_decorator
 from rest_framework import viewsets, filters
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from .models import Kitchen, Food, Order
+from barirswad.throttling import throttles
+from . import analytics, events, export, leaderboard, ratings
+from .cache import bump_version, cached_response
+from .checkout import CheckoutError, parse_cart, place_order
+from .feed import HOMEPAGE_KITCHENS, group_by_kitchen, homepage_kitchens, top_foods_queryset
+from .models import Kitchen, Food, LeaderboardEntry, Order
+from .pagination import KeysetPagination, RankedPagination
+from .projections import FoodProjection, KitchenProjection, LeaderboardProjection, OrderProjection
+from .search import FullTextSearchFilter
 from .serializers import KitchenSerializer, FoodSerializer, OrderSerializer
 
-class KitchenViewSet(viewsets.ModelViewSet):
+class ProjectedListMixin:
+    """Serve list() from values() rows; detail and write actions keep the serializer."""
+    projection_class = None
+
+    def list(self, request, *args, **kwargs):
+        projection = self.projection_class(request)
+        queryset = projection.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(projection.render(page))
+        return Response(projection.render(queryset))
+
+
+@method_decorator(cached_response(Kitchen), name="list")
+class KitchenViewSet(ProjectedListMixin, viewsets.ModelViewSet):
     queryset = Kitchen.objects.all().order_by('-rating')
     serializer_class = KitchenSerializer
+    projection_class = KitchenProjection
     parser_classes = [MultiPartParser, FormParser, JSONParser]
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
     search_fields = ['name', 'owner_name']
     ordering_fields = ['rating', 'total_orders', 'created_at']
 
 
-class FoodViewSet(viewsets.ModelViewSet):
+@method_decorator(cached_response(Food, Kitchen), name="list")
+class FoodViewSet(ProjectedListMixin, viewsets.ModelViewSet):
     serializer_class = FoodSerializer
+    projection_class = FoodProjection
     parser_classes = [MultiPartParser, FormParser, JSONParser]
-    filter_backends = [filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [filters.OrderingFilter, FullTextSearchFilter]
     search_fields = ["name", "kitchen_name", "description"]
     ordering_fields = ["price", "delivery_time", "created_at", "kitchen__rating"]
     ordering = ["created_at"]
@@ -54,34 +91,48 @@ class FoodPaginator(PageNumberPagination):
 
 
 @api_view(["GET"])
+@cached_response(Kitchen, Food)
 def homepage(request):
-    from rest_framework.pagination import PageNumberPagination
-
     kitchen_paginator = PageNumberPagination()
-    kitchen_paginator.page_size = 10
+    kitchen_paginator.page_size = HOMEPAGE_KITCHENS
 
-    kitchens = Kitchen.objects.all().order_by("-rating")
-    kitchen_page = kitchen_paginator.paginate_queryset(kitchens, request)
-    kitchen_data = KitchenSerializer(kitchen_page, many=True, context={"request": request}).data
+    kitchens = KitchenProjection(request)
+    kitchen_page = kitchen_paginator.paginate_queryset(kitchens.values(homepage_kitchens()), request)
+    kitchen_data = kitchens.render(kitchen_page)
 
-    # Attach foods under each kitchen
+    # Attach the latest foods under each kitchen with a single windowed query
+    kitchen_ids = [k["id"] for k in kitchen_data]
+    foods = FoodProjection(request)
+    foods_by_kitchen = group_by_kitchen(
+        kitchen_ids, foods.render(foods.values(top_foods_queryset(kitchen_ids))), key=itemgetter("kitchen")
+    )
     for k in kitchen_data:
-        foods = Food.objects.filter(kitchen=k["id"]).order_by("-created_at")
-        food_paginator = PageNumberPagination()
-        food_paginator.page_size = 5
-        food_page = food_paginator.paginate_queryset(foods, request)
-        k["foods"] = FoodSerializer(food_page, many=True, context={"request": request}).data
+        k["foods"] = foods_by_kitchen[k["id"]]
 
     return kitchen_paginator.get_paginated_response(kitchen_data)
 
 
+@api_view(["GET"])
+@cached_response(Kitchen, LeaderboardEntry)
+def top_kitchens(request):
+    """Ranked kitchens: ?by=rating (default), orders, or velocity (orders in the last week)."""
+    by = request.query_params.get("by", "rating")
+    if by not in leaderboard.BOARDS:
+        return Response({"error": f"'by' must be one of: {', '.join(leaderboard.BOARDS)}"}, status=400)
+
+    projection = LeaderboardProjection(request)
+    paginator = RankedPagination(leaderboard.BOARDS[by], id_field="kitchen_id")
+    page = paginator.paginate_queryset(projection.values(LeaderboardEntry.objects.all()), request)
+
+    results = projection.render(page)
+    for rank, kitchen in enumerate(results, start=paginator.offset + 1):
+        kitchen["rank"] = rank
+    return paginator.get_paginated_response(results)
+
+
 @api_view(["POST"])
+@throttle_classes(throttles("rating"))
 def rate_kitchen(request, kitchen_id):
-    try:
-        kitchen = Kitchen.objects.get(id=kitchen_id)
-    except Kitchen.DoesNotExist:
-        return Response({"error": "Kitchen not found"}, status=404)
-
     rating = request.data.get("rating")
     if rating is None:
         return Response({"error": "Rating required"}, status=400)
@@ -94,66 +145,150 @@ def rate_kitchen(request, kitchen_id):
     if not 1 <= rating <= 5:
         return Response({"error": "Rating must be between 1 and 5"}, status=400)
 
-    # Calculate proper average rating
-    total_rating = kitchen.rating * kitchen.rating_count  # Get sum of all previous ratings
-    total_rating += rating  # Add new rating
-    kitchen.rating_count += 1  # Increment count
-    kitchen.rating = round(total_rating / kitchen.rating_count, 2)  # Calculate new average
-    
-    kitchen.save()
+    user = request.user if request.user.is_authenticated else None
+    result = ratings.rate_kitchen(kitchen_id, rating, user=user)
+    if result is None:
+        return Response({"error": "Kitchen not found"}, status=404)
 
+    new_rating, rating_count = result
     return Response({
         "message": "Rating submitted successfully",
-        "newRating": kitchen.rating,
-        "totalRatings": kitchen.rating_count
+        "newRating": new_rating,
+        "totalRatings": rating_count
     })
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
+@throttle_classes(throttles("orders"))
 def create_order(request):
-    user = request.user
-    food_id = request.data.get("food")
-    quantity = int(request.data.get("quantity", 1))
-
     try:
-        food = Food.objects.get(id=food_id)
-    except Food.DoesNotExist:
-        return Response({"error": "Food not found"}, status=404)
-
-    if user.profile.role == "seller" and str(food.kitchen.owner_id) == str(user.id):
-        return Response({"error": "Sellers cannot order their own food"}, status=403)
-
-    order = Order.objects.create(
-        user=user,
-        food=food,
-        quantity=quantity,
-        total_price=food.price * quantity
-    )
+        cart = parse_cart([{"food": request.data.get("food"), "quantity": request.data.get("quantity", 1)}])
+        order, = place_order(request.user, cart)
+    except CheckoutError as e:
+        return Response({"error": e.message}, status=e.status)
 
     return Response(OrderSerializer(order).data, status=201)
 
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@throttle_classes(throttles("orders"))
+def checkout(request):
+    """Place a multi-item cart: {"items": [{"food": id, "quantity": n}, ...]}"""
+    try:
+        orders = place_order(request.user, parse_cart(request.data.get("items")))
+    except CheckoutError as e:
+        return Response({"error": e.message, **e.detail}, status=e.status)
+
+    return Response(OrderSerializer(orders, many=True).data, status=201)
+
+
+def filter_orders(queryset, params):
+    """Apply ?status=, ?from= and ?to= (ISO dates or datetimes) to an Order queryset."""
+    status = params.get("status")
+    if status:
+        if status not in dict(Order.STATUS_CHOICES):
+            raise ValidationError({"error": "Invalid status"})
+        queryset = queryset.filter(status=status)
+
+    for param, lookup in (("from", "created_at__gte"), ("to", "created_at__lte")):
+        value = params.get(param)
+        if not value:
+            continue
+        try:
+            moment = parse_datetime(value) or parse_date(value)
+        except ValueError:
+            moment = None
+        if moment is None:
+            raise ValidationError({"error": f"Invalid '{param}' date"})
+        if not isinstance(moment, datetime):
+            # A bare date covers that whole day
+            moment = datetime.combine(moment, time.max if param == "to" else time.min)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        queryset = queryset.filter(**{lookup: moment})
+    return queryset
+
+
+def paginated_orders(request, queryset):
+    projection = OrderProjection()
+    queryset = projection.values(filter_orders(queryset, request.query_params))
+
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(queryset, request)
+    return paginator.get_paginated_response(projection.render(page))
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def user_orders(request):
-    orders = Order.objects.filter(user=request.user).order_by("-created_at")
-    serializer = OrderSerializer(orders, many=True)
-    return Response(serializer.data)
+    return paginated_orders(request, Order.objects.filter(user=request.user))
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def seller_orders(request):
     """Get all orders for seller's kitchens"""
-    user = request.user
-    
-    seller_kitchens = Kitchen.objects.filter(owner_id=str(user.id))
-    
-    seller_foods = Food.objects.filter(kitchen__in=seller_kitchens)
-    
-    orders = Order.objects.filter(food__in=seller_foods).order_by("-created_at")
-    
-    serializer = OrderSerializer(orders, many=True)
-    return Response(serializer.data)
+    return paginated_orders(request, Order.objects.filter(owner_id=str(request.user.id)))
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def seller_orders_export(request):
+    """
+    Stream every order of the seller's kitchens as NDJSON or CSV (?type=),
+    filtered like seller_orders by ?status=, ?from= and ?to=. Resume an
+    interrupted export with ?after=<last order id received>.
+    """
+    orders = filter_orders(Order.objects.filter(owner_id=str(request.user.id)), request.query_params)
+    writer = export.get_writer(request.query_params)
+    return StreamingHttpResponse(
+        export.stream(export.export_queryset(orders, request.query_params), writer),
+        content_type=writer.content_type,
+        headers=export.headers(writer),
+    )
+
+
+SELLER_STATS_DAYS = 30
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def seller_order_stats(request):
+    """
+    Order counts, quantity, revenue and status breakdown for the seller's
+    kitchens, in total, per kitchen and per day, read from the daily rollups.
+    ?from= and ?to= are ISO dates (default: the last 30 days); ?kitchen= narrows
+    it to one kitchen.
+    """
+    params = request.query_params
+    dates = {}
+    for param in ("from", "to"):
+        value = params.get(param)
+        if not value:
+            continue
+        try:
+            dates[param] = parse_date(value)
+        except ValueError:
+            dates[param] = None
+        if dates[param] is None:
+            raise ValidationError({"error": f"Invalid '{param}' date"})
+    end = dates.get("to") or timezone.now().date()
+    start = dates.get("from") or end - timedelta(days=SELLER_STATS_DAYS - 1)
+    if start > end:
+        raise ValidationError({"error": "'from' must not be after 'to'"})
+
+    kitchens = Kitchen.objects.filter(owner_id=str(request.user.id))
+    if params.get("kitchen"):
+        try:
+            kitchens = kitchens.filter(id=int(params["kitchen"]))
+        except ValueError:
+            raise ValidationError({"error": "Invalid kitchen"})
+
+    return Response({
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        **analytics.kitchen_stats(kitchens, start, end),
+    })
 
 
 @api_view(["PATCH"])
@@ -178,12 +313,21 @@ def update_order_status(request, order_id):
     if new_status not in dict(Order.STATUS_CHOICES):
         return Response({"error": "Invalid status"}, status=400)
     
+    old_status = order.status
     order.status = new_status
-    order.save()
-    
-    # Update kitchen total_orders when delivered
+    with transaction.atomic():
+        order.save()
+        analytics.record_status_change(order, old_status)
+        leaderboard.record_status_change(order, old_status)
+        events.record_status_change(order, old_status)
+
+        # Update kitchen total_orders when delivered
+        if new_status == "delivered":
+            Kitchen.objects.filter(id=order.food.kitchen_id).update(
+                total_orders=F("total_orders") + 1, updated_at=Now()
+            )
+            leaderboard.record_delivery(order.food.kitchen_id)
     if new_status == "delivered":
-        order.food.kitchen.total_orders += 1
-        order.food.kitchen.save()
+        bump_version(Kitchen)
     
     return Response(OrderSerializer(order).data)
\ No newline at end of file
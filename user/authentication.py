@@ -0,0 +1,173 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .models import UserProfile
+
+
+class LRUCache:
+    """Small thread-safe LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+def _values(instance):
+    return tuple(getattr(instance, field.attname) for field in instance._meta.concrete_fields)
+
+
+def _from_values(model, db, values):
+    return model.from_db(db, [field.attname for field in model._meta.concrete_fields], values)
+
+
+def freeze(user, token):
+    """The column values of a token, its user and user.profile (if any): plain, immutable data."""
+    # A missing profile raises RelatedObjectDoesNotExist, an AttributeError
+    profile = getattr(user, "profile", None)
+    return token._state.db, _values(user), profile and _values(profile), _values(token)
+
+
+def thaw(entry):
+    """New (user, token) instances, with user.profile loaded, from freeze()'s output."""
+    db, user_values, profile_values, token_values = entry
+    user = _from_values(User, db, user_values)
+    if profile_values is None:
+        # As select_related() leaves a missing profile: accessing it raises DoesNotExist
+        User.profile.related.set_cached_value(user, None)
+    else:
+        user.profile = _from_values(UserProfile, db, profile_values)
+    token = _from_values(Token, db, token_values)
+    token.user = user
+    return user, token
+
+
+class TokenCache:
+    """
+    token key -> (user, token), with user.profile preloaded. A per-process LRU
+    sits in front of an optional shared Django cache (TOKEN_CACHE_SHARED_ALIAS).
+
+    Entries hold column values, not model instances: every get() builds a new
+    user and token, so changes a request makes to request.user never reach
+    other requests (or threads) using the same token.
+    """
+
+    def __init__(self):
+        self.local = LRUCache(
+            getattr(settings, "TOKEN_CACHE_SIZE", 10_000),
+            getattr(settings, "TOKEN_CACHE_TTL", 30),
+        )
+
+    @property
+    def shared(self):
+        alias = getattr(settings, "TOKEN_CACHE_SHARED_ALIAS", None)
+        return caches[alias] if alias else None
+
+    def shared_key(self, key):
+        # Never use raw tokens as cache keys
+        return "auth:token:" + hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key):
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            entry = self.shared.get(self.shared_key(key))
+            if entry is not None:
+                self.local.set(key, entry)
+        return thaw(entry) if entry is not None else None
+
+    def set(self, key, entry):
+        entry = freeze(*entry)
+        self.local.set(key, entry)
+        if self.shared is not None:
+            self.shared.set(self.shared_key(key), entry, getattr(settings, "TOKEN_CACHE_TTL", 30))
+
+    async def aget(self, key):
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            entry = await self.shared.aget(self.shared_key(key))
+            if entry is not None:
+                self.local.set(key, entry)
+        return thaw(entry) if entry is not None else None
+
+    async def aset(self, key, entry):
+        entry = freeze(*entry)
+        self.local.set(key, entry)
+        if self.shared is not None:
+            await self.shared.aset(self.shared_key(key), entry, getattr(settings, "TOKEN_CACHE_TTL", 30))
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(self.shared_key(key))
+
+    def clear(self):
+        self.local.clear()
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that resolves token -> user (and user.profile) from
+    token_cache instead of joining authtoken_token and auth_user on every
+    request. Entries are dropped on logout, user saves (password changes)
+    and profile saves (role changes); other processes' local entries expire
+    after TOKEN_CACHE_TTL seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is not None:
+            return entry
+
+        model = self.get_model()
+        try:
+            token = model.objects.select_related("user__profile").get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+        entry = (token.user, token)
+        token_cache.set(key, entry)
+        return entry
@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from . import passwords
+
+UserModel = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend that checks passwords in the hashing pool (user.passwords)
+    and loads the profile with the user, which the login response needs.
+    Hashes made with an older hasher or fewer iterations are replaced on the
+    next successful login.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.select_related("profile").get(**{UserModel.USERNAME_FIELD: username})
+        except UserModel.DoesNotExist:
+            # Hash anyway, so unknown emails take as long as wrong passwords
+            passwords.make_password(password)
+            return None
+
+        is_correct, must_update = passwords.check_password(password, user.password)
+        if not is_correct or not self.user_can_authenticate(user):
+            return None
+        if must_update:
+            user.password = passwords.make_password(password)
+            user.save(update_fields=["password"])
+        return user
@@ -0,0 +1,130 @@
+"""
+Password hashing off the request thread.
+
+PBKDF2 takes around half a second of CPU per hash, so a burst of logins or
+sign-ups run inline would hold every core a worker has. Hashes run instead
+in a process pool of PASSWORD_HASH_WORKERS processes, which caps how much
+CPU hashing can take and leaves the rest for other requests. At most
+PASSWORD_HASH_MAX_PENDING hashes are queued or running per worker process;
+past that a request waits up to PASSWORD_HASH_QUEUE_TIMEOUT seconds for a
+slot and then fails fast with 503 and Retry-After instead of piling up.
+PASSWORD_HASH_WORKERS = 0 hashes inline (development and tests).
+
+Hashers are resolved here from PASSWORD_HASHERS and sent to the pool with the
+salt, so the pool processes need no Django setup. check_password() upgrades
+a stored hash made with an older hasher or fewer iterations, the same way
+django.contrib.auth does (see user.backends).
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, get_hasher, identify_hasher
+from rest_framework.exceptions import APIException
+
+
+class HashingBusy(APIException):
+    status_code = 503
+    default_detail = "Too many sign-ins in progress, try again shortly."
+    default_code = "hashing_busy"
+    # Sent as Retry-After by DRF's exception handler
+    wait = 1
+
+
+def _encode(hasher, password, salt):
+    return hasher.encode(password, salt)
+
+
+def _check(hasher, preferred, password, encoded):
+    """(is_correct, must_update), as in django.contrib.auth.hashers.verify_password()."""
+    is_correct = hasher.verify(password, encoded)
+    hasher_changed = hasher.algorithm != preferred.algorithm
+    must_update = hasher_changed or preferred.must_update(encoded)
+    if not is_correct and not hasher_changed and must_update:
+        # Same work as an upgraded hash, so timing does not tell which users have one
+        hasher.harden_runtime(password, encoded)
+    return is_correct, must_update
+
+
+def default_workers():
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+class HashingPool:
+    def __init__(self, workers, max_pending, timeout):
+        self.workers = workers
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def _executor(self):
+        with self.lock:
+            if self.executor is None:
+                # Not fork: request threads may hold locks at the moment of forking
+                self.executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self.executor
+
+    def run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+        if not self.slots.acquire(timeout=self.timeout):
+            raise HashingBusy()
+        try:
+            return self._executor().submit(func, *args).result()
+        except BrokenProcessPool:
+            # A pool process died (e.g. OOM-killed); start a new pool next time
+            with self.lock:
+                self.executor = None
+            return func(*args)
+        finally:
+            self.slots.release()
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(cancel_futures=True)
+                self.executor = None
+
+
+_pool = None
+_pool_config = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool, _pool_config
+    config = (
+        getattr(settings, "PASSWORD_HASH_WORKERS", None),
+        getattr(settings, "PASSWORD_HASH_MAX_PENDING", None),
+        getattr(settings, "PASSWORD_HASH_QUEUE_TIMEOUT", 5),
+    )
+    with _pool_lock:
+        if _pool is None or _pool_config != config:
+            if _pool is not None:
+                _pool.shutdown()
+            workers, max_pending, timeout = config
+            workers = default_workers() if workers is None else workers
+            _pool = HashingPool(workers, max_pending or max(1, workers) * 8, timeout)
+            _pool_config = config
+        return _pool
+
+
+def make_password(password):
+    """django.contrib.auth.hashers.make_password() for a real password, hashed in the pool."""
+    hasher = get_hasher("default")
+    return get_pool().run(_encode, hasher, password, hasher.salt())
+
+
+def check_password(password, encoded):
+    """(is_correct, must_update) for a stored hash, checked in the pool."""
+    if password is None or not encoded or encoded.startswith(UNUSABLE_PASSWORD_PREFIX):
+        return False, False
+    try:
+        hasher = identify_hasher(encoded)
+    except ValueError:
+        return False, False
+    return get_pool().run(_check, hasher, get_hasher("default"), password, encoded)
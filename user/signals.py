@@ -0,0 +1,31 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .models import UserProfile
+
+
+def forget_user(user_id):
+    for key in Token.objects.filter(user_id=user_id).values_list("key", flat=True):
+        token_cache.delete(key)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    # Covers password changes and deactivation
+    if not created:
+        forget_user(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def profile_changed(sender, instance, created=False, **kwargs):
+    # A new profile's user has nothing cached yet
+    if not created:
+        forget_user(instance.uid_id)
@@ -1,3 +1,140 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+
+from . import passwords
+from .authentication import CachedTokenAuthentication, token_cache
+from .models import UserProfile
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "user-tests"}},
+    TOKEN_CACHE_SHARED_ALIAS="default",
+)
+class TokenCacheTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user("seller@example.com", "seller@example.com", "password")
+        UserProfile.objects.create(uid=self.user, name="Seller", role="seller")
+        self.key = Token.objects.create(user=self.user).key
+
+    def authenticate(self):
+        return CachedTokenAuthentication().authenticate_credentials(self.key)
+
+    def test_each_request_gets_its_own_user(self):
+        first, _ = self.authenticate()
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+            other, _ = self.authenticate()
+            self.assertEqual(user.profile.role, "seller")
+            self.assertIs(token.user, user)
+        self.assertIsNot(user, first)
+        self.assertIsNot(user, other)
+        self.assertIsNot(user.profile, other.profile)
+
+        user.email = "changed@example.com"
+        user.profile.role = "user"
+        user.backend = "some.Backend"
+        again, _ = self.authenticate()
+        self.assertEqual(again.email, "seller@example.com")
+        self.assertEqual(again.profile.role, "seller")
+        self.assertFalse(hasattr(again, "backend"))
+
+    def test_shared_tier(self):
+        self.authenticate()
+        # Another process: nothing in its local tier yet
+        token_cache.local.clear()
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+        self.assertEqual((user.pk, user.profile.name), (self.user.pk, "Seller"))
+        self.assertFalse(user._state.adding)
+
+    def test_user_without_profile(self):
+        self.user.profile.delete()
+        token_cache.clear()
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user, _ = self.authenticate()
+            self.assertFalse(hasattr(user, "profile"))
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "user-tests"}},
+    THROTTLE_RATES={},
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    PASSWORD_HASH_WORKERS=0,
+)
+class RegisterLoginTests(TestCase):
+    credentials = {"email": "buyer@example.com", "password": "s3cret-pass"}
+
+    def setUp(self):
+        token_cache.clear()
+        run = passwords.HashingPool.run
+        self.hashed = []
+
+        def record(pool, func, *args):
+            self.hashed.append(func)
+            return run(pool, func, *args)
+
+        self.enterContext(mock.patch.object(passwords.HashingPool, "run", record))
+
+    def register(self, **data):
+        return self.client.post("/api/user/register/", {"name": "Buyer", **self.credentials, **data})
+
+    def login(self, **data):
+        return self.client.post("/api/user/login/", {**self.credentials, **data})
+
+    def test_hashing_goes_through_the_pool(self):
+        response = self.register()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.hashed, [passwords._encode])
+        self.assertTrue(User.objects.get(username="buyer@example.com").check_password("s3cret-pass"))
+
+        self.hashed.clear()
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data["token"], response.data["role"]), (Token.objects.get().key, "user"))
+        self.assertEqual(self.hashed, [passwords._check])
+
+        self.hashed.clear()
+        self.assertEqual(self.login(password="wrong").status_code, 401)
+        # Unknown emails still cost a hash
+        self.assertEqual(self.login(email="nobody@example.com").status_code, 401)
+        self.assertEqual(self.hashed, [passwords._check, passwords._encode])
+
+    def test_taken_email(self):
+        self.register()
+        self.hashed.clear()
+        response = self.register(name="Someone else")
+        self.assertEqual((response.status_code, response.data), (400, {"error": "Email already registered"}))
+        # Refused before any hashing work
+        self.assertEqual(self.hashed, [])
+
+    def test_registered_concurrently(self):
+        make_password = passwords.make_password
+
+        def other_request_wins(password):
+            # The same email registered while this request was hashing
+            User.objects.create_user("buyer@example.com", "buyer@example.com", "other")
+            return make_password(password)
+
+        with mock.patch.object(passwords, "make_password", other_request_wins):
+            response = self.register()
+        self.assertEqual((response.status_code, response.data), (400, {"error": "Email already registered"}))
+        self.assertEqual(User.objects.count(), 1)
+        self.assertFalse(UserProfile.objects.exists())
+        self.assertFalse(Token.objects.exists())
+
+    @override_settings(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_MAX_PENDING=1, PASSWORD_HASH_QUEUE_TIMEOUT=0)
+    def test_busy(self):
+        pool = passwords.get_pool()
+        self.addCleanup(pool.shutdown)
+        pool.slots.acquire()
+        try:
+            response = self.login()
+        finally:
+            pool.slots.release()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
@@ -6,5 +6,6 @@ from user import views
 urlpatterns = [
     path('register/', views.register),
     path('login/', views.login),
+    path('logout/', views.logout),
     path('profile/<int:uid>/', views.profile),
 ]
\ No newline at end of file
@@ -1,38 +1,50 @@
 from django.contrib.auth.models import User
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
-from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
 from django.contrib.auth import authenticate
+from . import passwords
 from .models import UserProfile
 from .serializers import RegisterSerializer, LoginSerializer, UserSerializer
 from rest_framework.authtoken.models import Token
+from barirswad.throttling import throttles
 
 
 @api_view(['POST'])
+@throttle_classes(throttles('register'))
 def register(request):
     serializer = RegisterSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
 
     data = serializer.validated_data
+    # Checked before hashing so a taken email costs no hashing work
     if User.objects.filter(username=data['email']).exists():
         return Response({"error": "Email already registered"}, status=400)
 
-    user = User.objects.create(
-        username=data['email'],
-        email=data['email'],
-        password=make_password(data['password'])
-    )
+    # Hash before opening the transaction, so no write lock is held meanwhile
+    password = passwords.make_password(data['password'])
+    try:
+        with transaction.atomic():
+            user = User.objects.create(
+                username=data['email'],
+                email=data['email'],
+                password=password
+            )
 
-    UserProfile.objects.create(
-        uid=user,
-        name=data['name'],
-        profilePic=None,
-        role=data.get('role', 'user')  # default to 'user'
-    )
+            UserProfile.objects.create(
+                uid=user,
+                name=data['name'],
+                profilePic=None,
+                role=data.get('role', 'user')  # default to 'user'
+            )
 
-    # Generate token for new user
-    token = Token.objects.create(user=user)
+            # Generate token for new user
+            token = Token.objects.create(user=user)
+    except IntegrityError:
+        # Registered concurrently since the check above
+        return Response({"error": "Email already registered"}, status=400)
 
     return Response({
         "message": f"{data.get('role', 'user').capitalize()} registered",
@@ -46,6 +58,7 @@ def register(request):
 
 
 @api_view(['POST'])
+@throttle_classes(throttles('login'))
 def login(request):
     serializer = LoginSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
@@ -69,6 +82,14 @@ def login(request):
     })
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout(request):
+    # Deleting the token also evicts it from the auth cache
+    request.auth.delete()
+    return Response({"message": "Logged out"})
+
+
 @api_view(['GET'])
 def profile(request, uid):
     try: